@@ -0,0 +1,141 @@
+from dataclass.autoscaler import BacklogAutoscaler
+from dataclass.benchmark import PipelineBenchmark
+from dataclass.compress import CompressFile
+from dataclass.lambda_function import LambdaFunction
+from dataclass.local_aws import LocalAWS
+from dataclass.queue import SQS
+from dataclass.sharding import ShardedPipeline
+from config.clients import get_client
+from config.log import setup_logging
+from config.metrics import get_metrics
+
+import argparse
+import datetime
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+def cloudwatch_throttles(function_names: list, start: datetime.datetime):
+    '''
+    Throttles reported by CloudWatch for the functions since start (metrics arrive with a few minutes of delay).
+    '''
+    def count() -> int:
+        total = 0
+        for function_name in function_names:
+            response = get_client("cloudwatch").get_metric_statistics(
+                Namespace="AWS/Lambda",
+                MetricName="Throttles",
+                Dimensions=[{"Name": "FunctionName", "Value": function_name}],
+                StartTime=start,
+                EndTime=datetime.datetime.now(datetime.timezone.utc),
+                Period=60,
+                Statistics=["Sum"],
+            )
+            total += int(sum(point["Sum"] for point in response["Datapoints"]))
+        return total
+    return count
+
+if __name__ == "__main__":
+
+    setup_logging()
+
+    parser = argparse.ArgumentParser(description="Origin queue -> Lambda -> destination queue benchmark")
+    parser.add_argument("--local", action="store_true", help="Run against the local in-process engine instead of AWS")
+    parser.add_argument("--messages", type=int, default=1000, help="Number of messages to send")
+    parser.add_argument("--size", type=int, default=256, help="Message body size in bytes")
+    parser.add_argument("--rate", type=float, default=None, help="Send rate in msgs/s (default: as fast as possible)")
+    parser.add_argument("--shards", type=int, default=1, help="Number of origin queue + function pairs, messages are routed by consistent hashing")
+    parser.add_argument("--concurrency", type=int, default=None, help="Reserved concurrency for the function of each shard")
+    parser.add_argument("--batch-size", type=int, default=10, help="Event source mapping batch size")
+    parser.add_argument("--batching-window", type=int, default=0, help="Event source mapping batching window in seconds")
+    parser.add_argument("--max-pollers", type=int, default=None, help="Event source mapping maximum concurrency (2-1000)")
+    parser.add_argument("--autoscale", type=float, default=None, metavar="SLO",
+                        help="Size the reserved concurrency from the backlog to keep latency under SLO seconds")
+    parser.add_argument("--processing-time", type=float, default=0.1, help="Autoscaler estimate of seconds per message")
+    parser.add_argument("--autoscale-interval", type=float, default=10, help="Seconds between autoscaler samples")
+    parser.add_argument("--metrics-output", default=None,
+                        help="Also save the API call / consumer metrics (.prom for Prometheus text, JSON otherwise)")
+    parser.add_argument("--output", default="benchmark_results.json", help="File where the JSON results are saved")
+    args = parser.parse_args()
+
+    # Variaveis
+    lambda_filename = "lambda_send_sqs.py"
+    lambda_compress = "lambda_send_sqs.zip"
+    handler = "lambda_send_sqs.lambda_handler"
+    username = "leticiacb1"
+
+    pipeline_name = "benchmark_" + username
+    queue_destination_name = "benchmark_destination_queue_" + username
+
+    engine = None
+    pipeline = None
+    autoscalers = []
+
+    try:
+        if args.local:
+            engine = LocalAWS()
+            engine.install()
+
+        # Instances
+        compress = CompressFile()
+        _lambda = LambdaFunction()
+        destination = SQS()
+
+        compress.run(lambda_filename=lambda_filename, compress_filename=lambda_compress)
+
+        destination.create_client()
+        destination.create_queue(queue_name=queue_destination_name)
+
+        _lambda.create_client()
+        _lambda.read_function(compress_filename=lambda_compress)
+
+        # Every shard is an origin queue -> function pair sending to the shared destination queue
+        pipeline = ShardedPipeline(pipeline_name, destination, _lambda, handler, timeout=15, concurrency=args.concurrency,
+                                   batch_size=args.batch_size, batching_window=args.batching_window,
+                                   maximum_concurrency=args.max_pollers)
+        pipeline.add_shards(args.shards)
+
+        if engine:
+            throttle_counter = lambda: engine.counters["throttles"]
+        else:
+            throttle_counter = cloudwatch_throttles(pipeline.function_names, datetime.datetime.now(datetime.timezone.utc))
+
+        benchmark = PipelineBenchmark(pipeline, destination, num_messages=args.messages, message_size=args.size,
+                                      rate=args.rate, throttle_counter=throttle_counter)
+        if args.autoscale:
+            # One autoscaler per shard, each one sizes its function from its own queue
+            for shard in pipeline.shards:
+                autoscaler = BacklogAutoscaler(shard["queue"], _lambda, shard["function_name"], latency_slo=args.autoscale,
+                                               processing_time=args.processing_time, interval=args.autoscale_interval,
+                                               max_concurrency=args.concurrency or 50)
+                autoscaler.start()
+                autoscalers.append(autoscaler)
+
+        results = benchmark.run()
+        if autoscalers:
+            for autoscaler in autoscalers:
+                autoscaler.stop()
+            results.update(autoscale_slo=args.autoscale,
+                           autoscale_history={autoscaler.function_name: autoscaler.history for autoscaler in autoscalers})
+
+        results.update(mode="local" if args.local else "aws", concurrency=args.concurrency,
+                       batch_size=args.batch_size, batching_window=args.batching_window,
+                       max_pollers=args.max_pollers, timestamp=time.strftime("%Y-%m-%dT%H:%M:%S"))
+        benchmark.save(results, args.output)
+
+        if args.metrics_output:
+            get_metrics().save(args.metrics_output)
+            logger.info(f"Metrics saved to {args.metrics_output}.")
+
+    except Exception as e:
+        logger.error(f"An error occurred: {e}")
+    finally:
+        # Cleaning:
+        for autoscaler in autoscalers:
+            autoscaler.stop()
+        if pipeline:
+            pipeline.cleanup()
+        destination.cleanup()
+        if engine:
+            engine.shutdown()
@@ -0,0 +1,71 @@
+import threading
+
+import boto3
+from botocore.config import Config as BotoConfig
+
+from config.config import get_config
+from config.metrics import instrument
+
+_lock = threading.Lock()
+_session = None
+_clients = {}
+
+def _get_session() -> boto3.session.Session:
+    global _session
+
+    if _session is None:
+        config = get_config()
+        _session = boto3.session.Session(aws_access_key_id=config.ACCESS_KEY,
+                                         aws_secret_access_key=config.SECRET_KEY,
+                                         region_name=config.REGION)
+    return _session
+
+def get_client(service: str, region: str = None, max_pool_connections: int = None):
+    '''
+    Return the process-wide client for (service, region), creating it on first use.
+    boto3 clients are thread safe, so every class and thread shares the same
+    connection pool instead of opening new TLS connections per client.
+    max_pool_connections asks for a pool of at least that many connections: a shared
+    client with a smaller pool is replaced (the clients already returned keep working).
+    Every call made by the client is recorded in config.metrics.
+    '''
+    config = get_config()
+    region = region or config.REGION
+    key = (service, region)
+
+    with _lock:
+        client = _clients.get(key)
+        # Stand-ins from register_client have no botocore config (and no connection pool)
+        client_config = getattr(getattr(client, "meta", None), "config", None)
+        too_small = client_config is not None and (max_pool_connections or 0) > client_config.max_pool_connections
+
+        if client is None or too_small:
+            client_config = BotoConfig(max_pool_connections=max(config.MAX_POOL_CONNECTIONS, max_pool_connections or 0),
+                                       retries={"mode": config.RETRY_MODE, "total_max_attempts": config.MAX_ATTEMPTS})
+            _clients[key] = _get_session().client(service, region_name=region, config=client_config)
+            instrument(_clients[key])
+        return _clients[key]
+
+def register_client(service: str, client, region: str = None) -> None:
+    '''
+    Use client for (service, region) instead of a boto3 client, e.g. a local stand-in.
+    '''
+    region = region or get_config().REGION
+    with _lock:
+        _clients[(service, region)] = client
+
+def configure(max_pool_connections: int = None, retry_mode: str = None, max_attempts: int = None) -> None:
+    '''
+    Override the client settings read from .env. Clients created before this
+    call are dropped so the new settings apply to the next get_client().
+    '''
+    config = get_config()
+    if max_pool_connections is not None:
+        config.MAX_POOL_CONNECTIONS = max_pool_connections
+    if retry_mode is not None:
+        config.RETRY_MODE = retry_mode
+    if max_attempts is not None:
+        config.MAX_ATTEMPTS = max_attempts
+
+    with _lock:
+        _clients.clear()
@@ -1,6 +1,10 @@
+import logging
 import os
+import functools
 from dotenv import load_dotenv
 
+logger = logging.getLogger(__name__)
+
 class Config():
 
     def __init__(self):
@@ -10,6 +14,11 @@ class Config():
         self.REGION     = None
         self.ACCOUNT_ID = None
         self.ROLE_ARN   = None
+        self.GATEWAY_ROLE_ARN = None            # Role assumed by API Gateway for direct SQS integrations
+
+        self.MAX_POOL_CONNECTIONS = 50          # HTTP connections kept per client
+        self.RETRY_MODE           = "standard"  # botocore retry mode: legacy, standard or adaptive
+        self.MAX_ATTEMPTS         = 3           # Total attempts per call, including the first one
 
         self.env_filename = '.env'
 
@@ -25,10 +34,30 @@ class Config():
         self.REGION     = os.getenv("AWS_REGION")
         self.ACCOUNT_ID = os.getenv("AWS_ACCOUNT_ID")
         self.ROLE_ARN   = os.getenv("AWS_LAMBDA_ROLE_ARN")
+        self.GATEWAY_ROLE_ARN = os.getenv("AWS_GATEWAY_ROLE_ARN")
+
+        self.MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", self.MAX_POOL_CONNECTIONS))
+        self.RETRY_MODE           = os.getenv("AWS_RETRY_MODE", self.RETRY_MODE)
+        self.MAX_ATTEMPTS         = int(os.getenv("AWS_MAX_ATTEMPTS", self.MAX_ATTEMPTS))
+
+        logger.info("Environment variables loaded successfully.")
+        logger.info("> ACCESS_KEY : " + self._mask(self.ACCESS_KEY))
+        logger.info("> SECRET_KEY : " + self._mask(self.SECRET_KEY))
+        logger.info(f"> REGION : {self.REGION}")
+        logger.info(f"> ACCOUNT_ID : {self.ACCOUNT_ID}")
+        logger.info(f"> ROLE_ARN : {self.ROLE_ARN}")
+
+    @staticmethod
+    def _mask(secret: str) -> str:
+        if not secret:
+            return str(secret)
+        return "*" * max(0, len(secret) - 4) + secret[-4:]
 
-        print("\n    [INFO] Environment variables loaded successfully.\n")
-        print("\n           > ACCESS_KEY : " + self.ACCESS_KEY)
-        print("\n           > SECRET_KEY : " + self.SECRET_KEY)
-        print("\n           > REGION : " + self.REGION)
-        print("\n           > ACCOUNT_ID : " + self.ACCOUNT_ID)
-        print("\n           > ROLE_ARN : " + self.ROLE_ARN + "\n")
\ No newline at end of file
+@functools.lru_cache(maxsize=None)
+def get_config() -> Config:
+    '''
+    Process-wide Config, loaded from .env only once
+    '''
+    config = Config()
+    config.load()
+    return config
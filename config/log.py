@@ -0,0 +1,40 @@
+import logging
+import os
+import sys
+
+class ConsoleFormatter(logging.Formatter):
+    '''
+    Renders records as "[LEVEL] message"; messages starting with ">" are
+    details of the previous record and are indented under it.
+    '''
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if record.exc_info:
+            message += "\n" + self.formatException(record.exc_info)
+
+        if message.startswith(">"):
+            return "\n           " + message
+        return f"\n    [{record.levelname}] {message}"
+
+def setup_logging(level: str = None) -> None:
+    '''
+    Send the project logs to stdout. The level defaults to the LOG_LEVEL environment
+    variable (INFO when unset); OFF silences every log. botocore stays at WARNING.
+    '''
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+
+    if level == "OFF":
+        logging.disable(logging.CRITICAL)
+        return
+    logging.disable(logging.NOTSET)
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(ConsoleFormatter())
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
+
+    for name in ("boto3", "botocore", "urllib3"):
+        logging.getLogger(name).setLevel(max(logging.WARNING, root.level))
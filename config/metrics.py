@@ -0,0 +1,159 @@
+import bisect
+import functools
+import json
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 6291456)
+
+THROTTLE_CODES = {"Throttling", "ThrottlingException", "ThrottledException", "TooManyRequestsException",
+                  "RequestThrottled", "RequestThrottledException", "RequestLimitExceeded", "SlowDown"}
+
+class Metrics():
+    '''
+    Thread-safe counters and histograms, keyed by name and labels.
+    Histograms keep cumulative-style buckets so they can be exported as Prometheus text.
+    '''
+
+    def __init__(self):
+        self.counters = {}      # (name, labels) -> value
+        self.histograms = {}    # (name, labels) -> {"buckets", "counts", "sum", "count"}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted((labels or {}).items()))
+
+    def increment(self, name: str, labels: dict = None, value: float = 1) -> None:
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, labels: dict = None, buckets: tuple = LATENCY_BUCKETS) -> None:
+        key = self._key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {"buckets": buckets, "counts": [0] * (len(buckets) + 1), "sum": 0.0, "count": 0}
+            histogram["counts"][bisect.bisect_left(histogram["buckets"], value)] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def reset(self) -> None:
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self) -> dict:
+        '''
+        JSON-serializable copy of every metric.
+        '''
+        with self.lock:
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in sorted(self.counters.items())]
+            histograms = [{"name": name, "labels": dict(labels), "count": histogram["count"], "sum": histogram["sum"],
+                           "buckets": dict(zip([str(bound) for bound in histogram["buckets"]] + ["+Inf"], histogram["counts"]))}
+                          for (name, labels), histogram in sorted(self.histograms.items())]
+        return {"timestamp": time.time(), "counters": counters, "histograms": histograms}
+
+    def to_prometheus(self) -> str:
+        '''
+        Prometheus text exposition format.
+        '''
+        def render(labels: dict) -> str:
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{name}="{value}"' for name, value in labels.items()) + "}"
+
+        snapshot = self.snapshot()
+        lines = []
+
+        for counter in snapshot["counters"]:
+            lines.append(f"{counter['name']}{render(counter['labels'])} {counter['value']}")
+
+        for histogram in snapshot["histograms"]:
+            cumulative = 0
+            for bound, count in histogram["buckets"].items():
+                cumulative += count
+                lines.append(f"{histogram['name']}_bucket{render(dict(histogram['labels'], le=bound))} {cumulative}")
+            lines.append(f"{histogram['name']}_sum{render(histogram['labels'])} {histogram['sum']}")
+            lines.append(f"{histogram['name']}_count{render(histogram['labels'])} {histogram['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    def save(self, path: str) -> None:
+        '''
+        Write a Prometheus text file when path ends with .prom, a JSON snapshot otherwise.
+        '''
+        with open(path, "w") as f:
+            if path.endswith(".prom"):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.snapshot(), f, indent=2)
+
+@functools.lru_cache(maxsize=None)
+def get_metrics() -> Metrics:
+    '''
+    Process-wide metrics registry
+    '''
+    return Metrics()
+
+def _body_size(body) -> int:
+    if isinstance(body, (bytes, str)):
+        return len(body)
+    return 0
+
+def instrument(client) -> None:
+    '''
+    Record every call made by a boto3 client through botocore event hooks:
+    latency (retries included), request and response sizes, errors, retries
+    and throttled attempts, labelled by service and operation.
+    '''
+    metrics = get_metrics()
+    service = client.meta.service_model.service_name
+
+    def before_call(model, params, context, **kwargs):
+        context["metrics_start"] = time.monotonic()
+        labels = {"service": service, "operation": model.name}
+        metrics.observe("aws_request_bytes", _body_size(params.get("body")), labels, SIZE_BUCKETS)
+
+    def after_call(model, http_response, parsed, context, **kwargs):
+        labels = {"service": service, "operation": model.name}
+        metrics.increment("aws_calls_total", labels)
+        if "metrics_start" in context:
+            metrics.observe("aws_call_seconds", time.monotonic() - context["metrics_start"], labels)
+        # Content-Length only: reading the content would consume streaming bodies (Lambda Payload)
+        metrics.observe("aws_response_bytes", int(http_response.headers.get("content-length", 0)), labels, SIZE_BUCKETS)
+
+        retries = parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+        if retries:
+            metrics.increment("aws_retries_total", labels, retries)
+
+        error = parsed.get("Error", {}).get("Code")
+        if error:
+            metrics.increment("aws_errors_total", dict(labels, code=error))
+
+    def after_call_error(exception, context, event_name, **kwargs):
+        # Connection errors and the like: no response was parsed
+        labels = {"service": service, "operation": event_name.rsplit(".", 1)[-1]}
+        metrics.increment("aws_calls_total", labels)
+        if "metrics_start" in context:
+            metrics.observe("aws_call_seconds", time.monotonic() - context["metrics_start"], labels)
+        metrics.increment("aws_errors_total", dict(labels, code=type(exception).__name__))
+
+    def needs_retry(response, operation, **kwargs):
+        # Called once per attempt, before the retry handler decides; counts throttled attempts
+        if response is None:
+            return None
+        http_response, parsed = response
+        code = parsed.get("Error", {}).get("Code")
+        if code in THROTTLE_CODES or http_response.status_code == 429:
+            metrics.increment("aws_throttles_total", {"service": service, "operation": operation.name})
+        return None
+
+    events = client.meta.events
+    events.register("before-call", before_call, unique_id="metrics-before-call")
+    events.register("after-call", after_call, unique_id="metrics-after-call")
+    events.register("after-call-error", after_call_error, unique_id="metrics-after-call-error")
+    events.register("needs-retry", needs_retry, unique_id="metrics-needs-retry")
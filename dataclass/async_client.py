@@ -0,0 +1,122 @@
+import asyncio
+import concurrent.futures
+import json
+
+from config.clients import get_client
+from config.config import get_config
+from dataclass.concurrency import FunctionError
+
+class ThreadPoolRunner():
+    '''
+    Runs blocking boto3 calls from an event loop on a pool of max_in_flight threads
+    (the client connection pool size by default). boto3 is synchronous, so every
+    request in flight still holds one OS thread: this gives asyncio code a bounded way
+    to call AWS, not thousands of requests in flight without thousands of threads.
+    Calls beyond max_in_flight wait in the executor queue.
+    '''
+
+    def __init__(self, max_in_flight: int = None):
+        self.max_in_flight = max_in_flight or get_config().MAX_POOL_CONNECTIONS
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_in_flight)
+
+    async def call(self, function, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: function(*args, **kwargs))
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+
+    def pooled(self, client, service: str):
+        '''
+        The shared client of service with a connection pool of max_in_flight connections,
+        so requests beyond the pool size do not open and drop TLS connections.
+        Any other client (a local stand-in, a wrapper) is returned as it is.
+        '''
+        if client is get_client(service):
+            return get_client(service, max_pool_connections=self.max_in_flight)
+        return client
+
+class AsyncSQS():
+    '''
+    asyncio counterpart of SQS. Wraps a SQS instance with a created client and queue;
+    calls run on a ThreadPoolRunner, one thread per request in flight.
+    '''
+
+    def __init__(self, sqs, max_in_flight: int = None):
+        self.sqs = sqs
+        self.runner = ThreadPoolRunner(max_in_flight)
+        self.sqs.sqs_client = self.runner.pooled(self.sqs.sqs_client, "sqs")
+
+    async def send(self, message: str, group_id: str = "default") -> str:
+        body, attributes = self.sqs._encode(message)
+        response = await self.runner.call(self.sqs.sqs_client.send_message,
+                                          QueueUrl=self.sqs.queue_url,
+                                          MessageBody=body,
+                                          **({"MessageAttributes": attributes} if attributes else {}),
+                                          **(self.sqs._fifo_fields(group_id) if self.sqs.fifo else {}))
+        return response["MessageId"]
+
+    async def send_many(self, messages: list, group_key = None, shards: int = None) -> list:
+        '''
+        Send messages with SendMessageBatch, one coroutine per batch.
+        On FIFO queues the batches of a group must go out in order, so the messages
+        go through SQS.send_ordered (group_key and shards as there) in one call.
+        Returns one result per message, in input order.
+        '''
+        if self.sqs.fifo:
+            return await self.runner.call(self.sqs.send_ordered, messages, group_key=group_key, shards=shards)
+
+        batches = list(self.sqs._build_batches(messages))
+        batch_results = await asyncio.gather(*[self.runner.call(self.sqs._send_batch, batch) for batch in batches])
+
+        results = dict(pair for pairs in batch_results for pair in pairs)
+        return [results[index] for index in range(len(results))]
+
+    async def receive(self, num_messages: int = 10) -> list:
+        response = await self.runner.call(self.sqs.sqs_client.receive_message,
+                                          QueueUrl=self.sqs.queue_url,
+                                          MaxNumberOfMessages=num_messages,
+                                          VisibilityTimeout=self.sqs.visibility_timeout,
+                                          WaitTimeSeconds=self.sqs.wait_time_seconds,
+                                          MessageAttributeNames=["All"])
+        return self.sqs._decode(response.get("Messages", []))
+
+    async def delete(self, receipt_handles: list) -> list:
+        return await self.runner.call(self.sqs.delete_messages, receipt_handles)
+
+    def close(self) -> None:
+        self.runner.close()
+
+class AsyncLambdaFunction():
+    '''
+    asyncio counterpart of LambdaFunction invocations. Wraps a LambdaFunction
+    instance with a created client; invocations run on a ThreadPoolRunner, one
+    thread per invocation in flight.
+    '''
+
+    def __init__(self, lambda_function, max_in_flight: int = None):
+        self.lambda_function = lambda_function
+        self.runner = ThreadPoolRunner(max_in_flight)
+        self.lambda_function.lambda_client = self.runner.pooled(self.lambda_function.lambda_client, "lambda")
+
+    async def invoke(self, function_name: str, input: dict = None):
+        kwargs = self.lambda_function._invoke_kwargs(function_name, input)
+
+        response = await self.runner.call(self.lambda_function.lambda_client.invoke, **kwargs)
+        result = self.lambda_function._decode_payload(response["Payload"].read())
+
+        # Unhandled errors come back as HTTP 200 with the FunctionError header
+        if response.get("FunctionError"):
+            raise FunctionError(f"{function_name}() failed: {json.dumps(result)}")
+        return result
+
+    async def invoke_all(self, function_name: str, inputs: list, return_exceptions: bool = True) -> list:
+        '''
+        Invoke the function once per input. Results are returned in input order;
+        failed invocations are returned as exceptions unless return_exceptions is False.
+        '''
+        return await asyncio.gather(*[self.invoke(function_name, input) for input in inputs],
+                                    return_exceptions=return_exceptions)
+
+    def close(self) -> None:
+        self.runner.close()
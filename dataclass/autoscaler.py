@@ -0,0 +1,151 @@
+import datetime
+import logging
+import math
+import threading
+import time
+
+from config.clients import get_client
+
+logger = logging.getLogger(__name__)
+
+def cloudwatch_oldest_message_age(queue_name: str):
+    '''
+    Reader of the queue ApproximateAgeOfOldestMessage (seconds). SQS only publishes it
+    as a CloudWatch metric, with one minute resolution; returns None without datapoints.
+    '''
+    def read() -> float:
+        now = datetime.datetime.now(datetime.timezone.utc)
+        response = get_client("cloudwatch").get_metric_statistics(
+            Namespace="AWS/SQS",
+            MetricName="ApproximateAgeOfOldestMessage",
+            Dimensions=[{"Name": "QueueName", "Value": queue_name}],
+            StartTime=now - datetime.timedelta(minutes=5),
+            EndTime=now,
+            Period=60,
+            Statistics=["Maximum"],
+        )
+        datapoints = sorted(response["Datapoints"], key=lambda point: point["Timestamp"])
+        return datapoints[-1]["Maximum"] if datapoints else None
+    return read
+
+class BacklogAutoscaler():
+    '''
+    Sizes the reserved concurrency of the function consuming a queue from its backlog.
+    Every interval seconds the queue is sampled and the target is the concurrency that
+    drains the backlog within latency_slo, given processing_time seconds per message;
+    it is raised in proportion to the age of the oldest message while that age is over
+    the SLO, and the concurrency is not lowered then.
+    Scale up is immediate, scale down waits for scale_down_cooldown and only happens
+    when the target is below the current value by more than tolerance (hysteresis).
+    '''
+
+    def __init__(self, sqs, lambda_function, function_name: str, latency_slo: float = 60, processing_time: float = 1.0,
+                 min_concurrency: int = 1, max_concurrency: int = 50, interval: float = 30,
+                 scale_down_cooldown: float = 120, tolerance: float = 0.2, age_reader = None):
+        if not 1 <= min_concurrency <= max_concurrency:
+            raise ValueError(" Concurrency bounds must satisfy 1 <= min_concurrency <= max_concurrency.")
+
+        self.sqs = sqs
+        self.lambda_function = lambda_function
+        self.function_name = function_name
+
+        self.latency_slo = latency_slo
+        self.processing_time = processing_time      # Seconds one execution spends per message
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.interval = interval
+        self.scale_down_cooldown = scale_down_cooldown
+        self.tolerance = tolerance
+
+        # Callable returning the age of the oldest message in seconds (or None)
+        self.age_reader = age_reader or cloudwatch_oldest_message_age(sqs.queue_url.rsplit("/", 1)[-1])
+
+        self.concurrency = None
+        self.last_change = 0.0
+        self.history = []
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def sample(self) -> dict:
+        response = self.sqs.sqs_client.get_queue_attributes(
+            QueueUrl=self.sqs.queue_url,
+            AttributeNames=["ApproximateNumberOfMessages", "ApproximateNumberOfMessagesNotVisible"],
+        )
+        attributes = response["Attributes"]
+
+        try:
+            age = self.age_reader()
+        except Exception as e:
+            logger.error(f"Could not read the age of the oldest message: {e}")
+            age = None
+
+        return {
+            "visible": int(attributes["ApproximateNumberOfMessages"]),
+            "not_visible": int(attributes["ApproximateNumberOfMessagesNotVisible"]),
+            "age": age,
+        }
+
+    def target(self, sample: dict) -> int:
+        backlog = sample["visible"] + sample["not_visible"]
+        target = math.ceil(backlog * self.processing_time / self.latency_slo)
+
+        # Messages already waiting longer than the SLO: scale the backlog target by how late they are
+        # and do not scale down. Not based on the current concurrency: the age is a one minute metric
+        # that lags the capacity just added, the same datapoint would compound at every step.
+        if sample["age"] and sample["age"] > self.latency_slo:
+            target = max(math.ceil(target * sample["age"] / self.latency_slo), self.concurrency or 0)
+
+        return max(self.min_concurrency, min(self.max_concurrency, target))
+
+    def _read_concurrency(self) -> int:
+        response = self.lambda_function.lambda_client.get_function_concurrency(FunctionName=self.function_name)
+        return response.get("ReservedConcurrentExecutions")
+
+    def step(self) -> dict:
+        '''
+        Sample the queue once and apply the new target when the hysteresis allows it.
+        '''
+        if self.concurrency is None:
+            # The starting value counts as a change, so it is not scaled down before the cooldown
+            self.concurrency = self._read_concurrency()
+            self.last_change = time.monotonic()
+
+        sample = self.sample()
+        target = self.target(sample)
+        now = time.monotonic()
+
+        if self.concurrency is None or target > self.concurrency:
+            apply = True
+        else:
+            apply = (target < self.concurrency * (1 - self.tolerance)
+                     and now - self.last_change >= self.scale_down_cooldown)
+
+        if apply:
+            age = "n/a" if sample["age"] is None else f"{sample['age']:.0f}s"
+            logger.info(f"Autoscale {self.function_name}: {self.concurrency} -> {target} "
+                        f"(backlog {sample['visible'] + sample['not_visible']}, oldest message {age}).")
+            self.lambda_function.set_lambda_limits(function_name=self.function_name, concurrent_executions=target)
+            self.concurrency = target
+            self.last_change = now
+
+        sample.update(target=target, concurrency=self.concurrency, time=time.time())
+        self.history.append(sample)
+        return sample
+
+    def _loop(self) -> None:
+        while not self.stop_event.is_set():
+            try:
+                self.step()
+            except Exception as e:
+                logger.error(f"Autoscaler step failed: {e}")
+            self.stop_event.wait(timeout=self.interval)
+
+    def start(self) -> None:
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
@@ -0,0 +1,196 @@
+import collections
+import concurrent.futures
+import json
+import logging
+import threading
+import time
+
+from dataclass.consumer import Consumer
+
+logger = logging.getLogger(__name__)
+
+def percentile(values: list, p: float) -> float:
+    '''
+    Nearest-rank percentile of values, None when there are no values.
+    '''
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+class CallCounter():
+    '''
+    Wraps a boto3 (or local) client and counts the API calls made through it.
+    '''
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = collections.Counter()
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attribute = getattr(self.client, name)
+        if not callable(attribute) or name.startswith("_") or name in ("get_paginator", "get_waiter", "can_paginate"):
+            return attribute
+
+        def counted(*args, **kwargs):
+            with self.lock:
+                self.calls[name] += 1
+            return attribute(*args, **kwargs)
+        return counted
+
+class PipelineBenchmark():
+    '''
+    Drives the origin queue -> Lambda -> destination queue pipeline and measures it.
+    With a ShardedPipeline as origin the messages are spread over its shard queues and
+    the throughput is the aggregate of every shard.
+    Every message body carries its id and send time; the destination queue is
+    drained until every id came back or no message arrived for idle_timeout seconds.
+    '''
+
+    def __init__(self, origin, destination, num_messages: int = 1000, message_size: int = 256,
+                 rate: float = None, producers: int = 4, idle_timeout: float = 30, throttle_counter = None):
+        self.origin = origin            # SQS, or a ShardedPipeline routing every message id to a shard queue
+        self.destination = destination
+
+        self.origins = origin.queues if hasattr(origin, "route") else [origin]
+        self.route = origin.route if hasattr(origin, "route") else (lambda key: origin)
+        self.sent_per_origin = collections.Counter()
+
+        self.num_messages = num_messages
+        self.message_size = message_size
+        self.rate = rate                            # Messages per second, None sends as fast as possible
+        self.producers = producers
+        self.idle_timeout = idle_timeout
+        self.throttle_counter = throttle_counter    # Callable returning the current throttle count
+
+        self.latencies = []
+        self.received_ids = set()
+        self.received = 0
+        self.last_received = None
+        self.lock = threading.Lock()
+
+    def _body(self, index: int) -> str:
+        body = {"id": index, "sent_at": time.time(), "pad": ""}
+        padding = self.message_size - len(json.dumps(body))
+        body["pad"] = "x" * max(0, padding)
+        return json.dumps(body)
+
+    def _produce(self) -> None:
+        start = time.monotonic()
+        # Paced runs send every tick right away, unpaced runs take enough ids to fill a batch per shard
+        chunk = self.origins[0].max_batch_entries * (1 if self.rate else len(self.origins))
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.producers) as executor:
+            futures = []
+            for first in range(0, self.num_messages, chunk):
+                if self.rate:
+                    # Pace batches so the send rate matches the requested message rate
+                    delay = start + first / self.rate - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+
+                # Split the tick by shard and send it now: sent_at must not include time spent in a client buffer
+                batches = collections.defaultdict(list)
+                for index in range(first, min(first + chunk, self.num_messages)):
+                    batches[self.route(index)].append(index)
+
+                for origin, indexes in batches.items():
+                    self.sent_per_origin[origin.queue_url.rsplit("/", 1)[-1]] += len(indexes)
+                    for offset in range(0, len(indexes), origin.max_batch_entries):
+                        batch = [(index, *origin._encode(self._body(index)), {}) for index in indexes[offset:offset + origin.max_batch_entries]]
+                        futures.append(executor.submit(origin._send_batch, batch))
+
+            for future in futures:
+                future.result()
+
+    def _collect(self, message: dict) -> None:
+        now = time.time()
+        with self.lock:
+            self.received += 1
+            self.last_received = time.monotonic()
+            try:
+                body = json.loads(message["Body"])
+                if body["id"] not in self.received_ids:
+                    self.received_ids.add(body["id"])
+                    self.latencies.append(now - body["sent_at"])
+            except (ValueError, KeyError, TypeError):
+                # Message not produced by the benchmark, count it but it carries no timing
+                pass
+
+    def run(self) -> dict:
+        # One counter per underlying client, the queues usually share the same one
+        queues = self.origins + [self.destination]
+        clients = [queue.sqs_client for queue in queues]
+        counters = {}
+        for queue in queues:
+            queue.sqs_client = counters.setdefault(id(queue.sqs_client), CallCounter(queue.sqs_client))
+
+        throttles_before = self.throttle_counter() if self.throttle_counter else None
+
+        consumer = Consumer(self.destination, self._collect, pollers=2, workers=4)
+        consumer.wait_time_seconds = 1     # Short polls so the consumer stops quickly at the end of the run
+        consumer_thread = threading.Thread(target=consumer.run, daemon=True)
+
+        logger.info(f"Benchmark: {self.num_messages} messages of {self.message_size} bytes, rate {self.rate or 'unbounded'} msgs/s.")
+
+        start = time.monotonic()
+        consumer_thread.start()
+        self._produce()
+        produce_elapsed = time.monotonic() - start
+
+        produce_end = time.monotonic()
+        while len(self.received_ids) < self.num_messages and time.monotonic() - max(produce_end, self.last_received or 0) < self.idle_timeout:
+            time.sleep(0.1)
+
+        elapsed = (self.last_received if self.received else time.monotonic()) - start
+        consumer.stop()
+        consumer_thread.join()
+
+        calls = sum((counter.calls for counter in counters.values()), collections.Counter())
+
+        results = {
+            "messages_sent": self.num_messages,
+            "messages_received": self.received,
+            "messages_matched": len(self.received_ids),
+            "message_size": self.message_size,
+            "target_rate": self.rate,
+            "send_throughput": self.num_messages / produce_elapsed if produce_elapsed else None,
+            "throughput": len(self.received_ids) / elapsed if elapsed else None,
+            "latency_p50": percentile(self.latencies, 50),
+            "latency_p95": percentile(self.latencies, 95),
+            "latency_p99": percentile(self.latencies, 99),
+            "throttles": self.throttle_counter() - throttles_before if self.throttle_counter else None,
+            "api_calls": dict(calls),
+            "elapsed": elapsed,
+            "shards": len(self.origins),
+            "sent_per_shard": dict(self.sent_per_origin),
+        }
+
+        for queue, client in zip(queues, clients):
+            queue.sqs_client = client
+
+        self.report(results)
+        return results
+
+    def report(self, results: dict) -> None:
+        def seconds(value):
+            return "n/a" if value is None else f"{value * 1000:.1f} ms"
+
+        logger.info("Benchmark results:")
+        logger.info(f"> Received : {results['messages_matched']}/{results['messages_sent']} in {results['elapsed']:.1f}s")
+        logger.info(f"> Throughput : {results['throughput'] or 0:.1f} msgs/s")
+        if results["shards"] > 1:
+            per_shard = (results["throughput"] or 0) / results["shards"]
+            logger.info(f"> Shards : {results['shards']} ({per_shard:.1f} msgs/s per shard), sent per shard : {results['sent_per_shard']}")
+        logger.info(f"> Latency p50 / p95 / p99 : {seconds(results['latency_p50'])} / {seconds(results['latency_p95'])} / {seconds(results['latency_p99'])}")
+        logger.info(f"> Throttles : {results['throttles']}")
+        logger.info(f"> API calls : {sum(results['api_calls'].values())} {results['api_calls']}")
+
+    @staticmethod
+    def save(results: dict, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+
+        logger.info(f"Benchmark results saved to {path}.")
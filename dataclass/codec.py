@@ -0,0 +1,190 @@
+import base64
+import functools
+import hashlib
+import json
+import os
+import zlib
+
+BLOB_BUCKET_VARIABLE = "CODEC_BLOB_BUCKET"
+
+class LocalBlobStore():
+    '''
+    Claim-check store on the local filesystem. Blobs are content addressed (SHA-256).
+    Only processes on the same machine can read it: a deployed function cannot, use
+    S3BlobStore when functions decode the payloads.
+    '''
+
+    def __init__(self, directory: str = ".blobs"):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    def put(self, data: bytes) -> str:
+        key = hashlib.sha256(data).hexdigest()
+        path = os.path.join(self.directory, key)
+
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(data)
+        return key
+
+    def get(self, key: str) -> bytes:
+        with open(os.path.join(self.directory, key), "rb") as f:
+            return f.read()
+
+    def delete(self, key: str) -> None:
+        path = os.path.join(self.directory, key)
+        if os.path.exists(path):
+            os.remove(path)
+
+class S3BlobStore():
+    '''
+    Claim-check store in a S3 bucket shared by the producers and the functions.
+    Blobs are content addressed (SHA-256) under prefix. client is a S3 client:
+    get_client("s3") on the producer side, boto3.client("s3") in a handler.
+    '''
+
+    def __init__(self, bucket: str, client, prefix: str = "claim-check/"):
+        self.bucket = bucket
+        self.client = client
+        self.prefix = prefix
+
+    def put(self, data: bytes) -> str:
+        key = hashlib.sha256(data).hexdigest()
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data)
+        return key
+
+    def get(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)["Body"].read()
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+class MessageCodec():
+    '''
+    Compresses message bodies above compress_threshold bytes (zlib + base64) and
+    offloads bodies that fit neither raw nor compressed to a blob store, sending only the key.
+    The size limit depends on the transport: max_size for SQS messages and asynchronous
+    invocations (256 KB), max_payload_size for synchronous Lambda payloads (6 MB).
+    The codec used is carried in the "codec" message attribute (SQS) or in a
+    {"__codec__": ..., "data": ...} envelope (Lambda payloads).
+    '''
+
+    attribute_name = "codec"
+
+    def __init__(self, compress_threshold: int = 8 * 1024, max_size: int = 255 * 1024, blob_store = None, level: int = 6,
+                 max_payload_size: int = 6 * 1024 * 1024 - 1024):
+        self.compress_threshold = compress_threshold
+        self.max_size = max_size                    # Leave room for the message attributes under the 256 KB SQS limit
+        self.max_payload_size = max_payload_size    # Leave room for the envelope under the 6 MB invoke limit
+        self.blob_store = blob_store
+        self.level = level
+
+    def environment(self) -> dict:
+        '''
+        Function environment variables the handler needs to read the blobs (see codec_from_environment).
+        '''
+        if isinstance(self.blob_store, S3BlobStore):
+            return {BLOB_BUCKET_VARIABLE: self.blob_store.bucket}
+        return {}
+
+    def encode(self, body: str, max_size: int = None) -> tuple:
+        '''
+        Returns (encoded body, codec name or None). max_size defaults to the SQS limit.
+        '''
+        max_size = max_size or self.max_size
+        raw = body.encode("utf-8")
+        if len(raw) < self.compress_threshold:
+            return body, None
+
+        compressed = zlib.compress(raw, self.level)
+        encoded = base64.b64encode(compressed).decode("ascii")
+        if len(encoded) < len(raw) and len(encoded) <= max_size:
+            return encoded, "zlib"
+        if len(raw) <= max_size:
+            # Incompressible data grows with base64, send it as it is
+            return body, None
+
+        if self.blob_store is None:
+            raise ValueError(f" Message of {len(raw)} bytes is too large even compressed and no blob store is configured.")
+
+        key = self.blob_store.put(compressed)
+        return json.dumps({"blob": key}), "zlib+blob"
+
+    def decode(self, body: str, codec: str) -> str:
+        if codec == "zlib":
+            return zlib.decompress(base64.b64decode(body)).decode("utf-8")
+        if codec == "zlib+blob":
+            if self.blob_store is None:
+                raise ValueError(" Message was offloaded to a blob store and no blob store is configured.")
+            return zlib.decompress(self.blob_store.get(json.loads(body)["blob"])).decode("utf-8")
+        return body
+
+    def message_attributes(self, codec: str) -> dict:
+        if codec is None:
+            return {}
+        return {self.attribute_name: {"DataType": "String", "StringValue": codec}}
+
+    def decode_message(self, message: dict) -> dict:
+        '''
+        Decode a received SQS message in place (requires MessageAttributeNames=["All"] on receive).
+        '''
+        attribute = message.get("MessageAttributes", {}).get(self.attribute_name)
+        if attribute:
+            message["Body"] = self.decode(message["Body"], attribute["StringValue"])
+        return message
+
+    def decode_record(self, record: dict) -> str:
+        '''
+        Body of a SQS record of a Lambda event (the handler-side counterpart of decode_message).
+        '''
+        attribute = record.get("messageAttributes", {}).get(self.attribute_name)
+        if attribute:
+            return self.decode(record["body"], attribute["stringValue"])
+        return record["body"]
+
+    def encode_payload(self, payload, max_size: int = None):
+        '''
+        Wrap a JSON-serializable Lambda payload in a codec envelope when it is large.
+        max_size defaults to the synchronous invocation limit.
+        '''
+        body, codec = self.encode(json.dumps(payload), max_size or self.max_payload_size)
+        if codec is None:
+            return payload
+        return {"__codec__": codec, "data": body}
+
+    def decode_payload(self, payload):
+        '''
+        Unwrap a codec envelope.
+        '''
+        if isinstance(payload, dict) and "__codec__" in payload:
+            return json.loads(self.decode(payload["data"], payload["__codec__"]))
+        return payload
+
+def codec_from_environment(environ, client_factory) -> MessageCodec:
+    '''
+    Codec of a function handler. Blobs are read from the S3 bucket named by
+    CODEC_BLOB_BUCKET in the function environment (see MessageCodec.environment),
+    client_factory(service) creates its client (boto3.client in a handler).
+    '''
+    bucket = environ.get(BLOB_BUCKET_VARIABLE)
+    return MessageCodec(blob_store=S3BlobStore(bucket, client_factory("s3")) if bucket else None)
+
+def codec_handler(codec: MessageCodec = None):
+    '''
+    Decorator for the handlers of functions invoked by a LambdaFunction with a codec:
+    the event envelope is decoded before the handler runs and a large result of a direct
+    invocation is encoded back. Events from SQS are passed as they are (see decode_record)
+    and their results are left untouched, Lambda reads batchItemFailures from them.
+    Pass codec_from_environment(...) when payloads may be offloaded to a blob store.
+    The module has no dependencies, ship it in the package as dataclass/codec.py.
+    '''
+    codec = codec or MessageCodec()
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            if isinstance(event, dict) and "Records" in event:
+                return handler(event, context)
+            return codec.encode_payload(handler(codec.decode_payload(event), context))
+        return wrapper
+    return decorator
@@ -1,10 +1,214 @@
-from zipfile import ZipFile
+import compileall
+import hashlib
+import io
+import json
+import logging
+import os
+import py_compile
+import shutil
+import subprocess
+import sys
+import tempfile
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED
+
+logger = logging.getLogger(__name__)
 
 class CompressFile():
 
-    def run(self, lambda_filename : str , compress_filename: str) -> None :
+    def __init__(self, cache_filename: str = ".deploy_cache.json"):
+        self.cache_filename = cache_filename
+
+        # Fixed metadata so the same sources always produce the same archive (and CodeSha256)
+        self.date_time = (1980, 1, 1, 0, 0, 0)
+        self.file_mode = 0o644
+
+        # Files and folders left out of built packages: they are never imported at runtime
+        self.strip_dirs = {"__pycache__", "tests", "test", "docs", "doc", "examples"}
+        self.strip_suffixes = {".pyc", ".pyo", ".pyi", ".md", ".rst"}
+
+        self.package_report = None
+
+    def _load_cache(self) -> dict:
+        if not os.path.exists(self.cache_filename):
+            return {}
+        with open(self.cache_filename) as f:
+            return json.load(f)
+
+    def _save_cache(self, cache: dict) -> None:
+        with open(self.cache_filename, "w") as f:
+            json.dump(cache, f, indent=2, sort_keys=True)
+
+    @staticmethod
+    def sha256(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _write_entries(self, zf: ZipFile, files: dict) -> None:
+        '''
+        Deterministic zip content: sorted entries, fixed timestamps and permissions.
+        files maps archive names to paths on disk.
+        '''
+        for arcname in sorted(files):
+            info = ZipInfo(arcname, date_time=self.date_time)
+            info.external_attr = self.file_mode << 16
+            info.compress_type = ZIP_DEFLATED
+
+            with open(files[arcname], "rb") as f:
+                zf.writestr(info, f.read())
+
+    def write_zip(self, filenames: list, compress_filename: str) -> None:
         with ZipFile(compress_filename, mode='w') as zf:
-            zf.write(lambda_filename)
+            self._write_entries(zf, {self._arcname(filename): filename for filename in filenames})
+
+    def _vendor(self, requirements: list, target: str, runtime: str) -> None:
+        '''
+        Install binary wheels for the Lambda platform and runtime into target.
+        '''
+        python_version = runtime.replace("python", "")
+        command = [sys.executable, "-m", "pip", "install", "--quiet", "--no-compile",
+                   "--target", target,
+                   "--platform", "manylinux2014_x86_64",
+                   "--implementation", "cp",
+                   "--python-version", python_version,
+                   "--only-binary=:all:"] + list(requirements)
+
+        logger.info(f"Vendoring dependencies: {' '.join(requirements)}")
+        subprocess.run(command, check=True)
+
+    def _strip(self, root: str) -> None:
+        for directory, subdirectories, filenames in os.walk(root, topdown=True):
+            for subdirectory in list(subdirectories):
+                if subdirectory in self.strip_dirs:
+                    shutil.rmtree(os.path.join(directory, subdirectory))
+                    subdirectories.remove(subdirectory)
+
+            for filename in filenames:
+                if os.path.splitext(filename)[1] in self.strip_suffixes:
+                    os.remove(os.path.join(directory, filename))
+
+    def _precompile(self, root: str, runtime: str) -> bool:
+        '''
+        Write __pycache__ bytecode next to the sources. Bytecode is interpreter specific,
+        so this only runs when the local Python matches the target runtime.
+        '''
+        local_runtime = f"python{sys.version_info.major}.{sys.version_info.minor}"
+        if local_runtime != runtime:
+            logger.info(f"Skip precompile: local {local_runtime} does not match runtime {runtime}.")
+            return False
+
+        # Hash-based pycs do not depend on file timestamps, which are not kept in the zip,
+        # and source paths are recorded as they will be on Lambda (/var/task)
+        compileall.compile_dir(root, quiet=1, optimize=0, stripdir=root, prependdir="/var/task",
+                               invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+        return True
+
+    def _estimate_import_time(self, root: str, module: str) -> float:
+        '''
+        Cumulative import time of the handler module, in seconds, measured with -X importtime
+        using the local interpreter. It is an estimate of the package's share of Lambda init time.
+        '''
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                cwd=root, env=dict(os.environ, PYTHONPATH=root, PYTHONDONTWRITEBYTECODE="1"),
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+
+        for line in reversed(result.stderr.splitlines()):
+            fields = [field.strip() for field in line.split("|")]
+            if len(fields) == 3 and fields[2] == module:
+                return int(fields[1].split(":")[-1]) / 1e6
+        return None
+
+    @staticmethod
+    def _arcname(source: str, root: str = None) -> str:
+        '''
+        Path of a source inside the package: relative to root, which it must be under.
+        Without root, sources under the working directory keep their relative path
+        (dataclass/codec.py stays importable as dataclass.codec), others go at the top.
+        '''
+        relative = os.path.relpath(os.path.abspath(source), os.path.abspath(root or os.getcwd()))
+        if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+            if root:
+                raise ValueError(f" Source {source} is not under {root}.")
+            return os.path.basename(source)
+        return relative.replace(os.sep, "/")
+
+    def build(self, sources: list, requirements: list = None, runtime: str = "python3.12", precompile: bool = True,
+              root: str = None) -> bytes:
+        '''
+        Build a deployment package in memory: sources plus vendored requirements
+        (package names or a requirements file), stripped of tests/docs/caches and
+        optionally precompiled. Sources are placed relative to root (see _arcname),
+        the first one is the handler module. Returns the zip bytes; size and
+        estimated import time are kept in package_report.
+        '''
+        arcnames = [self._arcname(source, root) for source in sources]
+
+        with tempfile.TemporaryDirectory() as staging:
+            for source, arcname in zip(sources, arcnames):
+                destination = os.path.join(staging, arcname)
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                shutil.copy(source, destination)
+
+            if isinstance(requirements, str):
+                requirements = ["-r", os.path.abspath(requirements)]
+            if requirements:
+                self._vendor(requirements, staging, runtime)
+
+            self._strip(staging)
+            precompiled = precompile and self._precompile(staging, runtime)
+
+            files = {}
+            for directory, _, filenames in os.walk(staging):
+                for filename in filenames:
+                    path = os.path.join(directory, filename)
+                    files[os.path.relpath(path, staging).replace(os.sep, "/")] = path
+
+            buffer = io.BytesIO()
+            with ZipFile(buffer, mode='w') as zf:
+                self._write_entries(zf, files)
+            content = buffer.getvalue()
+
+            handler_module = os.path.splitext(arcnames[0])[0].replace("/", ".")
+            self.package_report = {
+                "files": len(files),
+                "uncompressed_bytes": sum(os.path.getsize(path) for path in files.values()),
+                "compressed_bytes": len(content),
+                "precompiled": precompiled,
+                "import_time": self._estimate_import_time(staging, handler_module),
+            }
+
+        import_time = self.package_report["import_time"]
+        logger.info("Package built in memory.")
+        logger.info(f"> Files : {self.package_report['files']}")
+        logger.info(f"> Size : {self.package_report['compressed_bytes']} bytes ({self.package_report['uncompressed_bytes']} uncompressed)")
+        logger.info(f"> Precompiled : {precompiled}")
+        logger.info(f"> Estimated import time : {'n/a' if import_time is None else f'{import_time * 1000:.1f} ms'}")
+
+        return content
+
+    def run(self, lambda_filename : str , compress_filename: str, extra_files: list = ()) -> None :
+        '''
+        Zip the handler file with extra_files (e.g. dataclass/codec.py), each under its relative path.
+        '''
+        sources = {filename: self.sha256(filename) for filename in [lambda_filename, *extra_files]}
+
+        cache = self._load_cache()
+        entry = cache.get(compress_filename, {})
+
+        # Skip the rezip when neither the sources nor the archive changed since the last run
+        if entry.get("sources") == sources and os.path.exists(compress_filename) and self.sha256(compress_filename) == entry.get("sha256"):
+            logger.info("File already compressed, sources unchanged.")
+            logger.info("> Compress filename : " + compress_filename)
+            return
+
+        self.write_zip(list(sources), compress_filename)
+
+        cache[compress_filename] = {"sources": sources, "sha256": self.sha256(compress_filename)}
+        self._save_cache(cache)
 
-        print("\n    [INFO] File compressed successfully.\n")
-        print("\n           > Compress filename : " + compress_filename)
\ No newline at end of file
+        logger.info("File compressed successfully.")
+        logger.info("> Compress filename : " + compress_filename)
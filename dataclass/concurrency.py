@@ -0,0 +1,370 @@
+import collections
+import concurrent.futures
+import json
+import logging
+import random
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+from config.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+def is_throttle(error: Exception) -> bool:
+    '''
+    True for Lambda throttling errors (TooManyRequestsException / HTTP 429).
+    '''
+    if not isinstance(error, ClientError):
+        return False
+
+    code = error.response.get("Error", {}).get("Code")
+    status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return code in ("TooManyRequestsException", "ThrottlingException") or status == 429
+
+class FunctionError(RuntimeError):
+    '''
+    The invocation reached the function but its handler failed (FunctionError response header).
+    '''
+
+class AIMDController():
+    '''
+    Additive-increase / multiplicative-decrease limit on in-flight requests.
+    The limit grows by about one slot per round of successful calls and is cut by
+    decrease_factor on throttles (or latency above latency_target), never going
+    above ceiling or below one.
+    '''
+
+    def __init__(self, ceiling: int, initial: int = None, decrease_factor: float = 0.5, latency_target: float = None):
+        self.ceiling = ceiling
+        self.limit = float(min(ceiling, initial or ceiling))
+        self.decrease_factor = decrease_factor
+        self.latency_target = latency_target
+
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self.condition = threading.Condition()
+
+    def acquire(self) -> None:
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, throttled: bool = False, latency: float = None) -> None:
+        with self.condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+
+            congested = throttled or (self.latency_target and latency and latency > self.latency_target)
+            if congested:
+                # Decrease at most once per latency window: calls that were already in flight
+                # when the limit dropped should not shrink it again
+                if now - self.last_decrease > (latency or 0.1):
+                    self.limit = max(1.0, self.limit * self.decrease_factor)
+                    self.last_decrease = now
+            else:
+                self.limit = min(float(self.ceiling), self.limit + 1.0 / self.limit)
+
+            self.condition.notify_all()
+
+class AdaptiveInvoker():
+    '''
+    Invokes a Lambda function at the highest concurrency it accepts.
+    The ceiling is the function reserved concurrency (or the unreserved account
+    concurrency); throttled invocations are retried with jittered backoff until
+    they succeed, so no invocation is lost.
+    '''
+
+    def __init__(self, lambda_function, function_name: str, latency_target: float = None,
+                 base_delay: float = 0.1, max_delay: float = 5.0):
+        self.lambda_function = lambda_function
+        self.function_name = function_name
+
+        self.latency_target = latency_target
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.controller = None
+        self.stats = {"invocations": 0, "throttles": 0, "errors": 0}
+        self.stats_lock = threading.Lock()
+
+        self.metrics = get_metrics()
+        self.labels = {"function": function_name}
+
+    def read_concurrency(self) -> int:
+        lambda_client = self.lambda_function.lambda_client
+
+        response = lambda_client.get_function_concurrency(FunctionName=self.function_name)
+        reserved = response.get("ReservedConcurrentExecutions")
+        if reserved is not None:
+            return reserved
+
+        settings = lambda_client.get_account_settings()
+        return settings["AccountLimit"]["UnreservedConcurrentExecutions"]
+
+    def _count(self, key: str) -> None:
+        with self.stats_lock:
+            self.stats[key] += 1
+        self.metrics.increment(f"invoker_{key}_total", self.labels)
+
+    def _invoke(self, input: dict = None):
+        kwargs = self.lambda_function._invoke_kwargs(self.function_name, input)
+
+        attempt = 0
+        while True:
+            self.controller.acquire()
+            start = time.monotonic()
+            try:
+                response = self.lambda_function.lambda_client.invoke(**kwargs)
+                payload = response["Payload"].read()
+            except ClientError as e:
+                if not is_throttle(e):
+                    self.controller.release(latency=time.monotonic() - start)
+                    self._count("errors")
+                    raise
+
+                self.controller.release(throttled=True, latency=time.monotonic() - start)
+                self._count("throttles")
+
+                # Full jitter backoff before queueing the invocation again
+                time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+                attempt += 1
+                continue
+            except Exception:
+                self.controller.release(latency=time.monotonic() - start)
+                self._count("errors")
+                raise
+
+            latency = time.monotonic() - start
+            self.controller.release(latency=latency)
+
+            result = self.lambda_function._decode_payload(payload)
+            # Unhandled errors come back as HTTP 200 with the FunctionError header
+            if response.get("FunctionError"):
+                self._count("errors")
+                raise FunctionError(f"{self.function_name}() failed: {json.dumps(result)}")
+
+            self._count("invocations")
+            self.metrics.observe("invoker_invoke_seconds", latency, self.labels)
+            return result
+
+    def invoke_all(self, inputs: list) -> list:
+        '''
+        Invoke the function once per input and return the results in input order.
+        Invocations that fail with a non-throttling error are returned as the exception.
+        '''
+        ceiling = self.read_concurrency()
+        if ceiling < 1:
+            raise ValueError(f" Function {self.function_name} has no concurrency available (reserved concurrency is 0).")
+        self.controller = AIMDController(ceiling, latency_target=self.latency_target)
+
+        logger.info(f"Invoke {self.function_name}() {len(inputs)} times with concurrency ceiling {ceiling}.")
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(ceiling, len(inputs)))) as executor:
+            futures = [executor.submit(self._invoke, input) for input in inputs]
+
+            results = []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append(e)
+
+        logger.info(f"> Invocations : {self.stats['invocations']}")
+        logger.info(f"> Throttles retried : {self.stats['throttles']}")
+        logger.info(f"> Errors : {self.stats['errors']}")
+        logger.info(f"> Final concurrency limit : {self.controller.limit:.1f}")
+
+        return results
+
+class CircuitBreakerOpen(Exception):
+    '''
+    Raised instead of invoking while the circuit breaker sheds load.
+    '''
+
+class CircuitBreaker():
+    '''
+    Sheds load from a failing function. The breaker opens when at least failure_rate
+    of the last window calls (and min_calls of them) failed or were throttled; calls
+    are then rejected for reset_timeout seconds. After that a single trial call is let
+    through (half-open): its success closes the breaker, its failure opens it again.
+    '''
+
+    def __init__(self, window: int = 20, failure_rate: float = 0.5, min_calls: int = 10, reset_timeout: float = 30):
+        self.window = window
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+
+        self.outcomes = collections.deque(maxlen=window)    # True for a failed call
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record(self, failed: bool) -> None:
+        with self.lock:
+            if self.state == "half_open":
+                self.trial_in_flight = False
+                if failed:
+                    self._open()
+                else:
+                    self.state = "closed"
+                    self.outcomes.clear()
+                    logger.info("Circuit breaker closed.")
+                return
+
+            self.outcomes.append(failed)
+            if (self.state == "closed" and len(self.outcomes) >= self.min_calls
+                    and sum(self.outcomes) / len(self.outcomes) >= self.failure_rate):
+                self._open()
+
+    def _open(self) -> None:
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        logger.warning(f"Circuit breaker open, calls are rejected for {self.reset_timeout}s.")
+
+class HedgedInvoker():
+    '''
+    Synchronous invocations with hedging, for idempotent functions only: when the call
+    has not answered after the hedge_percentile latency observed so far, a duplicate is
+    sent and the first successful answer wins. The late attempt is not cancelled (an
+    HTTP call cannot be), its result is dropped. Hedges start after min_samples calls
+    and are capped at max_hedge_ratio of the calls, so a slow function is not flooded.
+    Every call goes through a CircuitBreaker, which rejects calls while the function fails.
+    '''
+
+    def __init__(self, lambda_function, function_name: str, hedge_percentile: float = 95, min_samples: int = 20,
+                 max_hedge_ratio: float = 0.1, breaker: CircuitBreaker = None, max_workers: int = 32, qualifier: str = None):
+        self.lambda_function = lambda_function
+        self.function_name = function_name
+        self.qualifier = qualifier
+
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.max_hedge_ratio = max_hedge_ratio
+        self.breaker = breaker or CircuitBreaker()
+
+        # Attempts run here, so an abandoned attempt does not hold the caller thread
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+
+        self.latencies = collections.deque(maxlen=500)
+        self.stats = {"invocations": 0, "hedges": 0, "hedge_wins": 0, "errors": 0, "throttles": 0, "rejected": 0}
+        self.stats_lock = threading.Lock()
+
+        self.metrics = get_metrics()
+        self.labels = {"function": function_name}
+
+    def _count(self, key: str) -> None:
+        with self.stats_lock:
+            self.stats[key] += 1
+        self.metrics.increment(f"invoker_{key}_total", self.labels)
+
+    def hedge_delay(self) -> float:
+        '''
+        Seconds to wait before sending a duplicate, None while hedging is not allowed.
+        '''
+        with self.stats_lock:
+            if len(self.latencies) < self.min_samples:
+                return None
+            if self.stats["hedges"] >= self.max_hedge_ratio * max(1, self.stats["invocations"]):
+                return None
+            latencies = sorted(self.latencies)
+
+        rank = max(0, min(len(latencies) - 1, int(round(self.hedge_percentile / 100 * len(latencies))) - 1))
+        return latencies[rank]
+
+    def _attempt(self, input):
+        start = time.monotonic()
+        response = self.lambda_function.lambda_client.invoke(
+            **self.lambda_function._invoke_kwargs(self.function_name, input, qualifier=self.qualifier))
+        result = self.lambda_function._decode_payload(response["Payload"].read())
+
+        # Unhandled errors come back as HTTP 200 with the FunctionError header
+        if response.get("FunctionError"):
+            raise FunctionError(f"{self.function_name}() failed: {json.dumps(result)}")
+        return result, time.monotonic() - start
+
+    def invoke(self, input: dict = None):
+        '''
+        Invoke the function once and return the parsed JSON result.
+        Raises CircuitBreakerOpen while the breaker rejects calls, or the error of the
+        last attempt when no attempt succeeded.
+        '''
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise CircuitBreakerOpen(f" Circuit breaker open for {self.function_name}, call rejected.")
+
+        primary = self.executor.submit(self._attempt, input)
+        attempts = {primary}
+
+        delay = self.hedge_delay()
+        if delay is not None:
+            done, _ = concurrent.futures.wait(attempts, timeout=delay)
+            if not done:
+                attempts.add(self.executor.submit(self._attempt, input))
+                self._count("hedges")
+
+        error = None
+        while attempts:
+            done, attempts = concurrent.futures.wait(attempts, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result, latency = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+
+                with self.stats_lock:
+                    self.latencies.append(latency)
+                if future is not primary:
+                    self._count("hedge_wins")
+                self._count("invocations")
+                self.metrics.observe("invoker_invoke_seconds", latency, self.labels)
+                self.breaker.record(failed=False)
+                return result
+
+        self._count("throttles" if is_throttle(error) else "errors")
+        self.breaker.record(failed=True)
+        raise error
+
+    def invoke_all(self, inputs: list, max_in_flight: int = 16) -> list:
+        '''
+        Invoke the function once per input and return the results in input order.
+        Failed or rejected invocations are returned as the exception.
+        '''
+        logger.info(f"Invoke {self.function_name}() {len(inputs)} times with hedging at p{self.hedge_percentile:g}.")
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(max_in_flight, len(inputs)))) as executor:
+            futures = [executor.submit(self.invoke, input) for input in inputs]
+
+            results = []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append(e)
+
+        delay = self.hedge_delay()
+        logger.info(f"> Invocations : {self.stats['invocations']}")
+        logger.info(f"> Hedges sent / won : {self.stats['hedges']} / {self.stats['hedge_wins']}")
+        logger.info(f"> Errors : {self.stats['errors']}, throttles : {self.stats['throttles']}, rejected : {self.stats['rejected']}")
+        logger.info(f"> Hedge delay : {'n/a' if delay is None else f'{delay * 1000:.1f} ms'}, breaker : {self.breaker.state}")
+
+        return results
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
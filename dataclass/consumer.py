@@ -0,0 +1,316 @@
+import logging
+import math
+import queue
+import threading
+import time
+import zlib
+
+from config.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+class Consumer():
+    '''
+    Long-running SQS consumer: several long-polling threads fill a bounded
+    prefetch buffer that is drained by a pool of worker threads running the handler.
+    Messages waiting or being processed get their visibility timeout extended
+    (heartbeats) and successful messages are acknowledged in batches.
+    '''
+
+    def __init__(self, sqs, handler, pollers: int = 2, workers: int = 8, prefetch: int = None, heartbeat_interval: float = None):
+        self.sqs = sqs
+        self.handler = handler
+
+        self.num_pollers = pollers
+        self.num_workers = workers
+        self.prefetch = prefetch or workers * 2
+
+        self.visibility_timeout = sqs.visibility_timeout
+        self.wait_time_seconds = sqs.wait_time_seconds
+        self.heartbeat_interval = heartbeat_interval or max(1, self.visibility_timeout / 6)
+
+        self.buffer = queue.Queue(maxsize=self.prefetch)
+        self.in_flight = {}         # receipt handle -> time at which the message becomes visible again
+        self.pending_acks = []
+
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.pollers_done = threading.Event()
+        self.workers_done = threading.Event()
+
+        self.stats = {"received": 0, "processed": 0, "failed": 0, "deleted": 0, "extended": 0}
+        self.max_messages = None
+        self.deadline = None        # monotonic time at which run(duration=...) stops
+        self.stop_grace = 1.0       # Seconds run() waits for a poller still blocked in a long poll
+
+        self.metrics = get_metrics()
+        self.labels = {"queue": sqs.queue_url.rsplit("/", 1)[-1]}
+
+    def _count(self, key: str, value: int = 1) -> None:
+        with self.lock:
+            self.stats[key] += value
+        self.metrics.increment(f"consumer_{key}_total", self.labels, value)
+
+    def _buffered(self) -> int:
+        return self.buffer.qsize()
+
+    def _dispatch(self, item: tuple) -> None:
+        self.buffer.put(item)
+
+    def _next(self, index: int) -> tuple:
+        return self.buffer.get(timeout=0.1)
+
+    def _poll(self) -> None:
+        while not self.stop_event.is_set():
+            free_slots = min(10, self.prefetch - self._buffered())
+
+            # Do not take messages that would wait invisible in a full buffer
+            if free_slots <= 0:
+                time.sleep(0.05)
+                continue
+
+            # Never long poll past the end of the run
+            wait_time_seconds = self.wait_time_seconds
+            if self.deadline is not None:
+                wait_time_seconds = max(0, min(wait_time_seconds, math.ceil(self.deadline - time.monotonic())))
+
+            try:
+                response = self.sqs.sqs_client.receive_message(
+                    QueueUrl=self.sqs.queue_url,
+                    MaxNumberOfMessages=free_slots,
+                    VisibilityTimeout=self.visibility_timeout,
+                    WaitTimeSeconds=wait_time_seconds,
+                    MessageAttributeNames=["All"],
+                    MessageSystemAttributeNames=["All"],
+                )
+                messages = self.sqs._decode(response.get("Messages", []))
+            except Exception as e:
+                logger.error(f"Receive messages failed: {e}")
+                time.sleep(1)
+                continue
+
+            if self.pollers_done.is_set():
+                # run() stopped waiting for this poll, nobody would process the messages
+                self._release_all(messages)
+                return
+
+            received_at = time.monotonic()
+            deadline = received_at + self.visibility_timeout
+
+            with self.lock:
+                for message in messages:
+                    self.in_flight[message["ReceiptHandle"]] = deadline
+            self._count("received", len(messages))
+
+            for message in messages:
+                self._dispatch((received_at, message))
+
+    def _release_all(self, messages: list) -> None:
+        '''
+        Make messages visible again right away, without processing them.
+        '''
+        for start in range(0, len(messages), self.sqs.max_batch_entries):
+            batch = messages[start:start + self.sqs.max_batch_entries]
+            try:
+                self.sqs.sqs_client.change_message_visibility_batch(
+                    QueueUrl=self.sqs.queue_url,
+                    Entries=[{"Id": str(i), "ReceiptHandle": message["ReceiptHandle"], "VisibilityTimeout": 0}
+                             for i, message in enumerate(batch)],
+                )
+            except Exception as e:
+                logger.error(f"Could not release {len(batch)} messages: {e}")
+
+    def _work(self, index: int) -> None:
+        while True:
+            try:
+                received_at, message = self._next(index)
+            except queue.Empty:
+                if self.pollers_done.is_set():
+                    return
+                continue
+
+            self._handle(received_at, message)
+
+            if self.max_messages and self.stats["processed"] + self.stats["failed"] >= self.max_messages:
+                self.stop_event.set()
+
+    def _handle(self, received_at: float, message: dict) -> bool:
+        '''
+        Run the handler on one message and queue its acknowledgement. Returns False when the handler failed.
+        '''
+        receipt_handle = message["ReceiptHandle"]
+        start = time.monotonic()
+        self.metrics.observe("consumer_buffer_seconds", start - received_at, self.labels)
+        try:
+            self.handler(message)
+        except Exception as e:
+            self.metrics.observe("consumer_handler_seconds", time.monotonic() - start, self.labels)
+            logger.error(f"Handler failed for message {message['MessageId']}: {e}")
+            # Stop the heartbeat, the message becomes visible again once its timeout expires
+            with self.lock:
+                self.in_flight.pop(receipt_handle, None)
+            self._count("failed")
+            return False
+        else:
+            self.metrics.observe("consumer_handler_seconds", time.monotonic() - start, self.labels)
+            with self.lock:
+                self.in_flight.pop(receipt_handle, None)
+                self.pending_acks.append(receipt_handle)
+                flush = len(self.pending_acks) >= self.sqs.max_batch_entries
+            self._count("processed")
+
+            if flush:
+                self._flush_acks()
+            return True
+
+    def _flush_acks(self) -> None:
+        with self.lock:
+            receipt_handles, self.pending_acks = self.pending_acks, []
+
+        if receipt_handles:
+            failed = self.sqs.delete_messages(receipt_handles)
+            self._count("deleted", len(receipt_handles) - len(failed))
+
+    def _extend_visibility(self) -> None:
+        now = time.monotonic()
+
+        with self.lock:
+            expiring = [handle for handle, deadline in self.in_flight.items()
+                        if deadline - now < self.visibility_timeout / 2]
+
+        for start in range(0, len(expiring), self.sqs.max_batch_entries):
+            batch = expiring[start:start + self.sqs.max_batch_entries]
+            try:
+                response = self.sqs.sqs_client.change_message_visibility_batch(
+                    QueueUrl=self.sqs.queue_url,
+                    Entries=[{"Id": str(i), "ReceiptHandle": handle, "VisibilityTimeout": self.visibility_timeout}
+                             for i, handle in enumerate(batch)],
+                )
+            except Exception as e:
+                logger.error(f"Visibility heartbeat failed: {e}")
+                continue
+
+            deadline = now + self.visibility_timeout
+            extended = 0
+            with self.lock:
+                for success in response.get("Successful", []):
+                    handle = batch[int(success["Id"])]
+                    if handle in self.in_flight:
+                        self.in_flight[handle] = deadline
+                        extended += 1
+            self._count("extended", extended)
+
+    def _heartbeat(self) -> None:
+        while not self.workers_done.wait(timeout=min(1, self.heartbeat_interval)):
+            self._extend_visibility()
+            self._flush_acks()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def run(self, duration: float = None, max_messages: int = None) -> dict:
+        '''
+        Consume until stop() is called, duration seconds elapse or max_messages
+        messages were handled, then drain the prefetch buffer and flush pending acks.
+        Returns the throughput counters.
+        '''
+        self.max_messages = max_messages
+
+        logger.info(f"Start consumer with {self.num_pollers} pollers and {self.num_workers} workers.")
+        start = time.monotonic()
+        self.deadline = start + duration if duration is not None else None
+
+        pollers = [threading.Thread(target=self._poll, daemon=True) for _ in range(self.num_pollers)]
+        workers = [threading.Thread(target=self._work, args=(index,), daemon=True) for index in range(self.num_workers)]
+        heartbeat = threading.Thread(target=self._heartbeat, daemon=True)
+
+        for thread in pollers + workers + [heartbeat]:
+            thread.start()
+
+        try:
+            self.stop_event.wait(timeout=duration)
+        except KeyboardInterrupt:
+            logger.info("Interrupted, draining consumer ...")
+        finally:
+            self.stop_event.set()
+            stopped = time.monotonic()
+
+            # Graceful drain: stop receiving, finish buffered messages, then acknowledge them.
+            # A poller still blocked in a long poll is not waited for, it releases what it receives.
+            for thread in pollers:
+                thread.join(timeout=max(0, stopped + self.stop_grace - time.monotonic()))
+            self.pollers_done.set()
+
+            for thread in workers:
+                thread.join()
+            self.workers_done.set()
+
+            heartbeat.join()
+            self._flush_acks()
+
+        elapsed = time.monotonic() - start
+        # Throughput over the time messages were received, the drain only finishes them
+        window = stopped - start
+        stats = dict(self.stats, elapsed=elapsed, throughput=self.stats["processed"] / window if window else 0.0)
+
+        logger.info(f"Consumer stopped after {elapsed:.1f}s.")
+        logger.info(f"> Processed : {stats['processed']} ({stats['throughput']:.1f} msgs/s)")
+        logger.info(f"> Failed : {stats['failed']}")
+
+        return stats
+
+class OrderedConsumer(Consumer):
+    '''
+    Consumer for FIFO queues: messages are routed to workers by MessageGroupId, each
+    worker with its own buffer, so different groups are processed in parallel while
+    the messages of a group are handled one at a time, in order.
+    When a message fails, the messages of its group received before the failure are
+    released unprocessed; SQS delivers them again after the failed one.
+    '''
+
+    def __init__(self, sqs, handler, pollers: int = 2, workers: int = 8, prefetch: int = None, heartbeat_interval: float = None):
+        super().__init__(sqs, handler, pollers=pollers, workers=workers, prefetch=prefetch, heartbeat_interval=heartbeat_interval)
+
+        self.buffers = [queue.Queue(maxsize=self.prefetch) for _ in range(self.num_workers)]
+        self.failed_groups = {}     # group -> monotonic time of the last failure
+        self.stats["skipped"] = 0
+
+    def _buffered(self) -> int:
+        return sum(buffer.qsize() for buffer in self.buffers)
+
+    def _dispatch(self, item: tuple) -> None:
+        group = item[1].get("Attributes", {}).get("MessageGroupId", "")
+        self.buffers[zlib.crc32(group.encode("utf-8")) % self.num_workers].put(item)
+
+    def _next(self, index: int) -> tuple:
+        return self.buffers[index].get(timeout=0.1)
+
+    def _release(self, message: dict) -> None:
+        with self.lock:
+            self.in_flight.pop(message["ReceiptHandle"], None)
+        try:
+            self.sqs.sqs_client.change_message_visibility(QueueUrl=self.sqs.queue_url,
+                                                          ReceiptHandle=message["ReceiptHandle"], VisibilityTimeout=0)
+        except Exception as e:
+            logger.error(f"Could not release message {message['MessageId']}: {e}")
+        self._count("skipped")
+
+    def _handle(self, received_at: float, message: dict) -> bool:
+        group = message.get("Attributes", {}).get("MessageGroupId", "")
+
+        # Received before an earlier message of the group failed: handling it now would break the order
+        with self.lock:
+            failed_at = self.failed_groups.get(group)
+        if failed_at is not None and received_at <= failed_at:
+            self._release(message)
+            return False
+
+        if not super()._handle(received_at, message):
+            with self.lock:
+                self.failed_groups[group] = time.monotonic()
+            return False
+
+        # SQS holds back the rest of a group until its in-flight messages are deleted
+        if self._buffered() == 0:
+            self._flush_acks()
+        return True
@@ -1,5 +1,9 @@
-import boto3
-from config.config import Config
+import logging
+
+from config.config import get_config
+from config.clients import get_client
+
+logger = logging.getLogger(__name__)
 
 class ContainerRegistry():
 
@@ -8,16 +12,11 @@ class ContainerRegistry():
         self.repository_arn = None
         self.repository_uri = None
 
-        self.config = Config()
-        self.config.load()
+        self.config = get_config()
 
     def create_client(self) -> None:
-        self.ecr_client = boto3.client("ecr",
-                                        aws_access_key_id=self.config.ACCESS_KEY,
-                                        aws_secret_access_key=self.config.SECRET_KEY,
-                                        region_name=self.config.REGION
-                                       )
-        print("\n    [INFO] Create AWS Elastic Container Registry client. \n")
+        self.ecr_client = get_client("ecr")
+        logger.info("Create AWS Elastic Container Registry client.")
 
     def create_repository(self, repository_name: str) -> None:
         response = self.ecr_client.create_repository(repositoryName=repository_name,
@@ -27,13 +26,13 @@ class ContainerRegistry():
         self.repository_arn = response['repository']['repositoryArn']
         self.repository_uri = response['repository']['repositoryUri']
 
-        print(f"\n    [INFO] Create a ECR repository with name {repository_name}. \n")
-        print("\n           > Repository Arn : " + self.repository_arn)
-        print("\n           > Repository Uri : " + self.repository_uri)
+        logger.info(f"Create a ECR repository with name {repository_name}.")
+        logger.info("> Repository Arn : " + self.repository_arn)
+        logger.info("> Repository Uri : " + self.repository_uri)
 
     def cleanup(self, repository_name: str) -> None:
         if(self.ecr_client):
-            print(f"\n    [INFO] Deleting all images in repository {repository_name}. \n")
+            logger.info(f"Deleting all images in repository {repository_name}.")
             image_ids = self.ecr_client.list_images(repositoryName=repository_name)['imageIds']
             if(len(image_ids) > 0):
                 self.ecr_client.batch_delete_image(
@@ -41,7 +40,7 @@ class ContainerRegistry():
                     imageIds=image_ids
                 )
 
-            print(f"\n    [INFO] Delete repository {repository_name}. \n")
+            logger.info(f"Delete repository {repository_name}.")
             self.ecr_client.delete_repository(repositoryName=repository_name)
         else:
-            print(f"\n    [INFO] No repository {repository_name} to delete. \n")
\ No newline at end of file
+            logger.info(f"No repository {repository_name} to delete.")
\ No newline at end of file
@@ -0,0 +1,103 @@
+import concurrent.futures
+import functools
+import logging
+import threading
+import time
+
+from config.clients import get_client
+
+logger = logging.getLogger(__name__)
+
+class ResourceIndex():
+    '''
+    Cached name -> ARN/ID index of Lambda functions, layers and API Gateway APIs.
+    Each resource kind is listed with paginators, all kinds concurrently, and
+    reloaded once it is older than ttl seconds. Creations and deletions made
+    through this project update the index directly.
+    '''
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+
+        self.loaders = {
+            "functions": self._list_functions,
+            "layers": self._list_layers,
+            "apis": self._list_apis,
+        }
+        self.index = {}         # kind -> {name: record}
+        self.loaded_at = {}     # kind -> monotonic time of the last listing
+        self.lock = threading.Lock()
+
+    def _list_functions(self) -> dict:
+        paginator = get_client("lambda").get_paginator("list_functions")
+        return {function["FunctionName"]: {"FunctionArn": function["FunctionArn"]}
+                for page in paginator.paginate() for function in page["Functions"]}
+
+    def _list_layers(self) -> dict:
+        paginator = get_client("lambda").get_paginator("list_layers")
+        return {layer["LayerName"]: {"LayerArn": layer["LayerArn"]}
+                for page in paginator.paginate() for layer in page["Layers"]}
+
+    def _list_apis(self) -> dict:
+        paginator = get_client("apigatewayv2").get_paginator("get_apis")
+        return {api["Name"]: {"ApiId": api["ApiId"], "ApiEndpoint": api.get("ApiEndpoint")}
+                for page in paginator.paginate() for api in page["Items"]}
+
+    def refresh(self, kinds: list = None) -> None:
+        '''
+        List the given kinds (default: all) concurrently and replace their entries.
+        '''
+        kinds = kinds or list(self.loaders)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(kinds)) as executor:
+            futures = {kind: executor.submit(self.loaders[kind]) for kind in kinds}
+
+        for kind, future in futures.items():
+            try:
+                entries = future.result()
+            except Exception as e:
+                logger.error(f"Could not list {kind}: {e}")
+                continue
+
+            with self.lock:
+                self.index[kind] = entries
+                self.loaded_at[kind] = time.monotonic()
+
+    def _fresh(self, kind: str) -> bool:
+        with self.lock:
+            return kind in self.loaded_at and time.monotonic() - self.loaded_at[kind] < self.ttl
+
+    def all(self, kind: str) -> dict:
+        if not self._fresh(kind):
+            self.refresh([kind])
+        with self.lock:
+            return dict(self.index.get(kind, {}))
+
+    def get(self, kind: str, name: str) -> dict:
+        '''
+        Record of the named resource, or None when it does not exist.
+        '''
+        return self.all(kind).get(name)
+
+    def put(self, kind: str, name: str, record: dict) -> None:
+        with self.lock:
+            self.index.setdefault(kind, {})[name] = record
+
+    def invalidate(self, kind: str = None, name: str = None) -> None:
+        '''
+        Forget one entry, one kind, or everything (the next lookup lists again).
+        '''
+        with self.lock:
+            if kind and name:
+                self.index.get(kind, {}).pop(name, None)
+            elif kind:
+                self.loaded_at.pop(kind, None)
+            else:
+                self.loaded_at.clear()
+
+@functools.lru_cache(maxsize=None)
+def get_resource_index() -> ResourceIndex:
+    '''
+    Process-wide resource index
+    '''
+    return ResourceIndex()
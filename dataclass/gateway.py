@@ -1,8 +1,12 @@
-import boto3
+import logging
 import random
 import string
 
-from config.config import Config
+from config.config import get_config
+from config.clients import get_client
+from dataclass.discovery import get_resource_index
+
+logger = logging.getLogger(__name__)
 
 class Gateway():
     
@@ -19,50 +23,52 @@ class Gateway():
         self.version = "1.0"
 
         # Load environment variables
-        self.config = Config()
-        self.config.load()
+        self.config = get_config()
+        self.index = get_resource_index()
 
     def create_client(self) -> None:
-        self.api_gateway = boto3.client( "apigatewayv2",
-                                         aws_access_key_id=self.config.ACCESS_KEY,
-                                         aws_secret_access_key=self.config.SECRET_KEY,
-                                         region_name=self.config.REGION
-                                       )
-        print("\n    [INFO] Create AWS API Gateway client. \n")
+        self.api_gateway = get_client("apigatewayv2")
+        logger.info("Create AWS API Gateway client.")
 
     def get_lambda_function(self, function_name: str) -> None:
         
-        lambda_client = boto3.client( "lambda",
-                                      aws_access_key_id=self.config.ACCESS_KEY,
-                                      aws_secret_access_key=self.config.SECRET_KEY,
-                                      region_name=self.config.REGION
-                                    )
+        lambda_client = get_client("lambda")
 
         self.lambda_function= lambda_client.get_function(FunctionName=function_name)
         self.lambda_target= self.lambda_function["Configuration"]["FunctionArn"]
 
-        print("\n    [INFO] Get lambda function. \n")
-        print(self.lambda_function)
+        logger.info("Get lambda function.")
+        logger.debug(self.lambda_function)
 
     def create_api(self, api_name : str) -> None:
-        print(f"\n    [INFO] Create API with name {api_name} \n")
-        self.api_gateway_create = self.api_gateway.create_api( Name=api_name,
-                                                          ProtocolType=self.protocol_type,
-                                                          Version=self.version,
-                                                          RouteKey="ANY /", # This will create an API with a single route for all methods
-                                                          Target=self.lambda_target,
-        )
+        '''
+        With a Lambda function (get_lambda_function) the API proxies every route to it.
+        Without one the API starts empty, routes are added with create_sqs_route.
+        '''
+        logger.info(f"Create API with name {api_name}")
+        if self.lambda_target:
+            self.api_gateway_create = self.api_gateway.create_api( Name=api_name,
+                                                              ProtocolType=self.protocol_type,
+                                                              Version=self.version,
+                                                              RouteKey="ANY /", # This will create an API with a single route for all methods
+                                                              Target=self.lambda_target,
+            )
+        else:
+            self.api_gateway_create = self.api_gateway.create_api( Name=api_name,
+                                                              ProtocolType=self.protocol_type,
+                                                              Version=self.version,
+            )
+            # Quick create adds the $default stage, here it has to be created
+            self.api_gateway.create_stage(ApiId=self.api_gateway_create["ApiId"], StageName="$default", AutoDeploy=True)
+
         self.endpoint = self.api_gateway_create["ApiEndpoint"]
+        self.index.put("apis", api_name, {"ApiId": self.api_gateway_create["ApiId"], "ApiEndpoint": self.endpoint})
 
-        print(f'\n    [INFO] Check API Endpoint : {self.endpoint} \n')
+        logger.info(f'Check API Endpoint : {self.endpoint}')
 
     def set_permissions(self, function_name: str) -> None:
-        print(f"\n    [INFO] Set lambda function permissions for API.\n")
-        lambda_client = boto3.client( "lambda",
-                                      aws_access_key_id=self.config.ACCESS_KEY,
-                                      aws_secret_access_key=self.config.SECRET_KEY,
-                                      region_name=self.config.REGION
-                                    )
+        logger.info(f"Set lambda function permissions for API.")
+        lambda_client = get_client("lambda")
         
         api_gateway_permissions = lambda_client.add_permission( FunctionName=function_name,
                                                                        StatementId="api-gateway-permission-statement-" + self.id_num,
@@ -71,9 +77,9 @@ class Gateway():
                                                                      )
         
     def create_route(self, HTTP_method: str, route_key: str ) -> None:
-        print(f"\n    [INFO] Create a route for API \n")
-        print("\n           > HTTP method : " + HTTP_method)
-        print("\n           > Route : " + route_key)
+        logger.info(f"Create a route for API")
+        logger.info("> HTTP method : " + HTTP_method)
+        logger.info("> Route : " + route_key)
         
         # Create an integration between the API Gateway and the Lambda function
         integration_response = self.api_gateway.create_integration(
@@ -92,30 +98,63 @@ class Gateway():
         )
 
 
-    def see_all_gateways(self):
-        response = self.api_gateway.get_apis(MaxResults="2000")
+    def create_sqs_route(self, route_key: str, queue_url: str, credentials_arn: str = None, fifo: bool = False) -> None:
+        '''
+        Route whose requests are sent to the queue by API Gateway itself (SQS-SendMessage
+        integration): the request body becomes the message body, no Lambda invocation is
+        needed to enqueue. credentials_arn is a role API Gateway can assume with
+        sqs:SendMessage on the queue (AWS_GATEWAY_ROLE_ARN by default).
+        On FIFO queues the message group comes from the X-Message-Group-Id header.
+        '''
+        credentials_arn = credentials_arn or self.config.GATEWAY_ROLE_ARN
+        if not credentials_arn:
+            raise ValueError(" No role for the SQS integration, set AWS_GATEWAY_ROLE_ARN or pass credentials_arn.")
+
+        logger.info(f"Create a SQS route for API")
+        logger.info("> Route : " + route_key)
+        logger.info("> Queue : " + queue_url)
+
+        request_parameters = {"QueueUrl": queue_url, "MessageBody": "$request.body"}
+        if fifo:
+            request_parameters["MessageGroupId"] = "$request.header.X-Message-Group-Id"
+
+        integration_response = self.api_gateway.create_integration(
+            ApiId=self.api_gateway_create["ApiId"],
+            IntegrationType="AWS_PROXY",
+            IntegrationSubtype="SQS-SendMessage",   # SendMessageBatch has no integration subtype
+            CredentialsArn=credentials_arn,
+            RequestParameters=request_parameters,
+            PayloadFormatVersion="1.0",             # The only version supported by AWS service integrations
+        )
 
-        print(f"\n    [INFO] See all apis associated to the account id \n")
-        print(f"\n           > APIs : \n")
-        for api in response["Items"]:
-            print(f"             - {api['Name']} ({api['ApiEndpoint']})")
+        self.api_gateway.create_route(
+            ApiId=self.api_gateway_create["ApiId"],
+            RouteKey= route_key,
+            Target=f"integrations/{integration_response['IntegrationId']}",
+        )
+
+    def see_all_gateways(self):
+        # List every page of APIs
+        self.index.refresh(["apis"])
+        apis = self.index.all("apis")
+
+        logger.info(f"See all apis associated to the account id")
+        logger.info(f"> APIs :")
+        for name in sorted(apis):
+            logger.info(f">   - {name} ({apis[name]['ApiEndpoint']})")
     
     def cleanup(self, api_name: str) -> None:
 
         if(self.api_gateway):
-            response = self.api_gateway.get_apis(MaxResults="2000")
-            api_gateway_id = None
-
-            for item in response["Items"]:
-                if item["Name"] == api_name:
-                    api_gateway_id = item["ApiId"]
-                    break
+            api = self.index.get("apis", api_name)
+            api_gateway_id = api["ApiId"] if api else None
 
             # Delete the API Gateway
             if api_gateway_id:
                 self.api_gateway.delete_api(ApiId=api_gateway_id)
-                print(f"\n    [INFO] API Gateway '{api_name}' deleted successfully. \n")
+                self.index.invalidate("apis", api_name)
+                logger.info(f"API Gateway '{api_name}' deleted successfully.")
             else:
-                print(f"\n    [INFO] API Gateway '{api_name}' not found. \n")
+                logger.info(f"API Gateway '{api_name}' not found.")
         else:
-            print(f"\n    [INFO] No gateway to delete. \n")
\ No newline at end of file
+            logger.info(f"No gateway to delete.")
\ No newline at end of file
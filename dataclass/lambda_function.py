@@ -1,8 +1,21 @@
+import base64
+import concurrent.futures
+import hashlib
 import json
-import boto3
-import io
+import logging
+import re
+import threading
+import time
 
-from config.config import Config
+from botocore.exceptions import ClientError
+
+from config.config import get_config
+from config.clients import get_client
+from config.metrics import get_metrics
+from dataclass.concurrency import FunctionError
+from dataclass.discovery import get_resource_index
+
+logger = logging.getLogger(__name__)
 
 class LambdaFunction():
     def __init__(self):
@@ -10,58 +23,140 @@ class LambdaFunction():
         self.content_to_deploy = None
 
         self.layer_version  = None
+        self.event_source_mappings = []     # UUIDs of the event source mappings created by this instance
+        self.codec = None                   # Optional MessageCodec applied to large invoke payloads
+
+        self.reports = []                   # REPORT records of the invocations made with log_tail=True
+        self.reports_lock = threading.Lock()
 
         self.runtime = "python3.12"
 
+        self.index = get_resource_index()
+
         # Load environment variables
-        self.config = Config()
-        self.config.load()
+        self.config = get_config()
 
     def create_client(self) -> None:
-        self.lambda_client = boto3.client( "lambda",
-                                            aws_access_key_id=self.config.ACCESS_KEY,
-                                            aws_secret_access_key=self.config.SECRET_KEY,
-                                            region_name=self.config.REGION
-                                        )
-        print("\n    [INFO] Create AWS lambda client. \n")
+        self.lambda_client = get_client("lambda")
+        logger.info("Create AWS lambda client.")
 
     def read_function(self, compress_filename: str) -> None:
         
         with open(compress_filename, "rb") as f:
             self.content_to_deploy = f.read()
 
-        print("\n    [INFO] Read Content that will be deployed. \n")
-        print(self.content_to_deploy)
+        logger.info("Read Content that will be deployed.")
+        logger.info(f"> Size : {len(self.content_to_deploy)} bytes")
+        logger.info("> CodeSha256 : " + self.code_sha256(self.content_to_deploy))
+
+    def read_package(self, content: bytes) -> None:
+        '''
+        Use a package built in memory (see CompressFile.build) as the content to deploy.
+        '''
+        self.content_to_deploy = content
+
+        logger.info("Read Content that will be deployed.")
+        logger.info(f"> Size : {len(self.content_to_deploy)} bytes")
+        logger.info("> CodeSha256 : " + self.code_sha256(self.content_to_deploy))
+
+    @staticmethod
+    def code_sha256(content: bytes) -> str:
+        '''
+        SHA-256 of a deployment package, encoded the way Lambda reports CodeSha256
+        '''
+        return base64.b64encode(hashlib.sha256(content).digest()).decode("ascii")
+
+    def wait_until_active(self, function_name: str) -> None:
+        '''
+        Block until a new function can be invoked (State == Active).
+        '''
+        self.lambda_client.get_waiter("function_active_v2").wait(FunctionName=function_name)
+        logger.info(f"Lambda function {function_name} is active.")
+
+    def wait_until_updated(self, function_name: str) -> None:
+        '''
+        Block until the last code or configuration update finished (LastUpdateStatus == Successful).
+        '''
+        self.lambda_client.get_waiter("function_updated_v2").wait(FunctionName=function_name)
+
+    def deploy_zip(self, function_handler: str, function_name: str, timeout: int = 15, environment: dict = {},
+                   memory_size: int = 128) -> bool:
+        '''
+        Create the function, or upload the code only if its CodeSha256 differs from the
+        deployed one. Returns True when code was uploaded.
+        '''
+        local_sha256 = self.code_sha256(self.content_to_deploy)
 
-    def create_function_zip(self, function_handler: str, function_name: str, timeout: int = 15, environment: dict = {}) -> None:        
+        try:
+            configuration = self.lambda_client.get_function(FunctionName=function_name)["Configuration"]
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ResourceNotFoundException":
+                raise
+            self.create_function_zip(function_handler=function_handler, function_name=function_name,
+                                     timeout=timeout, environment=environment, memory_size=memory_size)
+            return True
+
+        if configuration["CodeSha256"] == local_sha256:
+            logger.info(f"Function {function_name} is up to date, skip upload.")
+            return False
+
+        # A previous update may still be in progress
+        self.wait_until_updated(function_name)
+        self.lambda_client.update_function_code(FunctionName=function_name, ZipFile=self.content_to_deploy)
+        self.wait_until_updated(function_name)
+
+        logger.info(f"Function {function_name} code updated.")
+        logger.info("> CodeSha256 : " + local_sha256)
+        return True
+
+    def create_function_zip(self, function_handler: str, function_name: str, timeout: int = 15, environment: dict = {},
+                            memory_size: int = 128) -> None:
         lambda_response = self.lambda_client.create_function( FunctionName=function_name,
                                                               Runtime=self.runtime,
                                                               Role=self.config.ROLE_ARN,
                                                               Handler=function_handler, 
                                                               Code={"ZipFile": self.content_to_deploy},
                                                               Timeout = timeout,
+                                                              MemorySize=memory_size,  # CPU is allocated in proportion to memory
                                                               Environment=environment
                                                             )
+        self.index.put("functions", function_name, {"FunctionArn": lambda_response["FunctionArn"]})
 
-        print("\n    [INFO] Function ARN Response: \n")
-        print("\n           > " + lambda_response["FunctionArn"])
+        logger.info("Function ARN Response:")
+        logger.info("> " + lambda_response["FunctionArn"])
 
-    def create_function_image(self, function_name: str, image_uri: str) -> None:        
+    def create_function_image(self, function_name: str, image_uri: str, timeout: int = 30, memory_size: int = 128) -> None:
         lambda_response = self.lambda_client.create_function( FunctionName=function_name,
                                                               PackageType="Image",
                                                               Code={"ImageUri": image_uri},
                                                               Role=self.config.ROLE_ARN,
-                                                              Timeout=30,      # Optional: function timeout in seconds
-                                                              MemorySize=128,  # Optional: function memory size in megabytes
+                                                              Timeout=timeout,            # Optional: function timeout in seconds
+                                                              MemorySize=memory_size,     # Optional: function memory size in megabytes
                                                             )
-        print("\n    [INFO] Function Name: \n")
-        print("\n           > " + lambda_response['FunctionName'])
+        self.index.put("functions", function_name, {"FunctionArn": lambda_response["FunctionArn"]})
+        logger.info("Function Name:")
+        logger.info("> " + lambda_response['FunctionName'])
+
+        logger.info("Function ARN Response:")
+        logger.info("> " + lambda_response["FunctionArn"])
+
+    def get_memory_size(self, function_name: str) -> int:
+        return self.lambda_client.get_function(FunctionName=function_name)["Configuration"]["MemorySize"]
+
+    def set_memory_size(self, function_name: str, memory_size: int) -> None:
+        '''
+        Change the memory (and so the CPU share) of the function and wait for the update.
+        New invocations start in new execution environments.
+        '''
+        # A previous update may still be in progress
+        self.wait_until_updated(function_name)
+        self.lambda_client.update_function_configuration(FunctionName=function_name, MemorySize=memory_size)
+        self.wait_until_updated(function_name)
 
-        print("\n    [INFO] Function ARN Response: \n")
-        print("\n           > " + lambda_response["FunctionArn"])
+        logger.info(f"Function {function_name} memory size set to {memory_size} MB.")
 
     def publish_layer(self, layer_name: str, layer_package: str) -> None:
-        print(f"\n    [INFO] Create a Layer Version with name {layer_name} and package {layer_package}. \n")
+        logger.info(f"Create a Layer Version with name {layer_name} and package {layer_package}.")
 
         with open(layer_package, "rb") as f:
             zip_to_deploy = f.read()
@@ -73,22 +168,22 @@ class LambdaFunction():
         )
         self.layer_version = lambda_response["LayerVersionArn"]
 
-        print("\n           > Layer ARN:\n" + lambda_response["LayerArn"])
-        print("\n           > Layer LayerVersionArn:\n" + lambda_response["LayerVersionArn"])
+        logger.info("> Layer ARN : " + lambda_response["LayerArn"])
+        logger.info("> Layer LayerVersionArn : " + lambda_response["LayerVersionArn"])
 
     def link_layer(self, function_name: str) -> None:
         
-        print("\n    [INFO] Link Layer with the function. \n")
+        logger.info("Link Layer with the function.")
         
         response = self.lambda_client.get_function(FunctionName=function_name)
-        print(response)
+        logger.debug(response)
 
         layers = (
             response["Configuration"]["Layers"] if "Layers" in response["Configuration"] else []
         )
 
-        print("\n    [INFO] Existing Layers: \n")
-        print(layers)
+        logger.info("Existing Layers:")
+        logger.info(f"> Layers : {layers}")
 
         # Append the layer ARN to the existing layers
         if(self.layer_version == None):
@@ -99,76 +194,426 @@ class LambdaFunction():
         lambda_response = self.lambda_client.update_function_configuration(
             FunctionName=function_name, Layers=layers
         )
-        print("\n    [INFO] Lambda response: \n")
-        print(lambda_response)
+        logger.info("Lambda response:")
+        logger.debug(lambda_response)
 
     def set_lambda_limits(self, function_name:str, concurrent_executions: int) -> None:
 
-        print("\n    [INFO] Set lambda function concurrent execution limit: {concurrent_executions} \n")
+        logger.info(f"Set lambda function concurrent execution limit: {concurrent_executions}")
 
         lambda_response = self.lambda_client.put_function_concurrency(
             FunctionName=function_name, ReservedConcurrentExecutions=concurrent_executions
         )
 
         json_formatted_str = json.dumps(lambda_response, indent=2)
-        print("\n           > Response :" + json_formatted_str)
-
-    def check_function(self, function_name: str, input: dict = None) -> None:
+        logger.info("> Response :" + json_formatted_str)
+
+    def publish_version(self, function_name: str, description: str = "") -> str:
+        '''
+        Publish the current code and configuration as an immutable version and return its number.
+        '''
+        self.wait_until_updated(function_name)
+        response = self.lambda_client.publish_version(FunctionName=function_name, Description=description)
+
+        logger.info(f"Published version {response['Version']} of {function_name}.")
+        return response["Version"]
+
+    def set_alias(self, function_name: str, alias_name: str, version: str) -> str:
+        '''
+        Point alias_name to version, creating the alias when needed. Returns the alias ARN.
+        '''
+        try:
+            response = self.lambda_client.create_alias(FunctionName=function_name, Name=alias_name, FunctionVersion=version)
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ResourceConflictException":
+                raise
+            response = self.lambda_client.update_alias(FunctionName=function_name, Name=alias_name, FunctionVersion=version)
+
+        logger.info(f"Alias {function_name}:{alias_name} points to version {version}.")
+        return response["AliasArn"]
+
+    def delete_alias(self, function_name: str, alias_name: str) -> None:
+        self.lambda_client.delete_alias(FunctionName=function_name, Name=alias_name)
+        logger.info(f"Alias {function_name}:{alias_name} deleted.")
+
+    def set_provisioned_concurrency(self, function_name: str, qualifier: str, concurrent_executions: int,
+                                    wait: bool = True, timeout: int = 900) -> None:
+        '''
+        Keep concurrent_executions environments of a version or alias initialized, so
+        invocations through that qualifier skip the cold start. Allocation takes minutes;
+        with wait, block until the configuration is READY.
+        '''
+        logger.info(f"Set provisioned concurrency of {function_name}:{qualifier} to {concurrent_executions}.")
+
+        self.lambda_client.put_provisioned_concurrency_config(FunctionName=function_name, Qualifier=qualifier,
+                                                              ProvisionedConcurrentExecutions=concurrent_executions)
+        if not wait:
+            return
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            response = self.lambda_client.get_provisioned_concurrency_config(FunctionName=function_name, Qualifier=qualifier)
+            if response["Status"] == "READY":
+                logger.info(f"> Allocated : {response['AllocatedProvisionedConcurrentExecutions']}")
+                return
+            if response["Status"] == "FAILED":
+                raise RuntimeError(f" Provisioned concurrency of {function_name}:{qualifier} failed: {response.get('StatusReason')}")
+            time.sleep(5)
+
+        raise TimeoutError(f" Provisioned concurrency of {function_name}:{qualifier} not ready in {timeout}s.")
+
+    def delete_provisioned_concurrency(self, function_name: str, qualifier: str) -> None:
+        self.lambda_client.delete_provisioned_concurrency_config(FunctionName=function_name, Qualifier=qualifier)
+        logger.info(f"Provisioned concurrency of {function_name}:{qualifier} deleted.")
+
+    def _wait_event_source_mapping(self, uuid: str, state = None, timeout: int = 120) -> None:
+        '''
+        Wait until the mapping reaches state (or one of a tuple of states), or until it
+        no longer exists when state is None.
+        '''
+        states = (state,) if isinstance(state, str) else state
+        deadline = time.monotonic() + timeout
+
+        while time.monotonic() < deadline:
+            try:
+                current = self.lambda_client.get_event_source_mapping(UUID=uuid)["State"]
+            except ClientError as e:
+                if state is None and e.response["Error"]["Code"] == "ResourceNotFoundException":
+                    return
+                raise
+
+            if states and current in states:
+                return
+            time.sleep(1)
+
+        raise TimeoutError(f" Event source mapping {uuid} did not reach state {' or '.join(states) if states else 'Deleted'} in {timeout}s.")
+
+    def create_event_source_mapping(self, function_name: str, queue_arn: str, batch_size: int = 10,
+                                    batching_window: int = 0, maximum_concurrency: int = None,
+                                    report_batch_item_failures: bool = True, wait: bool = True) -> str:
+        '''
+        Trigger the function with batches of messages from the queue.
+        Returns the mapping UUID.
+        '''
+        logger.info(f"Create event source mapping between {queue_arn} and {function_name}.")
+
+        kwargs = {"EventSourceArn": queue_arn,
+                  "FunctionName": function_name,
+                  "BatchSize": batch_size,
+                  "MaximumBatchingWindowInSeconds": batching_window,
+                  "FunctionResponseTypes": ["ReportBatchItemFailures"] if report_batch_item_failures else []}
+        if maximum_concurrency:
+            kwargs["ScalingConfig"] = {"MaximumConcurrency": maximum_concurrency}
+
+        lambda_response = self.lambda_client.create_event_source_mapping(**kwargs)
+        uuid = lambda_response["UUID"]
+        self.event_source_mappings.append(uuid)
+
+        if wait:
+            self._wait_event_source_mapping(uuid, state="Enabled")
+
+        logger.info("> UUID : " + uuid)
+        logger.info(f"> Batch size : {batch_size}, batching window : {batching_window}s, maximum concurrency : {maximum_concurrency}")
+        return uuid
+
+    def update_event_source_mapping(self, uuid: str, batch_size: int = None, batching_window: int = None,
+                                    maximum_concurrency: int = None, report_batch_item_failures: bool = None,
+                                    enabled: bool = None, wait: bool = True) -> None:
+        kwargs = {"UUID": uuid}
+        if batch_size is not None:
+            kwargs["BatchSize"] = batch_size
+        if batching_window is not None:
+            kwargs["MaximumBatchingWindowInSeconds"] = batching_window
+        if maximum_concurrency is not None:
+            kwargs["ScalingConfig"] = {"MaximumConcurrency": maximum_concurrency}
+        if report_batch_item_failures is not None:
+            kwargs["FunctionResponseTypes"] = ["ReportBatchItemFailures"] if report_batch_item_failures else []
+        if enabled is not None:
+            kwargs["Enabled"] = enabled
+
+        if enabled is None:
+            # Only settings change: wait for the mapping to settle back in the state it had
+            previous = self.lambda_client.get_event_source_mapping(UUID=uuid)["State"]
+            settled = {"Enabling": "Enabled", "Disabling": "Disabled"}.get(previous, previous)
+            state = settled if settled in ("Enabled", "Disabled") else ("Enabled", "Disabled")
+        else:
+            state = "Enabled" if enabled else "Disabled"
+
+        logger.info(f"Update event source mapping {uuid}: {kwargs}")
+        self.lambda_client.update_event_source_mapping(**kwargs)
+
+        if wait:
+            self._wait_event_source_mapping(uuid, state=state)
+
+    def delete_event_source_mapping(self, uuid: str, wait: bool = True) -> None:
+        self.lambda_client.delete_event_source_mapping(UUID=uuid)
+        if uuid in self.event_source_mappings:
+            self.event_source_mappings.remove(uuid)
+
+        if wait:
+            self._wait_event_source_mapping(uuid)
+
+        logger.info(f"Event source mapping {uuid} deleted successfully.")
+
+    def check_function(self, function_name: str, input: dict = None, log_tail: bool = False, qualifier: str = None,
+                       invoker = None) -> None:
+        '''
+        Invoke the function once and log its response. With an invoker (HedgedInvoker)
+        the call goes through its hedging and circuit breaker instead.
+        '''
+        if invoker:
+            try:
+                result = invoker.invoke(input)
+                logger.info(f"Invoke Function {function_name}(input = {input})")
+                logger.info("> Response :" + json.dumps(result))
+            except Exception as e:
+                logger.error(f"Invoke Function {function_name}()")
+                logger.error(e)
+            return
 
         try:
-            if(not input):
-                response = self.lambda_client.invoke( FunctionName=function_name,
-                                                    InvocationType="RequestResponse",
-                                                    )
-            else:
-                response = self.lambda_client.invoke( FunctionName=function_name,
-                                                      InvocationType="RequestResponse",
-                                                      Payload=json.dumps(input)
-                                                    )
+            response = self.lambda_client.invoke(**self._invoke_kwargs(function_name, input, log_tail, qualifier))
                                                 
             payload = response["Payload"]
 
-            txt = io.BytesIO(payload.read()).read().decode("utf-8")
+            txt = payload.read().decode("utf-8")
+            if self.codec:
+                txt = json.dumps(self._decode_payload(txt))
 
-            print(f"\n    [INFO] Invoke Function {function_name}(input = {input}) \n")
-            print("\n           > Response :" + txt)
+            logger.info(f"Invoke Function {function_name}(input = {input})")
+            logger.info("> Response :" + txt)
+
+            if log_tail:
+                report = self._record_report(function_name, response)
+                logger.info(f"> Report : {json.dumps(report)}")
 
         except Exception as e:
 
-            print(f"\n    [ERROR] Invoke Function {function_name}() \n")
-            print(e)
+            logger.error(f"Invoke Function {function_name}()")
+            logger.error(e)
+
+    def _invoke_kwargs(self, function_name: str, input, log_tail: bool = False, qualifier: str = None) -> dict:
+        kwargs = {"FunctionName": function_name, "InvocationType": "RequestResponse"}
+        if input is not None:
+            kwargs["Payload"] = self._encode_payload(input)
+        if log_tail:
+            kwargs["LogType"] = "Tail"      # Last 4 KB of the execution log, REPORT line included
+        if qualifier:
+            kwargs["Qualifier"] = qualifier
+        return kwargs
+
+    @staticmethod
+    def parse_report(log_result: str) -> dict:
+        '''
+        Parse the REPORT line of a base64 LogResult into a record; init_duration_ms is
+        only present (and cold_start True) when the invocation started a new environment.
+        Returns None when the log tail does not contain the REPORT line.
+        '''
+        log = base64.b64decode(log_result).decode("utf-8", errors="replace")
+        line = next((line for line in reversed(log.splitlines()) if line.startswith("REPORT ")), None)
+        if line is None:
+            return None
+
+        fields = dict(re.findall(r"([A-Za-z ]+): ([^\t]+?)\s*(?:\t|$)", line[len("REPORT "):]))
+        number = lambda name: float(fields[name].split()[0]) if name in fields else None
+
+        return {
+            "request_id": fields.get("RequestId"),
+            "duration_ms": number("Duration"),
+            "billed_duration_ms": number("Billed Duration"),
+            "memory_size_mb": number("Memory Size"),
+            "max_memory_used_mb": number("Max Memory Used"),
+            "init_duration_ms": number("Init Duration"),
+            "cold_start": "Init Duration" in fields,
+        }
+
+    def _record_report(self, function_name: str, response: dict) -> dict:
+        report = self.parse_report(response["LogResult"]) if "LogResult" in response else None
+        if report is None:
+            return None
+
+        report.update(function=function_name, version=response.get("ExecutedVersion"), time=time.time())
+        with self.reports_lock:
+            self.reports.append(report)
+
+        metrics = get_metrics()
+        labels = {"function": function_name}
+        metrics.observe("lambda_duration_seconds", report["duration_ms"] / 1000, labels)
+        if report["cold_start"]:
+            metrics.increment("lambda_cold_starts_total", labels)
+            metrics.observe("lambda_init_seconds", report["init_duration_ms"] / 1000, labels)
+        return report
+
+    def cold_start_summary(self, function_name: str = None) -> dict:
+        '''
+        Cold-start rate and mean durations of the recorded invocations (all functions by default).
+        '''
+        with self.reports_lock:
+            reports = [report for report in self.reports if function_name in (None, report["function"])]
+
+        cold = [report for report in reports if report["cold_start"]]
+        mean = lambda values: sum(values) / len(values) if values else None
+
+        summary = {
+            "invocations": len(reports),
+            "cold_starts": len(cold),
+            "cold_start_rate": len(cold) / len(reports) if reports else None,
+            "mean_duration_ms": mean([report["duration_ms"] for report in reports]),
+            "mean_init_duration_ms": mean([report["init_duration_ms"] for report in cold]),
+            "max_memory_used_mb": max((report["max_memory_used_mb"] or 0 for report in reports), default=None),
+        }
+
+        milliseconds = lambda value: "n/a" if value is None else f"{value:.1f} ms"
+        logger.info(f"Cold starts of {function_name or 'all functions'}:")
+        logger.info(f"> Invocations : {summary['invocations']}, cold starts : {summary['cold_starts']}")
+        logger.info(f"> Mean duration : {milliseconds(summary['mean_duration_ms'])}, mean init duration : {milliseconds(summary['mean_init_duration_ms'])}")
+        return summary
+
+    def _encode_payload(self, input, max_size: int = None) -> str:
+        if self.codec:
+            input = self.codec.encode_payload(input, max_size)
+        return json.dumps(input)
+
+    def _decode_payload(self, payload):
+        result = json.loads(payload or b"null")
+        if self.codec:
+            result = self.codec.decode_payload(result)
+        return result
+
+    def invoke_many(self, function_name: str, inputs, max_in_flight: int = 32, log_tail: bool = False, qualifier: str = None):
+        '''
+        Invoke the function once per input (any iterable, consumed lazily) keeping at most
+        max_in_flight requests in flight, and yield the parsed JSON results as they complete.
+        Failed invocations, handler errors included (FunctionError), yield the exception
+        instead of a result. With log_tail the REPORT line of every invocation is added to self.reports.
+        '''
+        metrics = get_metrics()
+        labels = {"function": function_name}
+
+        def invoke(input):
+            kwargs = self._invoke_kwargs(function_name, input, log_tail, qualifier)
+
+            start = time.monotonic()
+            try:
+                response = self.lambda_client.invoke(**kwargs)
+                result = self._decode_payload(response["Payload"].read())
+            except Exception:
+                metrics.increment("invoker_errors_total", labels)
+                raise
+
+            if log_tail:
+                self._record_report(function_name, response)
+
+            # Unhandled errors come back as HTTP 200 with the FunctionError header
+            if response.get("FunctionError"):
+                metrics.increment("invoker_errors_total", labels)
+                raise FunctionError(f"{function_name}() failed: {json.dumps(result)}")
+
+            metrics.increment("invoker_invocations_total", labels)
+            metrics.observe("invoker_invoke_seconds", time.monotonic() - start, labels)
+            return result
+
+        inputs = iter(inputs)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            in_flight = set()
+
+            while True:
+                # Refill the window, then wait for at least one invocation to finish
+                for input in inputs:
+                    in_flight.add(executor.submit(invoke, input))
+                    if len(in_flight) >= max_in_flight:
+                        break
+
+                if not in_flight:
+                    return
+
+                done, in_flight = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        yield future.result()
+                    except Exception as e:
+                        yield e
+
+    def set_invoke_destination(self, function_name: str, on_success_arn: str = None, on_failure_arn: str = None,
+                               maximum_retry_attempts: int = None) -> None:
+        '''
+        Send the result of asynchronous (Event) invocations to a SQS queue, SNS topic or function.
+        '''
+        destination_config = {}
+        if on_success_arn:
+            destination_config["OnSuccess"] = {"Destination": on_success_arn}
+        if on_failure_arn:
+            destination_config["OnFailure"] = {"Destination": on_failure_arn}
+
+        kwargs = {"FunctionName": function_name, "DestinationConfig": destination_config}
+        if maximum_retry_attempts is not None:
+            kwargs["MaximumRetryAttempts"] = maximum_retry_attempts
+
+        self.lambda_client.put_function_event_invoke_config(**kwargs)
+
+        logger.info(f"Set asynchronous invocation destinations of {function_name}.")
+        logger.info(f"> On success : {on_success_arn}")
+        logger.info(f"> On failure : {on_failure_arn}")
+
+    def invoke_async(self, function_name: str, inputs: list, max_workers: int = 16) -> list:
+        '''
+        Fire-and-forget invocations (InvocationType="Event"), payloads sent as they are.
+        The request id of each Invoke call is its correlation id: it is the requestId of
+        the record delivered to the invoke destination (see SQS.collect_results).
+        Returns one result per input, in input order: {"CorrelationId": ...} once the
+        event is accepted or {"Error": ..., "Message": ...} when the dispatch failed.
+        '''
+        def invoke(input) -> dict:
+            try:
+                response = self.lambda_client.invoke(FunctionName=function_name,
+                                                     InvocationType="Event",
+                                                     # Event payloads have the 256 KB limit of SQS messages, not the 6 MB one
+                                                     Payload=self._encode_payload(input, max_size=self.codec.max_size if self.codec else None))
+            except ClientError as e:
+                return {"Error": e.response["Error"].get("Code"), "Message": e.response["Error"].get("Message")}
+            except Exception as e:
+                return {"Error": type(e).__name__, "Message": str(e)}
+            return {"CorrelationId": response["ResponseMetadata"]["RequestId"]}
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(invoke, inputs))
+
+        failed = sum(1 for result in results if "Error" in result)
+        logger.info(f"Dispatched {len(results) - failed} asynchronous invocations of {function_name}() ({failed} failed).")
+        return results
 
     def see_all_lambda_functions(self) -> None:
-        response = self.lambda_client.list_functions(MaxItems=1000)
-        functions = response["Functions"]
+        # List every page, not only the first 1000 functions
+        self.index.refresh(["functions"])
+        functions = self.index.all("functions")
 
-        print(f"\n    [INFO] See all lambda functions associated to the account id \n")
-        print(f"\n           > You have {len(functions)} Lambda functions")
-        print(f"\n           > Functions names:")
+        logger.info(f"See all lambda functions associated to the account id")
+        logger.info(f"> You have {len(functions)} Lambda functions")
+        logger.info(f"> Functions names:")
 
-        for function in functions:
-            function_name = function["FunctionName"]
-            print(f"           {function_name}")
+        for function_name in sorted(functions):
+            logger.info(f">   - {function_name}")
 
     def _delete_function(self, function_name: str) -> None:
 
         if(self.lambda_client):
             self.lambda_client.delete_function(FunctionName=function_name)
-            print(f"\n    [INFO] Lambda function {function_name} deleted successfully. \n")
+            self.index.invalidate("functions", function_name)
+            logger.info(f"Lambda function {function_name} deleted successfully.")
         else:
-            print(f"\n    [INFO] No Lambda function to delete. \n")
+            logger.info(f"No Lambda function to delete.")
 
     def _delete_layer(self, layer_name: str = None) -> None:
         if(self.lambda_client):
             if(layer_name != None):
-                # Fetch the layer version ARN based on the layer name
-                response = self.lambda_client.list_layer_versions(
-                    CompatibleRuntime= self.runtime,  # Provide the compatible runtime of the layer
-                    LayerName=layer_name,             # Must be the same runtime as lambda function
-                )
+                # Fetch the layer version ARNs based on the layer name, across all pages
+                paginator = self.lambda_client.get_paginator("list_layer_versions")
+                layer_versions = [version
+                                  for page in paginator.paginate(CompatibleRuntime= self.runtime,  # Provide the compatible runtime of the layer
+                                                                 LayerName=layer_name)             # Must be the same runtime as lambda function
+                                  for version in page["LayerVersions"]]
 
-            if  layer_name != None and "LayerVersions" in response:
-                layer_versions = response["LayerVersions"]
+            if  layer_name != None and layer_versions:
 
                 # Delete each layer version
                 for version in layer_versions:
@@ -176,14 +621,20 @@ class LambdaFunction():
                         LayerName=layer_name, VersionNumber=version["Version"]
                     )
 
-                print(f"\n    [INFO] Deleted all versions of layer '{layer_name}'. \n")
+                self.index.invalidate("layers", layer_name)
+                logger.info(f"Deleted all versions of layer '{layer_name}'.")
             else:
-                print(f"\n    [INFO] No layer with the name '{layer_name}' found. \n")
+                logger.info(f"No layer with the name '{layer_name}' found.")
         else:
-            print(f"\n    [INFO] No Layer to delete. \n")
+            logger.info(f"No Layer to delete.")
 
     def cleanup(self, function_name: str, layer_name: str = None) -> None:
 
+        # Delete the event source mappings, they would keep polling the queue
+        if(self.lambda_client):
+            for uuid in list(self.event_source_mappings):
+                self.delete_event_source_mapping(uuid)
+
         # Delete the Lambda function
         self._delete_function(function_name = function_name)
 
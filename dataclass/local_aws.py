@@ -0,0 +1,1018 @@
+import base64
+import builtins
+import concurrent.futures
+import datetime
+import hashlib
+import io
+import json
+import logging
+import os
+import queue
+import resource
+import threading
+import time
+import uuid
+import zipfile
+
+from botocore.exceptions import ClientError
+
+from config.clients import register_client
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_ID = "000000000000"
+REGION = "local"
+
+def _error(code: str, message: str, operation: str, status: int = 400) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": message},
+                        "ResponseMetadata": {"HTTPStatusCode": status}}, operation)
+
+class LocalQueue():
+
+    def __init__(self, name: str, attributes: dict):
+        self.name = name
+        self.url = f"http://localhost/{ACCOUNT_ID}/{name}"
+        self.arn = f"arn:aws:sqs:{REGION}:{ACCOUNT_ID}:{name}"
+
+        self.attributes = {"VisibilityTimeout": "30", "DelaySeconds": "0", "MessageRetentionPeriod": "345600"}
+        self.attributes.update(attributes or {})
+
+        self.messages = []      # Ordered by send time
+        self.condition = threading.Condition()
+
+        self.fifo = self.attributes.get("FifoQueue") == "true"
+        self.deduplication = {}     # deduplication key -> (expiration time, MessageId)
+        self.sequence_number = 0
+
+    def counts(self, now: float) -> tuple:
+        visible = sum(1 for message in self.messages if message["visible_at"] <= now)
+        delayed = sum(1 for message in self.messages if message["visible_at"] > now and message["receipt_handle"] is None)
+        return visible, len(self.messages) - visible - delayed, delayed
+
+class LocalSQSClient():
+    '''
+    In-memory implementation of the subset of the boto3 "sqs" client used by this project.
+    '''
+
+    max_message_bytes = 256 * 1024
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.queues = {}        # url -> LocalQueue
+        self.lock = threading.Lock()
+
+    def _queue(self, url: str, operation: str) -> LocalQueue:
+        with self.lock:
+            if url not in self.queues:
+                raise _error("AWS.SimpleQueueService.NonExistentQueue", f"Queue {url} does not exist", operation)
+            return self.queues[url]
+
+    def queue_by_arn(self, arn: str) -> LocalQueue:
+        with self.lock:
+            for local_queue in self.queues.values():
+                if local_queue.arn == arn:
+                    return local_queue
+        raise _error("AWS.SimpleQueueService.NonExistentQueue", f"Queue {arn} does not exist", "GetQueueUrl")
+
+    def create_queue(self, QueueName: str, Attributes: dict = None, **kwargs) -> dict:
+        if ((Attributes or {}).get("FifoQueue") == "true") != QueueName.endswith(".fifo"):
+            raise _error("InvalidParameterValue", "The name of a FIFO queue can only include alphanumeric characters, "
+                         "hyphens, or underscores, must end with .fifo suffix.", "CreateQueue")
+
+        local_queue = LocalQueue(QueueName, Attributes)
+        with self.lock:
+            self.queues.setdefault(local_queue.url, local_queue)
+        return {"QueueUrl": local_queue.url}
+
+    def get_queue_url(self, QueueName: str, **kwargs) -> dict:
+        with self.lock:
+            for local_queue in self.queues.values():
+                if local_queue.name == QueueName:
+                    return {"QueueUrl": local_queue.url}
+        raise _error("AWS.SimpleQueueService.NonExistentQueue", f"Queue {QueueName} does not exist", "GetQueueUrl")
+
+    def delete_queue(self, QueueUrl: str) -> dict:
+        local_queue = self._queue(QueueUrl, "DeleteQueue")
+        with self.lock:
+            self.queues.pop(QueueUrl, None)
+        with local_queue.condition:
+            local_queue.condition.notify_all()
+        return {}
+
+    def purge_queue(self, QueueUrl: str) -> dict:
+        local_queue = self._queue(QueueUrl, "PurgeQueue")
+        with local_queue.condition:
+            local_queue.messages.clear()
+        return {}
+
+    def get_queue_attributes(self, QueueUrl: str, AttributeNames: list = None) -> dict:
+        local_queue = self._queue(QueueUrl, "GetQueueAttributes")
+        with local_queue.condition:
+            visible, not_visible, delayed = local_queue.counts(time.time())
+
+        attributes = dict(local_queue.attributes,
+                          QueueArn=local_queue.arn,
+                          ApproximateNumberOfMessages=str(visible),
+                          ApproximateNumberOfMessagesNotVisible=str(not_visible),
+                          ApproximateNumberOfMessagesDelayed=str(delayed))
+
+        if AttributeNames and "All" not in AttributeNames:
+            attributes = {name: value for name, value in attributes.items() if name in AttributeNames}
+        return {"Attributes": attributes}
+
+    def _deduplicate(self, local_queue: LocalQueue, body: str, group_id: str, deduplication_id: str, now: float) -> tuple:
+        '''
+        FIFO checks. Returns (deduplication key, MessageId of the duplicate already sent or None).
+        '''
+        if not group_id:
+            raise _error("MissingParameter", "The request must contain the parameter MessageGroupId.", "SendMessage")
+
+        if not deduplication_id:
+            if local_queue.attributes.get("ContentBasedDeduplication") != "true":
+                raise _error("InvalidParameterValue", "The queue should either have ContentBasedDeduplication enabled "
+                             "or MessageDeduplicationId provided explicitly", "SendMessage")
+            deduplication_id = hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+        key = (group_id, deduplication_id) if local_queue.attributes.get("DeduplicationScope") == "messageGroup" else deduplication_id
+        expires_at, message_id = local_queue.deduplication.get(key, (0, None))
+        return key, message_id if expires_at > now else None
+
+    def _enqueue(self, local_queue: LocalQueue, body: str, message_attributes: dict = None, delay_seconds: int = None,
+                 group_id: str = None, deduplication_id: str = None) -> dict:
+        if len(body.encode("utf-8")) > self.max_message_bytes:
+            raise _error("InvalidParameterValue", "Message must be shorter than 262144 bytes.", "SendMessage")
+
+        delay = int(local_queue.attributes["DelaySeconds"] if delay_seconds is None else delay_seconds)
+        now = time.time()
+        message = {
+            "MessageId": str(uuid.uuid4()),
+            "Body": body,
+            "MD5OfBody": hashlib.md5(body.encode("utf-8")).hexdigest(),
+            "MessageAttributes": message_attributes or {},
+            "sent_at": now,
+            "visible_at": now + delay,
+            "receipt_handle": None,
+            "receive_count": 0,
+            "group_id": group_id,
+        }
+
+        with local_queue.condition:
+            if local_queue.fifo:
+                # Messages sent again within the 5 minutes deduplication interval are accepted but not delivered twice
+                key, duplicate_id = self._deduplicate(local_queue, body, group_id, deduplication_id, now)
+                if duplicate_id:
+                    return {"MessageId": duplicate_id, "MD5OfMessageBody": message["MD5OfBody"]}
+
+                local_queue.deduplication[key] = (now + 300, message["MessageId"])
+                local_queue.sequence_number += 1
+                message["sequence_number"] = str(local_queue.sequence_number).zfill(20)
+
+            local_queue.messages.append(message)
+            local_queue.condition.notify_all()
+
+        response = {"MessageId": message["MessageId"], "MD5OfMessageBody": message["MD5OfBody"]}
+        if local_queue.fifo:
+            response["SequenceNumber"] = message["sequence_number"]
+        return response
+
+    def send_message(self, QueueUrl: str, MessageBody: str, MessageAttributes: dict = None, DelaySeconds: int = None,
+                     MessageGroupId: str = None, MessageDeduplicationId: str = None, **kwargs) -> dict:
+        return self._enqueue(self._queue(QueueUrl, "SendMessage"), MessageBody, MessageAttributes, DelaySeconds,
+                             MessageGroupId, MessageDeduplicationId)
+
+    def send_message_batch(self, QueueUrl: str, Entries: list) -> dict:
+        local_queue = self._queue(QueueUrl, "SendMessageBatch")
+        if len(Entries) > 10:
+            raise _error("AWS.SimpleQueueService.TooManyEntriesInBatchRequest", "Maximum number of entries per request are 10.", "SendMessageBatch")
+        if sum(len(entry["MessageBody"].encode("utf-8")) for entry in Entries) > self.max_message_bytes:
+            raise _error("AWS.SimpleQueueService.BatchRequestTooLong", "Batch requests cannot be longer than 262144 bytes.", "SendMessageBatch")
+
+        successful, failed = [], []
+        for entry in Entries:
+            try:
+                response = self._enqueue(local_queue, entry["MessageBody"], entry.get("MessageAttributes"), entry.get("DelaySeconds"),
+                                         entry.get("MessageGroupId"), entry.get("MessageDeduplicationId"))
+            except ClientError as e:
+                failed.append({"Id": entry["Id"], "SenderFault": True, "Code": e.response["Error"]["Code"],
+                               "Message": e.response["Error"]["Message"]})
+                continue
+            successful.append(dict(response, Id=entry["Id"]))
+        return {"Successful": successful, "Failed": failed}
+
+    def receive_message(self, QueueUrl: str, MaxNumberOfMessages: int = 1, VisibilityTimeout: int = None,
+                        WaitTimeSeconds: int = 0, **kwargs) -> dict:
+        local_queue = self._queue(QueueUrl, "ReceiveMessage")
+        visibility_timeout = int(local_queue.attributes["VisibilityTimeout"] if VisibilityTimeout is None else VisibilityTimeout)
+        deadline = time.time() + (WaitTimeSeconds or 0)
+
+        with local_queue.condition:
+            while True:
+                now = time.time()
+                received = []
+
+                # FIFO: a group with a message in flight (or delayed) delivers nothing else until it is deleted
+                blocked = {message["group_id"] for message in local_queue.messages
+                           if message["visible_at"] > now} if local_queue.fifo else set()
+
+                for message in local_queue.messages:
+                    if len(received) == MaxNumberOfMessages:
+                        break
+                    if message["visible_at"] <= now and message["group_id"] not in blocked:
+                        message["receipt_handle"] = str(uuid.uuid4())
+                        message["visible_at"] = now + visibility_timeout
+                        message["receive_count"] += 1
+                        received.append(message)
+
+                if received or now >= deadline or QueueUrl not in self.queues:
+                    break
+
+                # Wake up on new messages or when an invisible message may become visible again
+                local_queue.condition.wait(timeout=min(deadline - now, 0.05))
+
+        messages = []
+        for message in received:
+            messages.append({
+                "MessageId": message["MessageId"],
+                "ReceiptHandle": message["receipt_handle"],
+                "MD5OfBody": message["MD5OfBody"],
+                "Body": message["Body"],
+                "Attributes": dict({"SentTimestamp": str(int(message["sent_at"] * 1000)),
+                                    "ApproximateReceiveCount": str(message["receive_count"])},
+                                   **({"MessageGroupId": message["group_id"], "SequenceNumber": message["sequence_number"]}
+                                      if local_queue.fifo else {})),
+                **({"MessageAttributes": message["MessageAttributes"]} if message["MessageAttributes"] else {}),
+            })
+
+        return {"Messages": messages} if messages else {}
+
+    def _find(self, local_queue: LocalQueue, receipt_handle: str) -> dict:
+        for message in local_queue.messages:
+            if message["receipt_handle"] == receipt_handle:
+                return message
+        return None
+
+    def delete_message(self, QueueUrl: str, ReceiptHandle: str) -> dict:
+        local_queue = self._queue(QueueUrl, "DeleteMessage")
+        with local_queue.condition:
+            message = self._find(local_queue, ReceiptHandle)
+            if message:
+                local_queue.messages.remove(message)
+        return {}
+
+    def delete_message_batch(self, QueueUrl: str, Entries: list) -> dict:
+        local_queue = self._queue(QueueUrl, "DeleteMessageBatch")
+        successful, failed = [], []
+
+        with local_queue.condition:
+            for entry in Entries:
+                message = self._find(local_queue, entry["ReceiptHandle"])
+                if message:
+                    local_queue.messages.remove(message)
+                    successful.append({"Id": entry["Id"]})
+                else:
+                    failed.append({"Id": entry["Id"], "SenderFault": True, "Code": "ReceiptHandleIsInvalid"})
+
+        return {"Successful": successful, "Failed": failed}
+
+    def change_message_visibility(self, QueueUrl: str, ReceiptHandle: str, VisibilityTimeout: int) -> dict:
+        response = self.change_message_visibility_batch(QueueUrl, [{"Id": "0", "ReceiptHandle": ReceiptHandle, "VisibilityTimeout": VisibilityTimeout}])
+        if response["Failed"]:
+            raise _error("ReceiptHandleIsInvalid", "The receipt handle is not valid.", "ChangeMessageVisibility")
+        return {}
+
+    def change_message_visibility_batch(self, QueueUrl: str, Entries: list) -> dict:
+        local_queue = self._queue(QueueUrl, "ChangeMessageVisibilityBatch")
+        successful, failed = [], []
+
+        with local_queue.condition:
+            for entry in Entries:
+                message = self._find(local_queue, entry["ReceiptHandle"])
+                if message and message["visible_at"] > time.time():
+                    message["visible_at"] = time.time() + int(entry["VisibilityTimeout"])
+                    successful.append({"Id": entry["Id"]})
+                else:
+                    failed.append({"Id": entry["Id"], "SenderFault": True, "Code": "MessageNotInflight"})
+            local_queue.condition.notify_all()
+
+        return {"Successful": successful, "Failed": failed}
+
+class LocalPaginator():
+    '''
+    Local listings fit in a single page.
+    '''
+
+    def __init__(self, operation):
+        self.operation = operation
+
+    def paginate(self, **kwargs):
+        yield self.operation(**kwargs)
+
+class LocalWaiter():
+    '''
+    Local functions are active and updated as soon as the call returns,
+    so waiting only checks that the function exists.
+    '''
+
+    def __init__(self, client, waiter_name: str):
+        self.client = client
+        self.waiter_name = waiter_name
+
+    def wait(self, FunctionName: str, **kwargs) -> None:
+        self.client.get_function(FunctionName=FunctionName)
+
+class LocalContext():
+    '''
+    Minimal Lambda context object passed to the handlers.
+    '''
+
+    def __init__(self, function: dict, request_id: str = None):
+        self.function_name = function["FunctionName"]
+        self.function_version = function.get("Version", "$LATEST")
+        self.invoked_function_arn = function["FunctionArn"]
+        self.memory_limit_in_mb = function["MemorySize"]
+        self.aws_request_id = request_id or str(uuid.uuid4())
+        self.deadline = time.time() + function["Timeout"]
+
+    def get_remaining_time_in_millis(self) -> int:
+        return max(0, int((self.deadline - time.time()) * 1000))
+
+class LocalLambdaClient():
+    '''
+    In-memory implementation of the subset of the boto3 "lambda" client used by this project.
+    Handlers are loaded from the deployment zip and run on the engine worker pool,
+    throttled by reserved and account concurrency. Every function keeps a pool of warm
+    environments: an invocation that finds none runs the module initialization again
+    and reports an Init Duration, like a cold start.
+    '''
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.functions = {}         # name -> configuration and loaded handler
+        self.mappings = {}          # uuid -> event source mapping
+        self.invoke_configs = {}    # name -> asynchronous invocation destinations
+        self.versions = {}          # name -> {version: published snapshot of the function}
+        self.aliases = {}           # name -> {alias: alias configuration}
+        self.provisioned = {}       # (name, qualifier) -> provisioned concurrency configuration
+        self.lock = threading.Lock()
+
+        self.running = {}           # name -> executions in progress
+        self.running_total = 0
+
+        self.event_queue = queue.Queue()
+        self.stopped = threading.Event()
+        self.dispatcher = threading.Thread(target=self._dispatch_events, daemon=True)
+        self.dispatcher.start()
+
+    def _function(self, name: str, operation: str) -> dict:
+        with self.lock:
+            if name not in self.functions:
+                raise _error("ResourceNotFoundException", f"Function not found: {name}", operation, status=404)
+            return self.functions[name]
+
+    def _resolve(self, name: str, qualifier: str, operation: str) -> dict:
+        '''
+        Function, published version or alias target named by qualifier.
+        '''
+        function = self._function(name, operation)
+        if qualifier in (None, "$LATEST"):
+            return function
+
+        with self.lock:
+            alias = self.aliases.get(name, {}).get(qualifier)
+            version = alias["FunctionVersion"] if alias else qualifier
+            if version == "$LATEST":
+                return function
+            if version not in self.versions.get(name, {}):
+                raise _error("ResourceNotFoundException", f"Function not found: {name}:{qualifier}", operation, status=404)
+            return self.versions[name][version]
+
+    def _load_handler(self, function: dict):
+        '''
+        Execute the handler module from the zip with "boto3" and "os" imports
+        redirected to the engine clients and the function environment.
+        '''
+        module_name, handler_name = function["Handler"].rsplit(".", 1)
+
+        with zipfile.ZipFile(io.BytesIO(function["zip"])) as zf:
+            source = zf.read(module_name.replace(".", "/") + ".py")
+
+        engine = self.engine
+        environment = dict(os.environ, **function["Environment"].get("Variables", {}))
+
+        class Boto3Shim():
+            def client(self, service: str, *args, **kwargs):
+                return engine.client(service)
+
+        class OsShim():
+            environ = environment
+
+            def getenv(self, key, default=None):
+                return environment.get(key, default)
+
+            def __getattr__(self, name):
+                return getattr(os, name)
+
+        shims = {"boto3": Boto3Shim(), "os": OsShim()}
+
+        def _import(name, globals=None, locals=None, fromlist=(), level=0):
+            if name in shims:
+                return shims[name]
+            return builtins.__import__(name, globals, locals, fromlist, level)
+
+        namespace = {"__name__": module_name, "__builtins__": dict(vars(builtins), __import__=_import)}
+        exec(compile(source, f"{module_name}.py", "exec"), namespace)
+        return namespace[handler_name]
+
+    def _configuration(self, function: dict) -> dict:
+        return {key: value for key, value in function.items() if key not in ("zip", "handler", "warm")}
+
+    def create_function(self, FunctionName: str, Handler: str = None, Code: dict = None, Role: str = None,
+                        Runtime: str = None, Timeout: int = 3, MemorySize: int = 128, Environment: dict = None,
+                        PackageType: str = "Zip", **kwargs) -> dict:
+        if PackageType != "Zip" or "ZipFile" not in (Code or {}):
+            raise _error("InvalidParameterValueException", "Only zip packages are supported locally.", "CreateFunction")
+
+        with self.lock:
+            if FunctionName in self.functions:
+                raise _error("ResourceConflictException", f"Function already exist: {FunctionName}", "CreateFunction", status=409)
+
+        function = {
+            "FunctionName": FunctionName,
+            "FunctionArn": f"arn:aws:lambda:{REGION}:{ACCOUNT_ID}:function:{FunctionName}",
+            "Runtime": Runtime,
+            "Role": Role,
+            "Handler": Handler,
+            "Timeout": Timeout,
+            "MemorySize": MemorySize,
+            "Environment": Environment or {},
+            "CodeSha256": base64.b64encode(hashlib.sha256(Code["ZipFile"]).digest()).decode(),
+            "CodeSize": len(Code["ZipFile"]),
+            "State": "Active",
+            "LastUpdateStatus": "Successful",
+            "ReservedConcurrentExecutions": None,
+            "Version": "$LATEST",
+            "zip": Code["ZipFile"],
+            "warm": 0,              # Idle initialized environments
+        }
+        function["handler"] = self._load_handler(function)
+
+        with self.lock:
+            self.functions[FunctionName] = function
+            self.running[FunctionName] = 0
+
+        return self._configuration(function)
+
+    def update_function_code(self, FunctionName: str, ZipFile: bytes, **kwargs) -> dict:
+        function = self._function(FunctionName, "UpdateFunctionCode")
+        updated = dict(function, zip=ZipFile, CodeSize=len(ZipFile), warm=0,
+                       CodeSha256=base64.b64encode(hashlib.sha256(ZipFile).digest()).decode())
+        updated["handler"] = self._load_handler(updated)
+
+        with self.lock:
+            self.functions[FunctionName] = updated
+        return self._configuration(updated)
+
+    def update_function_configuration(self, FunctionName: str, **kwargs) -> dict:
+        function = self._function(FunctionName, "UpdateFunctionConfiguration")
+        updated = dict(function, warm=0, **kwargs)
+        if "Environment" in kwargs or "Handler" in kwargs:
+            updated["handler"] = self._load_handler(updated)
+
+        with self.lock:
+            self.functions[FunctionName] = updated
+        return self._configuration(updated)
+
+    def get_function(self, FunctionName: str, **kwargs) -> dict:
+        function = self._function(FunctionName, "GetFunction")
+        response = {"Configuration": self._configuration(function), "Code": {"RepositoryType": "Local"}}
+        if function["ReservedConcurrentExecutions"] is not None:
+            response["Concurrency"] = {"ReservedConcurrentExecutions": function["ReservedConcurrentExecutions"]}
+        return response
+
+    def list_functions(self, **kwargs) -> dict:
+        with self.lock:
+            return {"Functions": [self._configuration(function) for function in self.functions.values()]}
+
+    def list_layers(self, **kwargs) -> dict:
+        return {"Layers": []}
+
+    def list_layer_versions(self, LayerName: str, **kwargs) -> dict:
+        return {"LayerVersions": []}
+
+    def get_paginator(self, operation_name: str):
+        return LocalPaginator(getattr(self, operation_name))
+
+    def get_waiter(self, waiter_name: str):
+        return LocalWaiter(self, waiter_name)
+
+    def publish_version(self, FunctionName: str, Description: str = "", **kwargs) -> dict:
+        function = self._function(FunctionName, "PublishVersion")
+        with self.lock:
+            versions = self.versions.setdefault(FunctionName, {})
+            version = str(len(versions) + 1)
+            versions[version] = dict(function, Version=version, Description=Description, warm=0,
+                                     FunctionArn=f"{function['FunctionArn']}:{version}")
+            return self._configuration(versions[version])
+
+    def _alias(self, FunctionName: str, Name: str, FunctionVersion: str, Description: str = "") -> dict:
+        return {"AliasArn": f"arn:aws:lambda:{REGION}:{ACCOUNT_ID}:function:{FunctionName}:{Name}",
+                "Name": Name, "FunctionVersion": FunctionVersion, "Description": Description}
+
+    def create_alias(self, FunctionName: str, Name: str, FunctionVersion: str, Description: str = "", **kwargs) -> dict:
+        self._resolve(FunctionName, FunctionVersion, "CreateAlias")
+        with self.lock:
+            aliases = self.aliases.setdefault(FunctionName, {})
+            if Name in aliases:
+                raise _error("ResourceConflictException", f"Alias already exists: {Name}", "CreateAlias", status=409)
+            aliases[Name] = self._alias(FunctionName, Name, FunctionVersion, Description)
+            return dict(aliases[Name])
+
+    def update_alias(self, FunctionName: str, Name: str, FunctionVersion: str = None, **kwargs) -> dict:
+        alias = self.get_alias(FunctionName, Name)
+        if FunctionVersion:
+            self._resolve(FunctionName, FunctionVersion, "UpdateAlias")
+        with self.lock:
+            self.aliases[FunctionName][Name] = self._alias(FunctionName, Name, FunctionVersion or alias["FunctionVersion"],
+                                                           kwargs.get("Description", alias["Description"]))
+            return dict(self.aliases[FunctionName][Name])
+
+    def get_alias(self, FunctionName: str, Name: str) -> dict:
+        self._function(FunctionName, "GetAlias")
+        with self.lock:
+            if Name not in self.aliases.get(FunctionName, {}):
+                raise _error("ResourceNotFoundException", f"Alias not found: {Name}", "GetAlias", status=404)
+            return dict(self.aliases[FunctionName][Name])
+
+    def delete_alias(self, FunctionName: str, Name: str) -> dict:
+        self.get_alias(FunctionName, Name)
+        with self.lock:
+            self.aliases[FunctionName].pop(Name)
+            self.provisioned.pop((FunctionName, Name), None)
+        return {}
+
+    def put_provisioned_concurrency_config(self, FunctionName: str, Qualifier: str, ProvisionedConcurrentExecutions: int) -> dict:
+        if Qualifier == "$LATEST":
+            raise _error("InvalidParameterValueException", "Provisioned concurrency needs a version or an alias.",
+                         "PutProvisionedConcurrencyConfig")
+        target = self._resolve(FunctionName, Qualifier, "PutProvisionedConcurrencyConfig")
+
+        with self.lock:
+            previous = self.provisioned.get((FunctionName, Qualifier), {}).get("AllocatedProvisionedConcurrentExecutions", 0)
+            # Provisioned environments are initialized ahead of the invocations
+            target["warm"] = max(0, target["warm"] - previous) + ProvisionedConcurrentExecutions
+            self.provisioned[(FunctionName, Qualifier)] = {
+                "RequestedProvisionedConcurrentExecutions": ProvisionedConcurrentExecutions,
+                "AvailableProvisionedConcurrentExecutions": ProvisionedConcurrentExecutions,
+                "AllocatedProvisionedConcurrentExecutions": ProvisionedConcurrentExecutions,
+                "Status": "READY",
+            }
+            return dict(self.provisioned[(FunctionName, Qualifier)])
+
+    def get_provisioned_concurrency_config(self, FunctionName: str, Qualifier: str) -> dict:
+        with self.lock:
+            if (FunctionName, Qualifier) not in self.provisioned:
+                raise _error("ProvisionedConcurrencyConfigNotFoundException", f"No provisioned concurrency for {FunctionName}:{Qualifier}",
+                             "GetProvisionedConcurrencyConfig", status=404)
+            return dict(self.provisioned[(FunctionName, Qualifier)])
+
+    def delete_provisioned_concurrency_config(self, FunctionName: str, Qualifier: str) -> dict:
+        configuration = self.get_provisioned_concurrency_config(FunctionName, Qualifier)
+        target = self._resolve(FunctionName, Qualifier, "DeleteProvisionedConcurrencyConfig")
+        with self.lock:
+            target["warm"] = max(0, target["warm"] - configuration["AllocatedProvisionedConcurrentExecutions"])
+            self.provisioned.pop((FunctionName, Qualifier), None)
+        return {}
+
+    def delete_function(self, FunctionName: str, **kwargs) -> dict:
+        self._function(FunctionName, "DeleteFunction")
+        with self.lock:
+            self.functions.pop(FunctionName)
+            self.versions.pop(FunctionName, None)
+            self.aliases.pop(FunctionName, None)
+            self.provisioned = {key: value for key, value in self.provisioned.items() if key[0] != FunctionName}
+            for mapping in self.mappings.values():
+                if mapping["FunctionName"] == FunctionName:
+                    mapping["stop"].set()
+        return {}
+
+    def add_permission(self, FunctionName: str, StatementId: str, **kwargs) -> dict:
+        self._function(FunctionName, "AddPermission")
+        return {"Statement": json.dumps(dict(kwargs, Sid=StatementId))}
+
+    def put_function_concurrency(self, FunctionName: str, ReservedConcurrentExecutions: int) -> dict:
+        function = self._function(FunctionName, "PutFunctionConcurrency")
+        with self.lock:
+            function["ReservedConcurrentExecutions"] = ReservedConcurrentExecutions
+        return {"ReservedConcurrentExecutions": ReservedConcurrentExecutions}
+
+    def get_function_concurrency(self, FunctionName: str) -> dict:
+        function = self._function(FunctionName, "GetFunctionConcurrency")
+        if function["ReservedConcurrentExecutions"] is None:
+            return {}
+        return {"ReservedConcurrentExecutions": function["ReservedConcurrentExecutions"]}
+
+    def delete_function_concurrency(self, FunctionName: str) -> dict:
+        function = self._function(FunctionName, "DeleteFunctionConcurrency")
+        with self.lock:
+            function["ReservedConcurrentExecutions"] = None
+        return {}
+
+    def put_function_event_invoke_config(self, FunctionName: str, DestinationConfig: dict = None, **kwargs) -> dict:
+        function = self._function(FunctionName, "PutFunctionEventInvokeConfig")
+        with self.lock:
+            self.invoke_configs[FunctionName] = DestinationConfig or {}
+        return {"FunctionArn": function["FunctionArn"], "DestinationConfig": DestinationConfig or {}}
+
+    def get_account_settings(self) -> dict:
+        with self.lock:
+            reserved = sum(function["ReservedConcurrentExecutions"] or 0 for function in self.functions.values())
+        return {"AccountLimit": {"ConcurrentExecutions": self.engine.account_concurrency,
+                                 "UnreservedConcurrentExecutions": self.engine.account_concurrency - reserved}}
+
+    def _try_acquire(self, function: dict, count_throttle: bool = True) -> bool:
+        name = function["FunctionName"]
+        with self.lock:
+            reserved = self.functions.get(name, function)["ReservedConcurrentExecutions"]
+            limit = self.engine.account_concurrency if reserved is None else reserved
+            if self.running[name] >= limit or self.running_total >= self.engine.account_concurrency:
+                if count_throttle:
+                    self.engine.count("throttles")
+                return False
+
+            self.running[name] += 1
+            self.running_total += 1
+            return True
+
+    def _release(self, function: dict) -> None:
+        with self.lock:
+            self.running[function["FunctionName"]] -= 1
+            self.running_total -= 1
+
+    def _run(self, function: dict, event, request_id: str = None) -> tuple:
+        '''
+        Run the handler of an acquired function in a warm environment, or initialize a new one.
+        Returns (payload bytes, function error, execution log ending with the REPORT line).
+        '''
+        self.engine.count("invocations")
+        context = LocalContext(function, request_id)
+
+        with self.lock:
+            cold = function["warm"] == 0
+            if not cold:
+                function["warm"] -= 1
+
+        init_duration = None
+        handler = function["handler"]
+        start = time.monotonic()
+        try:
+            if cold:
+                handler = self._load_handler(function)
+                init_duration = time.monotonic() - start
+                start = time.monotonic()
+
+            result = handler(event, context)
+            payload, function_error = json.dumps(result).encode("utf-8"), None
+        except Exception as e:
+            error = {"errorMessage": str(e), "errorType": type(e).__name__}
+            payload, function_error = json.dumps(error).encode("utf-8"), "Unhandled"
+        finally:
+            duration = (time.monotonic() - start) * 1000
+            with self.lock:
+                function["warm"] += 1
+            self._release(function)
+
+        report = (f"REPORT RequestId: {context.aws_request_id}\tDuration: {duration:.2f} ms\t"
+                  f"Billed Duration: {max(1, int(duration + 0.999))} ms\tMemory Size: {function['MemorySize']} MB\t"
+                  f"Max Memory Used: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024} MB\t")
+        if init_duration is not None:
+            report += f"Init Duration: {init_duration * 1000:.2f} ms\t"
+
+        log = (f"START RequestId: {context.aws_request_id} Version: {context.function_version}\n"
+               f"END RequestId: {context.aws_request_id}\n{report}\n")
+        return payload, function_error, log
+
+    def _execute(self, function: dict, event) -> tuple:
+        return self.engine.executor.submit(self._run, function, event).result()
+
+    def _run_event(self, function: dict, event, request_id: str) -> None:
+        '''
+        Run an asynchronous invocation and deliver its record to the configured SQS destination.
+        '''
+        payload, function_error, _ = self._run(function, event, request_id)
+
+        with self.lock:
+            destinations = self.invoke_configs.get(function["FunctionName"], {})
+        destination = destinations.get("OnFailure" if function_error else "OnSuccess", {}).get("Destination")
+        if not destination:
+            return
+
+        record = {
+            "version": "1.0",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+            "requestContext": {"requestId": request_id,
+                               "functionArn": function["FunctionArn"] + ":$LATEST",
+                               "condition": "RetriesExhausted" if function_error else "Success",
+                               "approximateInvokeCount": 1},
+            "requestPayload": event,
+            "responseContext": dict({"statusCode": 200, "executedVersion": "$LATEST"},
+                                    **({"functionError": function_error} if function_error else {})),
+            "responsePayload": json.loads(payload or b"null"),
+        }
+        sqs = self.engine.sqs
+        sqs._enqueue(sqs.queue_by_arn(destination), json.dumps(record))
+
+    def invoke(self, FunctionName: str, InvocationType: str = "RequestResponse", Payload=None,
+               LogType: str = "None", Qualifier: str = None, **kwargs) -> dict:
+        function = self._resolve(FunctionName, Qualifier, "Invoke")
+        if isinstance(Payload, bytes):
+            Payload = Payload.decode("utf-8")
+        event = json.loads(Payload) if Payload else {}
+
+        if InvocationType == "Event":
+            # The request id of the Invoke call is the requestId of the destination record
+            request_id = str(uuid.uuid4())
+            self.event_queue.put((function, event, request_id))
+            return {"StatusCode": 202, "Payload": io.BytesIO(b""), "ResponseMetadata": {"RequestId": request_id, "HTTPStatusCode": 202}}
+
+        if InvocationType == "DryRun":
+            return {"StatusCode": 204, "Payload": io.BytesIO(b"")}
+
+        if not self._try_acquire(function):
+            raise _error("TooManyRequestsException", "Rate Exceeded.", "Invoke", status=429)
+
+        payload, function_error, log = self._execute(function, event)
+        response = {"StatusCode": 200, "Payload": io.BytesIO(payload), "ExecutedVersion": function["Version"]}
+        if function_error:
+            response["FunctionError"] = function_error
+        if LogType == "Tail":
+            response["LogResult"] = base64.b64encode(log.encode("utf-8")[-4096:]).decode()
+        return response
+
+    def _dispatch_events(self) -> None:
+        '''
+        Asynchronous invocations wait in an internal queue until the function has capacity.
+        A waiting event counts as one throttle however many times it is retried.
+        '''
+        while not self.stopped.is_set():
+            item = self.event_queue.get()
+            if item is None:
+                return
+
+            function, event, request_id = item
+            delay = 0.01
+            throttled = False
+            while not self._try_acquire(function, count_throttle=not throttled):
+                throttled = True
+                if self.stopped.wait(delay):
+                    return
+                delay = min(0.2, delay * 2)
+            self.engine.executor.submit(self._run_event, function, event, request_id)
+
+    def stop(self) -> None:
+        '''
+        Stop the event dispatcher, asynchronous invocations still waiting for capacity are dropped.
+        '''
+        self.stopped.set()
+        self.event_queue.put(None)
+        self.dispatcher.join()
+
+    def create_event_source_mapping(self, EventSourceArn: str, FunctionName: str, BatchSize: int = 10,
+                                    MaximumBatchingWindowInSeconds: int = 0, Enabled: bool = True,
+                                    FunctionResponseTypes: list = None, ScalingConfig: dict = None, **kwargs) -> dict:
+        function = self._function(FunctionName, "CreateEventSourceMapping")
+        local_queue = self.engine.sqs.queue_by_arn(EventSourceArn)
+
+        mapping = {
+            "UUID": str(uuid.uuid4()),
+            "EventSourceArn": EventSourceArn,
+            "FunctionArn": function["FunctionArn"],
+            "FunctionName": FunctionName,
+            "BatchSize": BatchSize,
+            "MaximumBatchingWindowInSeconds": MaximumBatchingWindowInSeconds,
+            "FunctionResponseTypes": FunctionResponseTypes or [],
+            "ScalingConfig": ScalingConfig or {},
+            "State": "Enabled" if Enabled else "Disabled",
+            "queue_url": local_queue.url,
+            "stop": threading.Event(),
+        }
+
+        with self.lock:
+            self.mappings[mapping["UUID"]] = mapping
+
+        # Lambda polls standard queues with several concurrent pollers; MaximumConcurrency caps them
+        pollers = mapping["ScalingConfig"].get("MaximumConcurrency", self.engine.event_source_pollers)
+        for _ in range(pollers):
+            threading.Thread(target=self._poll_event_source, args=(mapping,), daemon=True).start()
+
+        return self._mapping(mapping)
+
+    def _mapping(self, mapping: dict) -> dict:
+        return {key: value for key, value in mapping.items() if key not in ("queue_url", "stop", "FunctionName")}
+
+    def get_event_source_mapping(self, UUID: str) -> dict:
+        with self.lock:
+            if UUID not in self.mappings:
+                raise _error("ResourceNotFoundException", f"Event source mapping not found: {UUID}", "GetEventSourceMapping", status=404)
+            return self._mapping(self.mappings[UUID])
+
+    def list_event_source_mappings(self, FunctionName: str = None, EventSourceArn: str = None, **kwargs) -> dict:
+        with self.lock:
+            mappings = [self._mapping(mapping) for mapping in self.mappings.values()
+                        if FunctionName in (None, mapping["FunctionName"]) and EventSourceArn in (None, mapping["EventSourceArn"])]
+        return {"EventSourceMappings": mappings}
+
+    def update_event_source_mapping(self, UUID: str, Enabled: bool = None, **kwargs) -> dict:
+        with self.lock:
+            if UUID not in self.mappings:
+                raise _error("ResourceNotFoundException", f"Event source mapping not found: {UUID}", "UpdateEventSourceMapping", status=404)
+            mapping = self.mappings[UUID]
+            mapping.update(kwargs)
+            if Enabled is not None:
+                mapping["State"] = "Enabled" if Enabled else "Disabled"
+            return self._mapping(mapping)
+
+    def delete_event_source_mapping(self, UUID: str) -> dict:
+        with self.lock:
+            if UUID not in self.mappings:
+                raise _error("ResourceNotFoundException", f"Event source mapping not found: {UUID}", "DeleteEventSourceMapping", status=404)
+            mapping = self.mappings.pop(UUID)
+            mapping["stop"].set()
+            mapping["State"] = "Deleting"
+            return self._mapping(mapping)
+
+    def _poll_event_source(self, mapping: dict) -> None:
+        sqs = self.engine.sqs
+
+        while not mapping["stop"].is_set():
+            if mapping["State"] != "Enabled":
+                time.sleep(0.1)
+                continue
+
+            try:
+                function = self._function(mapping["FunctionName"], "Invoke")
+
+                # Fill the batch until it is full or the batching window closes
+                messages = []
+                window_end = time.time() + mapping["MaximumBatchingWindowInSeconds"]
+                while len(messages) < mapping["BatchSize"]:
+                    wait = max(0, window_end - time.time()) if messages else 1
+                    response = sqs.receive_message(QueueUrl=mapping["queue_url"],
+                                                   MaxNumberOfMessages=min(10, mapping["BatchSize"] - len(messages)),
+                                                   WaitTimeSeconds=wait)
+                    messages.extend(response.get("Messages", []))
+                    if time.time() >= window_end or mapping["stop"].is_set():
+                        break
+            except ClientError:
+                # Queue or function deleted
+                return
+
+            if not messages:
+                continue
+
+            if not self._try_acquire(function):
+                # Throttled: hand the batch back to the queue and back off
+                sqs.change_message_visibility_batch(QueueUrl=mapping["queue_url"],
+                                                    Entries=[{"Id": str(i), "ReceiptHandle": message["ReceiptHandle"], "VisibilityTimeout": 0}
+                                                             for i, message in enumerate(messages)])
+                time.sleep(0.05)
+                continue
+
+            event = {"Records": [{
+                "messageId": message["MessageId"],
+                "receiptHandle": message["ReceiptHandle"],
+                "body": message["Body"],
+                "attributes": message["Attributes"],
+                "messageAttributes": {name: {"stringValue": value.get("StringValue"), "dataType": value["DataType"]}
+                                      for name, value in message.get("MessageAttributes", {}).items()},
+                "md5OfBody": message["MD5OfBody"],
+                "eventSource": "aws:sqs",
+                "eventSourceARN": mapping["EventSourceArn"],
+                "awsRegion": REGION,
+            } for message in messages]}
+
+            payload, function_error, _ = self._execute(function, event)
+            if function_error:
+                # Whole batch becomes visible again after the visibility timeout
+                continue
+
+            failed_ids = set()
+            if "ReportBatchItemFailures" in mapping["FunctionResponseTypes"]:
+                response = json.loads(payload or b"null") or {}
+                failed_ids = {failure["itemIdentifier"] for failure in response.get("batchItemFailures", [])}
+
+            acknowledged = [message for message in messages if message["MessageId"] not in failed_ids]
+            if acknowledged:
+                sqs.delete_message_batch(QueueUrl=mapping["queue_url"],
+                                         Entries=[{"Id": str(i), "ReceiptHandle": message["ReceiptHandle"]}
+                                                  for i, message in enumerate(acknowledged)])
+
+class LocalCloudWatchClient():
+    '''
+    In-memory "cloudwatch" client: get_metric_statistics returns the current value of
+    the SQS ApproximateAgeOfOldestMessage metric, other metrics have no datapoints.
+    '''
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def get_metric_statistics(self, Namespace: str, MetricName: str, Dimensions: list = None, **kwargs) -> dict:
+        dimensions = {dimension["Name"]: dimension["Value"] for dimension in Dimensions or []}
+        if (Namespace, MetricName) != ("AWS/SQS", "ApproximateAgeOfOldestMessage"):
+            return {"Label": MetricName, "Datapoints": []}
+
+        with self.engine.sqs.lock:
+            queues = [local_queue for local_queue in self.engine.sqs.queues.values() if local_queue.name == dimensions.get("QueueName")]
+        if not queues:
+            return {"Label": MetricName, "Datapoints": []}
+
+        now = time.time()
+        with queues[0].condition:
+            age = now - min((message["sent_at"] for message in queues[0].messages), default=now)
+
+        statistics = {statistic: age for statistic in kwargs.get("Statistics", ["Maximum"])}
+        timestamp = datetime.datetime.now(datetime.timezone.utc)
+        return {"Label": MetricName, "Datapoints": [dict(statistics, Timestamp=timestamp, Unit="Seconds")]}
+
+class LocalS3Client():
+    '''
+    In-memory "s3" client with the object calls used by the claim-check blob store.
+    '''
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def _bucket(self, Bucket: str, operation: str) -> dict:
+        if Bucket not in self.buckets:
+            raise _error("NoSuchBucket", "The specified bucket does not exist", operation, status=404)
+        return self.buckets[Bucket]
+
+    def create_bucket(self, Bucket: str, **kwargs) -> dict:
+        with self.lock:
+            self.buckets.setdefault(Bucket, {})
+        return {"Location": f"/{Bucket}"}
+
+    def put_object(self, Bucket: str, Key: str, Body=b"", **kwargs) -> dict:
+        data = Body.encode("utf-8") if isinstance(Body, str) else bytes(Body)
+        with self.lock:
+            self._bucket(Bucket, "PutObject")[Key] = data
+        return {"ETag": '"' + hashlib.md5(data).hexdigest() + '"'}
+
+    def get_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        with self.lock:
+            objects = self._bucket(Bucket, "GetObject")
+            if Key not in objects:
+                raise _error("NoSuchKey", "The specified key does not exist.", "GetObject", status=404)
+            data = objects[Key]
+        return {"Body": io.BytesIO(data), "ContentLength": len(data)}
+
+    def delete_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        with self.lock:
+            self._bucket(Bucket, "DeleteObject").pop(Key, None)
+        return {}
+
+class LocalAWS():
+    '''
+    Local in-process engine exposing "sqs", "lambda", "cloudwatch" and "s3" clients, so the
+    origin queue -> Lambda -> destination queue pipeline can run without an AWS account.
+    Call install() to make config.clients.get_client return the local clients.
+    '''
+
+    def __init__(self, account_concurrency: int = 100, event_source_pollers: int = 5):
+        self.account_concurrency = account_concurrency
+        self.event_source_pollers = event_source_pollers
+
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=account_concurrency)
+        self.counters = {"invocations": 0, "throttles": 0}
+        self.counters_lock = threading.Lock()
+
+        self.sqs = LocalSQSClient(self)
+        self.lambda_client = LocalLambdaClient(self)
+        self.cloudwatch = LocalCloudWatchClient(self)
+        self.s3 = LocalS3Client(self)
+
+    def count(self, key: str) -> None:
+        with self.counters_lock:
+            self.counters[key] += 1
+
+    def client(self, service: str):
+        clients = {"sqs": self.sqs, "lambda": self.lambda_client, "cloudwatch": self.cloudwatch, "s3": self.s3}
+        if service not in clients:
+            raise ValueError(f" Service {service} is not emulated locally.")
+        return clients[service]
+
+    def install(self) -> None:
+        register_client("sqs", self.sqs)
+        register_client("lambda", self.lambda_client)
+        register_client("cloudwatch", self.cloudwatch)
+        register_client("s3", self.s3)
+
+        logger.info("Using local SQS and Lambda engine.")
+
+    def shutdown(self) -> None:
+        with self.lambda_client.lock:
+            for mapping in self.lambda_client.mappings.values():
+                mapping["stop"].set()
+        self.lambda_client.stop()
+        self.executor.shutdown(wait=True)
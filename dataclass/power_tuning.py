@@ -0,0 +1,150 @@
+import json
+import logging
+
+from dataclass.benchmark import percentile
+
+logger = logging.getLogger(__name__)
+
+MEMORY_SIZES = (128, 256, 512, 1024, 1536, 2048, 3008)
+
+# On-demand x86 prices (us-east-1), arm64 is about 20% cheaper per GB-second
+PRICE_PER_GB_SECOND = 0.0000166667
+PRICE_PER_REQUEST = 0.0000002
+
+class PowerTuner():
+    '''
+    Runs the same invocation workload with the function configured at each memory size
+    and reports the cost / latency curve. Lambda allocates CPU in proportion to memory,
+    so more memory can make a CPU-bound function both faster and cheaper.
+    Durations come from the REPORT line of every invocation (LogType=Tail); max_in_flight
+    environments are warmed up at each size first and cold starts are not measured.
+    Handler errors (FunctionError) count as errors, a size with errors is never recommended.
+    The strategy picks the recommendation: "cost", "speed" or "balanced" (weighted
+    sum of the cost and the duration, each normalized by its maximum).
+    '''
+
+    def __init__(self, lambda_function, function_name: str, memory_sizes: list = MEMORY_SIZES, invocations: int = 20,
+                 payload: dict = None, max_in_flight: int = 4, strategy: str = "balanced", cost_weight: float = 0.5,
+                 price_per_gb_second: float = PRICE_PER_GB_SECOND, price_per_request: float = PRICE_PER_REQUEST):
+        if strategy not in ("cost", "speed", "balanced"):
+            raise ValueError(f" Unknown strategy {strategy}, use cost, speed or balanced.")
+
+        self.lambda_function = lambda_function
+        self.function_name = function_name
+
+        self.memory_sizes = sorted(memory_sizes)
+        self.invocations = invocations
+        self.payload = payload
+        self.max_in_flight = max_in_flight
+
+        self.strategy = strategy
+        self.cost_weight = cost_weight
+        self.price_per_gb_second = price_per_gb_second
+        self.price_per_request = price_per_request
+
+        self.results = []
+
+    def _measure(self, memory_size: int) -> dict:
+        self.lambda_function.set_memory_size(function_name=self.function_name, memory_size=memory_size)
+
+        def invoke(count: int, log_tail: bool) -> list:
+            return list(self.lambda_function.invoke_many(self.function_name, [self.payload] * count,
+                                                         max_in_flight=self.max_in_flight, log_tail=log_tail))
+
+        # Warm up as many environments as the workload keeps in flight: the configuration change discarded them
+        warm_up = invoke(self.max_in_flight, False)
+
+        first = len(self.lambda_function.reports)
+        results = invoke(self.invocations, True)
+        # FunctionError (e.g. out of memory at this size) is yielded as an exception by invoke_many
+        errors = sum(1 for result in warm_up + results if isinstance(result, Exception))
+        with self.lambda_function.reports_lock:
+            reports = [report for report in self.lambda_function.reports[first:] if report["function"] == self.function_name]
+
+        # Invocations that still started a new environment carry its init time, keep them out of the stats
+        cold_starts = sum(1 for report in reports if report["cold_start"])
+        reports = [report for report in reports if not report["cold_start"]]
+
+        durations = [report["duration_ms"] for report in reports]
+        billed = [report["billed_duration_ms"] for report in reports]
+        mean = lambda values: sum(values) / len(values) if values else None
+
+        billed_mean = mean(billed)
+        cost = None
+        if billed_mean is not None:
+            cost = billed_mean / 1000 * memory_size / 1024 * self.price_per_gb_second + self.price_per_request
+
+        return {
+            "memory_size_mb": memory_size,
+            "invocations": len(reports),
+            "errors": errors,
+            "cold_starts": cold_starts,
+            "duration_mean_ms": mean(durations),
+            "duration_p50_ms": percentile(durations, 50),
+            "duration_p95_ms": percentile(durations, 95),
+            "billed_duration_mean_ms": billed_mean,
+            "max_memory_used_mb": max((report["max_memory_used_mb"] or 0 for report in reports), default=None),
+            "cost_per_invocation": cost,
+            "cost_per_million": cost * 1000000 if cost is not None else None,
+        }
+
+    def recommend(self, results: list) -> dict:
+        candidates = [result for result in results if result["cost_per_invocation"] is not None and not result["errors"]]
+        if not candidates:
+            return None
+
+        if self.strategy == "cost":
+            return min(candidates, key=lambda result: (result["cost_per_invocation"], result["duration_p50_ms"]))
+        if self.strategy == "speed":
+            return min(candidates, key=lambda result: (result["duration_p50_ms"], result["cost_per_invocation"]))
+
+        max_cost = max(result["cost_per_invocation"] for result in candidates)
+        max_duration = max(result["duration_p50_ms"] for result in candidates) or 1
+        return min(candidates, key=lambda result: self.cost_weight * result["cost_per_invocation"] / max_cost
+                                                  + (1 - self.cost_weight) * result["duration_p50_ms"] / max_duration)
+
+    def run(self, apply: bool = False) -> dict:
+        '''
+        Measure every memory size, then restore the original one, or set the
+        recommended one with apply. Returns the curve and the recommendation.
+        '''
+        original = self.lambda_function.get_memory_size(function_name=self.function_name)
+        logger.info(f"Power tuning {self.function_name}(): {self.invocations} invocations at {self.memory_sizes} MB "
+                    f"(currently {original} MB).")
+
+        self.results = []
+        try:
+            for memory_size in self.memory_sizes:
+                self.results.append(self._measure(memory_size))
+        finally:
+            recommendation = self.recommend(self.results)
+            final = recommendation["memory_size_mb"] if apply and recommendation else original
+            self.lambda_function.set_memory_size(function_name=self.function_name, memory_size=final)
+
+        summary = {"function": self.function_name, "strategy": self.strategy, "original_memory_size_mb": original,
+                   "recommendation": recommendation, "results": self.results}
+        self.report(summary)
+        return summary
+
+    def report(self, summary: dict) -> None:
+        number = lambda value, format: "n/a" if value is None else format.format(value)
+
+        logger.info(f"Power tuning results of {summary['function']}():")
+        logger.info(">    Memory |  p50 (ms) |  p95 (ms) | Billed (ms) | $ / 1M calls | Errors")
+        for result in summary["results"]:
+            logger.info(f"> {result['memory_size_mb']:>6} MB | {number(result['duration_p50_ms'], '{:9.1f}')} | "
+                        f"{number(result['duration_p95_ms'], '{:9.1f}')} | {number(result['billed_duration_mean_ms'], '{:11.1f}')} | "
+                        f"{number(result['cost_per_million'], '{:12.4f}')} | {result['errors']:>6}")
+
+        recommendation = summary["recommendation"]
+        if recommendation:
+            logger.info(f"> Recommended ({summary['strategy']}) : {recommendation['memory_size_mb']} MB")
+        else:
+            logger.info("> No memory size completed the workload without errors.")
+
+    @staticmethod
+    def save(summary: dict, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=2)
+
+        logger.info(f"Power tuning results saved to {path}.")
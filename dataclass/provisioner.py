@@ -0,0 +1,100 @@
+import concurrent.futures
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class Provisioner():
+    '''
+    Creates resources declared as a dependency graph. A resource is created as soon
+    as everything it depends on exists, so independent resources are created in
+    parallel; teardown runs in reverse order, also in parallel.
+    Create functions should block until their resource is ready (botocore waiters).
+    '''
+
+    def __init__(self, max_workers: int = 8):
+        self.max_workers = max_workers
+        self.nodes = {}         # name -> {"create", "delete", "depends_on"}
+        self.created = []       # names of the resources created, in completion order
+        self.timings = {}
+
+    def add(self, name: str, create, delete = None, depends_on: list = ()) -> None:
+        for dependency in depends_on:
+            if dependency not in self.nodes:
+                raise ValueError(f" Unknown dependency {dependency} for {name}. Add dependencies first.")
+
+        self.nodes[name] = {"create": create, "delete": delete, "depends_on": set(depends_on)}
+
+    def _run(self, names: list, blockers: dict, action: str, completed: list, stop_on_error: bool = True) -> None:
+        '''
+        Run action for every name once its blockers are done, appending the names that
+        completed to completed. With stop_on_error no new work is scheduled after the
+        first failure; in both cases the first error is re-raised at the end.
+        '''
+        failed = None
+        failed_names = set()
+        pending = set(names)
+
+        def timed(name):
+            start = time.monotonic()
+            function = self.nodes[name][action]
+            if function:
+                function()
+            return time.monotonic() - start
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {}
+
+            while pending or running:
+                if not (failed and stop_on_error):
+                    for name in [name for name in pending if not (blockers[name] & (pending | failed_names | set(running.values())))]:
+                        pending.discard(name)
+                        running[executor.submit(timed, name)] = name
+
+                if not running:
+                    break
+
+                finished, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        self.timings[f"{action} {name}"] = future.result()
+                        completed.append(name)
+                        logger.info(f"{action.capitalize()} {name} done in {self.timings[f'{action} {name}']:.1f}s.")
+                    except Exception as e:
+                        logger.error(f"{action.capitalize()} {name} failed: {e}")
+                        failed = failed or e
+                        failed_names.add(name)
+
+        if failed:
+            raise failed
+
+    def up(self) -> None:
+        '''
+        Create the resources not created yet, so resources added after a first up() can be created by another call.
+        '''
+        start = time.monotonic()
+        names = [name for name in self.nodes if name not in self.created]
+        blockers = {name: self.nodes[name]["depends_on"] for name in names}
+
+        # Resources are recorded as they complete, so down() also cleans up after a failed up()
+        self._run(names, blockers, "create", self.created)
+
+        logger.info(f"Environment ready in {time.monotonic() - start:.1f}s.")
+
+    def down(self) -> None:
+        '''
+        Delete the created resources, each one after every resource depending on it.
+        '''
+        start = time.monotonic()
+        names = list(reversed(self.created))
+        blockers = {name: {other for other in names if name in self.nodes[other]["depends_on"]} for name in names}
+
+        deleted = []
+        try:
+            # Best effort: keep deleting what is not blocked by a failed deletion
+            self._run(names, blockers, "delete", deleted, stop_on_error=False)
+        finally:
+            self.created = [name for name in self.created if name not in deleted]
+
+        logger.info(f"Environment deleted in {time.monotonic() - start:.1f}s.")
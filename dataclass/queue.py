@@ -1,5 +1,20 @@
-import boto3
-from config.config import Config
+import concurrent.futures
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+import zlib
+
+from botocore.exceptions import ClientError
+
+from config.config import get_config
+from config.clients import get_client
+from config.metrics import THROTTLE_CODES
+from dataclass.consumer import Consumer, OrderedConsumer
+
+logger = logging.getLogger(__name__)
 
 class SQS():
 
@@ -10,30 +25,54 @@ class SQS():
         self.visibility_timeout = 60    # Timeout in seconds before the message becomes visible again
         self.wait_time_seconds = 20     # Wait up to 20 seconds for a message to be available
 
+        self.max_batch_entries = 10         # SendMessageBatch / DeleteMessageBatch entry limit
+        self.max_batch_bytes = 256 * 1024   # SendMessageBatch total payload limit
+        self.max_send_retries = 3           # Retries for entries reported in the batch "Failed" list
+
+        self.codec = None                   # Optional MessageCodec: compression / claim-check of large bodies
+
+        self.fifo = False                           # Set by create_queue(fifo=True)
+        self.content_based_deduplication = False
 
-        self.config = Config()
-        self.config.load()
+        self.config = get_config()
 
     def create_client(self) -> None:        
-        self.sqs_client = boto3.client( "sqs",
-                                    aws_access_key_id= self.config.ACCESS_KEY,
-                                    aws_secret_access_key=self.config.SECRET_KEY,
-                                    region_name=self.config.REGION,
-                                )
+        self.sqs_client = get_client("sqs")
                         
-        print("\n    [INFO] Create a Amazon Simple Queue Service (SQS) client. \n")
+        logger.info("Create a Amazon Simple Queue Service (SQS) client.")
 
-    def create_queue(self, queue_name: str, delay_seconds: str = "0", menssage_rentention_period: str = "3600") -> None:
-        response = self.sqs_client.create_queue( QueueName=queue_name,
-                                                 Attributes={
-                                                    "DelaySeconds": delay_seconds,
-                                                    "MessageRetentionPeriod": menssage_rentention_period, # seconds
-                                                 },
-                                                )
+    def create_queue(self, queue_name: str, delay_seconds: str = "0", menssage_rentention_period: str = "3600",
+                     fifo: bool = False, content_based_deduplication: bool = True, high_throughput: bool = False) -> None:
+        '''
+        Create a standard queue, or a FIFO queue (the name gets the required ".fifo" suffix).
+        FIFO queues deduplicate by body hash with content_based_deduplication; high_throughput
+        scopes deduplication and throughput limits to each message group instead of the queue.
+        '''
+        attributes = {
+            "DelaySeconds": delay_seconds,
+            "MessageRetentionPeriod": menssage_rentention_period, # seconds
+        }
+
+        if fifo:
+            queue_name = queue_name if queue_name.endswith(".fifo") else queue_name + ".fifo"
+            attributes["FifoQueue"] = "true"
+            attributes["ContentBasedDeduplication"] = "true" if content_based_deduplication else "false"
+            if high_throughput:
+                attributes["DeduplicationScope"] = "messageGroup"
+                attributes["FifoThroughputLimit"] = "perMessageGroupId"
+
+        response = self.sqs_client.create_queue( QueueName=queue_name, Attributes=attributes)
+
+        self.fifo = fifo
+        self.content_based_deduplication = fifo and content_based_deduplication
 
         # Get the queue URL
         self.queue_url = response["QueueUrl"]
-        print("\n    [INFO] SQS queue created with URL" + self.queue_url)
+        logger.info("SQS queue created with URL" + self.queue_url)
+
+    def get_queue_arn(self) -> str:
+        response = self.sqs_client.get_queue_attributes(QueueUrl=self.queue_url, AttributeNames=["QueueArn"])
+        return response["Attributes"]["QueueArn"]
 
     def check_queue(self) -> None:  
 
@@ -45,23 +84,291 @@ class SQS():
         approximate_message_count = attributes["ApproximateNumberOfMessages"]
         approximate_message_not_visible_count = attributes["ApproximateNumberOfMessagesNotVisible"]
 
-        print("\n    [INFO] Approximate number of visible messages:" + approximate_message_count)
-        print("\n    [INFO] Approximate number of messages not visible:" + approximate_message_not_visible_count)
+        logger.info("Approximate number of visible messages:" + approximate_message_count)
+        logger.info("Approximate number of messages not visible:" + approximate_message_not_visible_count)
+
+    def _encode(self, body: str) -> tuple:
+        '''
+        Returns (body, message attributes) after applying the codec, if any.
+        '''
+        if not self.codec:
+            return body, {}
+        body, codec = self.codec.encode(body)
+        return body, self.codec.message_attributes(codec)
+
+    def _decode(self, messages: list) -> list:
+        if self.codec:
+            for message in messages:
+                self.codec.decode_message(message)
+        return messages
+
+    @staticmethod
+    def message_group(key, shards: int = None) -> str:
+        '''
+        MessageGroupId of a key. With shards the keys are hashed into that many groups,
+        which bounds the number of groups consumed in parallel; a key always maps to the
+        same group, so its messages stay ordered.
+        '''
+        key = str(key)
+        if not shards:
+            return key
+        return f"shard-{zlib.crc32(key.encode('utf-8')) % shards}"
+
+    def _fifo_fields(self, group: str) -> dict:
+        fields = {"MessageGroupId": group}
+        if not self.content_based_deduplication:
+            # Generated once per message, so retries of the same entry are deduplicated
+            fields["MessageDeduplicationId"] = uuid.uuid4().hex
+        return fields
+
+    def send_message(self, message: str, group_id: str = "default") -> None:
+        body, attributes = self._encode(message)
 
-    def send_message(self, message: str) -> None:
         # Send a message to the SQS queue
         response = self.sqs_client.send_message(
             QueueUrl=self.queue_url, 
-            MessageBody=message,
+            MessageBody=body,
+            **({"MessageAttributes": attributes} if attributes else {}),
+            **(self._fifo_fields(group_id) if self.fifo else {}),
         )
 
         # Get the message ID from the response
         message_id = response["MessageId"]
-        print("\n    [INFO] Message sent with ID:" + message_id)
+        logger.info("Message sent with ID:" + message_id)
+
+    @staticmethod
+    def _entry_bytes(entry: tuple) -> int:
+        _, body, attributes, _ = entry
+        return len(body.encode("utf-8")) + sum(len(name) + len(value["DataType"]) + len(value["StringValue"])
+                                               for name, value in attributes.items())
+
+    def _build_batches(self, messages):
+        '''
+        Encode messages and pack them as (index, body, attributes, fields) entries into
+        SendMessageBatch requests, respecting the entry count and total payload size limits.
+        '''
+        batch, batch_bytes = [], 0
+
+        for index, message in enumerate(messages):
+            body, attributes = self._encode(message)
+            entry = (index, body, attributes, {})
+            body_bytes = self._entry_bytes(entry)
+
+            if batch and (len(batch) == self.max_batch_entries or batch_bytes + body_bytes > self.max_batch_bytes):
+                yield batch
+                batch, batch_bytes = [], 0
+
+            batch.append(entry)
+            batch_bytes += body_bytes
+
+        if batch:
+            yield batch
+
+    def _send_batch(self, batch: list, max_retries: int = None) -> list:
+        '''
+        Send one batch, retrying only the entries listed in the "Failed" response.
+        Returns a list of (index, result) pairs.
+        '''
+        max_retries = self.max_send_retries if max_retries is None else max_retries
+        results = []
+
+        # A body over the request limit can never be sent, do not fail (and retry) the batch for it
+        for entry in [entry for entry in batch if self._entry_bytes(entry) > self.max_batch_bytes]:
+            batch = [other for other in batch if other is not entry]
+            results.append((entry[0], {"Error": "MessageTooLong",
+                                       "Message": f"Message of {self._entry_bytes(entry)} bytes is over the {self.max_batch_bytes} bytes limit"}))
+
+        pending = {str(index): (body, attributes, fields) for index, body, attributes, fields in batch}
+
+        for attempt in range(max_retries + 1):
+            if not pending:
+                break
+
+            entries = [dict({"Id": entry_id, "MessageBody": body}, **({"MessageAttributes": attributes} if attributes else {}), **fields)
+                       for entry_id, (body, attributes, fields) in pending.items()]
+
+            try:
+                response = self.sqs_client.send_message_batch(QueueUrl=self.queue_url, Entries=entries)
+            except ClientError as e:
+                error = e.response["Error"]
+                status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 500)
+                # 4xx errors other than throttling reject the request itself, a retry would fail the same way
+                sender_fault = 400 <= status < 500 and status != 429 and error.get("Code") not in THROTTLE_CODES
+                response = {"Failed": [{"Id": entry["Id"], "SenderFault": sender_fault, "Code": error.get("Code"), "Message": error.get("Message")}
+                                       for entry in entries]}
+
+            for success in response.get("Successful", []):
+                pending.pop(success["Id"])
+                results.append((int(success["Id"]), {"MessageId": success["MessageId"]}))
+
+            retryable = {}
+            for failure in response.get("Failed", []):
+                entry = pending.pop(failure["Id"])
+                error = {"Error": failure.get("Code"), "Message": failure.get("Message")}
+
+                # Sender faults (invalid body, attributes...) will never succeed on retry
+                if failure.get("SenderFault") or attempt == max_retries:
+                    results.append((int(failure["Id"]), error))
+                else:
+                    retryable[failure["Id"]] = entry
+
+            if not retryable:
+                break
+
+            pending = retryable
+            time.sleep(0.1 * 2 ** attempt)
+
+        return results
+
+    def send_messages(self, messages, max_workers: int = 8) -> list:
+        '''
+        Send an iterable of message bodies using SendMessageBatch calls fanned out
+        over a bounded thread pool.
+        Returns one result per message, in input order: {"MessageId": ...} on
+        success or {"Error": ..., "Message": ...} on failure.
+        '''
+        if self.fifo:
+            return self.send_ordered(messages, max_workers=max_workers)
+
+        results = {}
+        max_in_flight = max_workers * 2
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            in_flight = set()
+
+            for batch in self._build_batches(messages):
+                # Keep a bounded window of batches in flight so large iterables are not materialized
+                if len(in_flight) >= max_in_flight:
+                    done, in_flight = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        results.update(future.result())
 
-    def read_messages(self, num_messages :int = 1) -> None:
+                in_flight.add(executor.submit(self._send_batch, batch))
 
-        print("\n    [INFO] Reading all messages ...")
+            for future in concurrent.futures.as_completed(in_flight):
+                results.update(future.result())
+
+        ordered = [results[index] for index in range(len(results))]
+        failed = sum(1 for result in ordered if "Error" in result)
+
+        logger.info(f"Sent {len(ordered) - failed} messages in batches ({failed} failed).")
+        return ordered
+
+    def send_ordered(self, messages, group_key = None, shards: int = None, max_workers: int = 8) -> list:
+        '''
+        Send messages to a FIFO queue, keeping the order of the messages of each group.
+        group_key(message) gives the ordering key (one "default" group when omitted),
+        mapped to a MessageGroupId by message_group(key, shards). Groups are spread over
+        max_workers senders; each sender batches its own stream in order.
+        Failed entries are not retried and the later messages of their group are not
+        sent, so no message overtakes another of its group.
+        Returns one result per message, in input order.
+        '''
+        if not self.fifo:
+            raise ValueError(" send_ordered() needs a FIFO queue, see create_queue(fifo=True).")
+
+        results = {}
+        results_lock = threading.Lock()
+        streams = [queue.Queue(maxsize=self.max_batch_entries * 2) for _ in range(max_workers)]
+
+        def sender(stream: queue.Queue) -> None:
+            failed_groups = set()
+            batch, batch_bytes = [], 0
+
+            def flush() -> None:
+                try:
+                    sent = self._send_batch(batch, max_retries=0)
+                except Exception as e:
+                    # Connection or read timeouts are not ClientErrors: fail the batch but keep draining
+                    # the stream, or the producer blocks forever on the full queue
+                    sent = [(index, {"Error": type(e).__name__, "Message": str(e)}) for index, _, _, _ in batch]
+                with results_lock:
+                    results.update(sent)
+
+                groups = {index: fields["MessageGroupId"] for index, _, _, fields in batch}
+                failed_groups.update(groups[index] for index, result in sent if "Error" in result)
+
+            while True:
+                entry = stream.get()
+                if entry is not None:
+                    entry_bytes = self._entry_bytes(entry)
+                    if batch and (len(batch) == self.max_batch_entries or batch_bytes + entry_bytes > self.max_batch_bytes):
+                        flush()
+                        batch, batch_bytes = [], 0
+
+                    # Checked after the flush: the batch just sent may have failed this group
+                    group = entry[3]["MessageGroupId"]
+                    if group in failed_groups:
+                        with results_lock:
+                            results[entry[0]] = {"Error": "GroupAborted", "Message": f"An earlier message of group {group} failed"}
+                        continue
+
+                    batch.append(entry)
+                    batch_bytes += entry_bytes
+
+                # Send what is batched whenever the stream runs dry, and at the end
+                if batch and (entry is None or stream.empty()):
+                    flush()
+                    batch, batch_bytes = [], 0
+
+                if entry is None:
+                    return
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            senders = [executor.submit(sender, stream) for stream in streams]
+
+            for index, message in enumerate(messages):
+                group = self.message_group(group_key(message) if group_key else "default", shards)
+                body, attributes = self._encode(message)
+                streams[zlib.crc32(group.encode("utf-8")) % max_workers].put((index, body, attributes, self._fifo_fields(group)))
+
+            for stream in streams:
+                stream.put(None)
+            for future in senders:
+                future.result()
+
+        ordered = [results[index] for index in range(len(results))]
+        failed = sum(1 for result in ordered if "Error" in result)
+
+        logger.info(f"Sent {len(ordered) - failed} ordered messages ({failed} failed).")
+        return ordered
+
+    def delete_messages(self, receipt_handles: list) -> list:
+        '''
+        Acknowledge messages through DeleteMessageBatch calls (up to 10 entries each).
+        Entries reported as failed are retried once.
+        Returns the receipt handles that could not be deleted.
+        '''
+        failed_handles = []
+
+        for start in range(0, len(receipt_handles), self.max_batch_entries):
+            pending = {str(i): handle for i, handle in enumerate(receipt_handles[start:start + self.max_batch_entries])}
+
+            for attempt in range(2):
+                response = self.sqs_client.delete_message_batch(
+                    QueueUrl=self.queue_url,
+                    Entries=[{"Id": entry_id, "ReceiptHandle": handle} for entry_id, handle in pending.items()],
+                )
+                pending = {failure["Id"]: pending[failure["Id"]] for failure in response.get("Failed", [])}
+                if not pending:
+                    break
+
+            failed_handles.extend(pending.values())
+
+        if failed_handles:
+            logger.error(f"Could not delete {len(failed_handles)} messages.")
+
+        return failed_handles
+
+    def read_messages(self, num_messages :int = 1, callback = None, defer_ack: bool = True) -> None:
+        '''
+        Receive up to num_messages messages and acknowledge them with DeleteMessageBatch.
+        If a callback is given it is called with each message; with defer_ack=True a
+        message is only deleted after its callback returns without raising, otherwise
+        every received message is acknowledged before the callbacks run.
+        '''
+
+        logger.info("Reading all messages ...")
 
         # Receive messages from the SQS queue
         response = self.sqs_client.receive_message(
@@ -69,25 +376,92 @@ class SQS():
             MaxNumberOfMessages=num_messages,
             VisibilityTimeout=self.visibility_timeout,  
             WaitTimeSeconds=self.wait_time_seconds,
+            MessageAttributeNames=["All"],
         )
 
         # Process received messages
-        messages = response.get("Messages", [])
+        messages = self._decode(response.get("Messages", []))
+        if not defer_ack:
+            self.delete_messages([message["ReceiptHandle"] for message in messages])
+
+        receipt_handles = []
         for message in messages:
             message_text = message["Body"]
 
             # Print the message
-            print(f"\n           > Received message: {message_text}")
+            logger.info(f"> Received message: {message_text}")
+
+            if callback:
+                try:
+                    callback(message)
+                except Exception as e:
+                    # Leave the message in the queue, it becomes visible again after the visibility timeout
+                    logger.error(f"Callback failed for message {message['MessageId']}: {e}")
+                    continue
 
-            # Delete the processed message from the SQS queue
-            self.sqs_client.delete_message(
+            receipt_handles.append(message["ReceiptHandle"])
+
+        # Delete the processed messages from the SQS queue
+        if defer_ack and receipt_handles:
+            self.delete_messages(receipt_handles)
+
+    def collect_results(self, correlation_ids: list, timeout: float = 60) -> dict:
+        '''
+        Read Lambda invoke destination records from the queue until every correlation id
+        (see LambdaFunction.invoke_async) has a result or timeout seconds elapse.
+        With a codec the responses encoded by codec_handler are decoded.
+        Returns {correlation_id: {"condition": ..., "response": ...}}.
+        '''
+        pending = set(correlation_ids)
+        results = {}
+        deadline = time.monotonic() + timeout
+
+        while pending and time.monotonic() < deadline:
+            response = self.sqs_client.receive_message(
                 QueueUrl=self.queue_url,
-                ReceiptHandle=message["ReceiptHandle"],
+                MaxNumberOfMessages=self.max_batch_entries,
+                VisibilityTimeout=self.visibility_timeout,
+                WaitTimeSeconds=min(self.wait_time_seconds, max(1, int(deadline - time.monotonic()))),
+                MessageAttributeNames=["All"],
             )
 
+            receipt_handles = []
+            for message in self._decode(response.get("Messages", [])):
+                try:
+                    record = json.loads(message["Body"])
+                    correlation_id = record["requestContext"]["requestId"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+
+                if correlation_id in pending:
+                    pending.discard(correlation_id)
+                    response = record.get("responsePayload")
+                    results[correlation_id] = {"condition": record["requestContext"]["condition"],
+                                               "response": self.codec.decode_payload(response) if self.codec else response}
+                    receipt_handles.append(message["ReceiptHandle"])
+
+            if receipt_handles:
+                self.delete_messages(receipt_handles)
+
+        logger.info(f"Collected {len(results)}/{len(correlation_ids)} results.")
+        return results
+
+    def consume(self, handler, pollers: int = 2, workers: int = 8, prefetch: int = None,
+                duration: float = None, max_messages: int = None, ordered: bool = None) -> dict:
+        '''
+        Run a long-lived consumer calling handler(message) for every message.
+        See dataclass.consumer.Consumer; ordered (default: True on FIFO queues) uses
+        OrderedConsumer, which keeps the order within each message group.
+        Returns the throughput counters.
+        '''
+        ordered = self.fifo if ordered is None else ordered
+        consumer_class = OrderedConsumer if ordered else Consumer
+        consumer = consumer_class(self, handler, pollers=pollers, workers=workers, prefetch=prefetch)
+        return consumer.run(duration=duration, max_messages=max_messages)
+
     def cleanup(self) -> None:
         if(self.sqs_client):
-            print(f"\n    [INFO] Delete queue with URL = {self.queue_url}. \n")
+            logger.info(f"Delete queue with URL = {self.queue_url}.")
             self.sqs_client.delete_queue(QueueUrl=self.queue_url)
         else:
-            print(f"\n    [INFO] No queue with URL = {self.queue_url} to delete. \n")
\ No newline at end of file
+            logger.info(f"No queue with URL = {self.queue_url} to delete.")
\ No newline at end of file
@@ -0,0 +1,200 @@
+import bisect
+import collections
+import concurrent.futures
+import hashlib
+import logging
+import threading
+
+from dataclass.provisioner import Provisioner
+from dataclass.queue import SQS
+
+logger = logging.getLogger(__name__)
+
+class HashRing():
+    '''
+    Consistent hash ring. Every node is placed replicas times (virtual nodes) so the
+    keys are spread evenly; adding a node only moves the keys it takes over, about
+    1/N of them, all the other keys keep their node.
+    '''
+
+    def __init__(self, nodes: list = (), replicas: int = 100):
+        self.replicas = replicas
+        self.hashes = []        # sorted virtual node hashes
+        self.owners = {}        # virtual node hash -> node
+        self.nodes = []
+
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key) -> int:
+        return int.from_bytes(hashlib.md5(str(key).encode("utf-8")).digest()[:8], "big")
+
+    def add(self, node) -> None:
+        if node in self.nodes:
+            raise ValueError(f" Node {node} is already in the ring.")
+
+        for replica in range(self.replicas):
+            point = self._hash(f"{node}#{replica}")
+            if point in self.owners:
+                continue
+            bisect.insort(self.hashes, point)
+            self.owners[point] = node
+        self.nodes.append(node)
+
+    def remove(self, node) -> None:
+        self.nodes.remove(node)
+        for point in [point for point, owner in self.owners.items() if owner == node]:
+            del self.owners[point]
+            self.hashes.remove(point)
+
+    def node_for(self, key):
+        if not self.hashes:
+            raise ValueError(" The ring has no nodes.")
+        index = bisect.bisect(self.hashes, self._hash(key)) % len(self.hashes)
+        return self.owners[self.hashes[index]]
+
+    def ownership(self) -> dict:
+        '''
+        Fraction of the hash space owned by each node.
+        '''
+        space = 2 ** 64
+        shares = collections.Counter()
+        for position, point in enumerate(self.hashes):
+            previous = self.hashes[position - 1] if position else self.hashes[-1] - space
+            shares[self.owners[point]] += (point - previous) / space
+        return {node: shares[node] for node in self.nodes}
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+class ShardedPipeline():
+    '''
+    N origin queue -> function pairs sharing one destination queue. Each shard has its
+    own queue (its own in-flight limit), its own function and reserved concurrency, so
+    the pipeline scales past the limits of a single queue or function. Messages are
+    routed to a shard by consistent hashing of a key: messages with the same key always
+    reach the same shard, and adding shards moves as few keys as possible.
+    '''
+
+    def __init__(self, name: str, destination: SQS, lambda_function, function_handler: str, timeout: int = 15,
+                 concurrency: int = None, batch_size: int = 10, batching_window: int = 0,
+                 maximum_concurrency: int = None, replicas: int = 100):
+        self.name = name
+        self.destination = destination
+        self.lambda_function = lambda_function      # LambdaFunction with a client and the package read
+        self.function_handler = function_handler
+        self.timeout = timeout
+
+        self.concurrency = concurrency              # Reserved concurrency of each shard function
+        self.batch_size = batch_size
+        self.batching_window = batching_window
+        self.maximum_concurrency = maximum_concurrency
+
+        self.shards = []                            # {"id", "queue", "function_name", "mapping"}
+        self.ring = HashRing(replicas=replicas)
+        self.lock = threading.Lock()
+        self.provisioner = Provisioner()
+
+    @property
+    def queues(self) -> list:
+        return [shard["queue"] for shard in self.shards]
+
+    @property
+    def function_names(self) -> list:
+        return [shard["function_name"] for shard in self.shards]
+
+    def _declare(self, shard_id: int) -> dict:
+        '''
+        Add the resources of one shard to the provisioner.
+        '''
+        shard = {"id": shard_id, "queue": SQS(), "function_name": f"{self.name}_shard{shard_id}", "mapping": None}
+        shard["queue"].create_client()
+        queue_name = f"{self.name}_shard{shard_id}"
+
+        def create_function() -> None:
+            environment = {"Variables": {"DESTINATION_SQS_URL": self.destination.queue_url}}
+            self.lambda_function.create_function_zip(function_handler=self.function_handler, function_name=shard["function_name"],
+                                                     timeout=self.timeout, environment=environment)
+            self.lambda_function.wait_until_active(function_name=shard["function_name"])
+            if self.concurrency:
+                self.lambda_function.set_lambda_limits(function_name=shard["function_name"], concurrent_executions=self.concurrency)
+
+        def create_mapping() -> None:
+            shard["mapping"] = self.lambda_function.create_event_source_mapping(
+                function_name=shard["function_name"], queue_arn=shard["queue"].get_queue_arn(),
+                batch_size=self.batch_size, batching_window=self.batching_window,
+                maximum_concurrency=self.maximum_concurrency)
+
+        prefix = f"shard{shard_id}"
+        self.provisioner.add(f"{prefix}_queue", create=lambda: shard["queue"].create_queue(queue_name=queue_name),
+                             delete=shard["queue"].cleanup)
+        # Not cleanup(): it deletes every mapping of the LambdaFunction, shared by all the shards
+        self.provisioner.add(f"{prefix}_function", create=create_function,
+                             delete=lambda: self.lambda_function._delete_function(function_name=shard["function_name"]))
+        self.provisioner.add(f"{prefix}_event_source_mapping", create=create_mapping,
+                             delete=lambda: self.lambda_function.delete_event_source_mapping(shard["mapping"]),
+                             depends_on=[f"{prefix}_queue", f"{prefix}_function"])
+        return shard
+
+    def add_shards(self, count: int = 1) -> dict:
+        '''
+        Provision count more shards, in parallel, and add them to the ring once they
+        are ready. Returns the fraction of the key space that moved to the new shards.
+        '''
+        new_shards = [self._declare(len(self.shards) + offset) for offset in range(count)]
+        self.provisioner.up()
+
+        before = self.ring.ownership()
+        with self.lock:
+            for shard in new_shards:
+                self.shards.append(shard)
+                self.ring.add(shard["id"])
+        after = self.ring.ownership()
+
+        # Only the new shards gain keys, the keys they take come from the existing shards
+        moved = {shard["id"]: after[shard["id"]] for shard in new_shards}
+
+        logger.info(f"Sharded pipeline {self.name}: {len(self.shards)} shards.")
+        if before:
+            logger.info(f"> Keys moved to the new shards : {sum(moved.values()):.1%}")
+        logger.info("> Key space per shard : " + ", ".join(f"{shard}: {share:.1%}" for shard, share in after.items()))
+        return moved
+
+    def route(self, key) -> SQS:
+        '''
+        Origin queue of the shard owning key.
+        '''
+        with self.lock:
+            shard_id = self.ring.node_for(key)
+        return self.shards[shard_id]["queue"]
+
+    def send_messages(self, messages, key = None, max_workers: int = 8) -> list:
+        '''
+        Send messages to their shards, key(message) giving the routing key (the message
+        itself by default). Each shard gets its messages in input order, through
+        SendMessageBatch calls; the shards are sent in parallel.
+        Returns one result per message, in input order.
+        '''
+        routed = collections.defaultdict(list)
+        for index, message in enumerate(messages):
+            routed[self.route(key(message) if key else message)].append((index, message))
+
+        results = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(routed)))) as executor:
+            futures = {executor.submit(queue.send_messages, [message for _, message in entries]): entries
+                       for queue, entries in routed.items()}
+            for future in concurrent.futures.as_completed(futures):
+                indexes = [index for index, _ in futures[future]]
+                results.update(zip(indexes, future.result()))
+
+        return [results[index] for index in range(len(results))]
+
+    def cleanup(self) -> None:
+        '''
+        Delete the resources of every shard, in reverse dependency order.
+        '''
+        self.provisioner.down()
+        with self.lock:
+            self.shards = []
+            self.ring = HashRing(replicas=self.ring.replicas)
@@ -1,9 +1,22 @@
 """
 Simulating a slow processing function
 """
+import boto3
+import os
 import time
 
+try:
+    # Packaged next to the handler (dataclass/codec.py) when the caller uses a MessageCodec
+    from dataclass.codec import codec_from_environment, codec_handler
+except ImportError:
+    def codec_from_environment(environ, client_factory):
+        return None
 
+    def codec_handler(codec=None):
+        return lambda handler: handler
+
+
+@codec_handler(codec_from_environment(os.environ, boto3.client))
 def do_something(event, context):
     """This is the main function (handler)
     that will be called by AWS Lambda."""
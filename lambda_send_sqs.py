@@ -1,16 +1,69 @@
 import boto3
 import os
 
-def lambda_handler(event, context):
-    # Create an SQS client
-    sqs = boto3.client("sqs")
+try:
+    # Packaged next to the handler (dataclass/codec.py) when the caller uses a MessageCodec
+    from dataclass.codec import codec_from_environment, codec_handler
+except ImportError:
+    def codec_from_environment(environ, client_factory):
+        return None
+
+    def codec_handler(codec=None):
+        return lambda handler: handler
+
+# Created once per execution environment and reused by every warm invocation
+sqs = boto3.client("sqs")
 
+MAX_BATCH_ENTRIES = 10
+MAX_BATCH_BYTES = 256 * 1024
+
+def _batches(records):
+    # Group records into SendMessageBatch requests (10 entries / 256 KB)
+    batch, batch_bytes = [], 0
+    for record in records:
+        size = len(record["body"].encode("utf-8"))
+        if batch and (len(batch) == MAX_BATCH_ENTRIES or batch_bytes + size > MAX_BATCH_BYTES):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(record)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+@codec_handler(codec_from_environment(os.environ, boto3.client))
+def lambda_handler(event, context):
     # Define the queue URL
     queue_url = os.environ.get("DESTINATION_SQS_URL")
 
-    # Define the message to send
-    message_body = "I can send messages to SQS!"
+    records = event.get("Records", [])
+
+    # Direct invocation (no SQS trigger): send a single message
+    if not records:
+        message_body = "I can send messages to SQS!"
+        response = sqs.send_message(QueueUrl=queue_url, MessageBody=message_body)
+        return response
+
+    # Forward every record body, reporting only the records that could not be sent
+    # so SQS retries them instead of the whole batch
+    failed_ids = []
+    for batch in _batches(records):
+        entries = [{"Id": str(i), "MessageBody": record["body"]} for i, record in enumerate(batch)]
+
+        # Keep string attributes, such as the "codec" marker of compressed bodies
+        for entry, record in zip(entries, batch):
+            attributes = {name: {"DataType": value["dataType"], "StringValue": value["stringValue"]}
+                          for name, value in record.get("messageAttributes", {}).items() if value.get("stringValue") is not None}
+            if attributes:
+                entry["MessageAttributes"] = attributes
+
+        try:
+            response = sqs.send_message_batch(QueueUrl=queue_url, Entries=entries)
+        except Exception as e:
+            print(f"Send batch failed: {e}")
+            failed_ids.extend(record["messageId"] for record in batch)
+            continue
+
+        for failure in response.get("Failed", []):
+            failed_ids.append(batch[int(failure["Id"])]["messageId"])
 
-    # Send message to the queue
-    response = sqs.send_message(QueueUrl=queue_url, MessageBody=message_body)
-    return response
\ No newline at end of file
+    return {"batchItemFailures": [{"itemIdentifier": message_id} for message_id in failed_ids]}
@@ -1,43 +1,56 @@
 from dataclass.compress import CompressFile
 from dataclass.lambda_function import LambdaFunction
 from dataclass.queue import SQS
+from dataclass.async_client import AsyncLambdaFunction
+from dataclass.concurrency import AdaptiveInvoker, HedgedInvoker
+from config.log import setup_logging
 
-import concurrent.futures
+import asyncio
 import boto3
-import time
-import io
+import json
+import logging
 
-def multiple_simultaneous_calls(num_executions: int, function_name: str, lambda_client: boto3.client) -> None:
+logger = logging.getLogger(__name__)
+
+def multiple_simultaneous_calls(num_executions: int, function_name: str, lambda_function: LambdaFunction, max_in_flight: int = 32,
+                                qualifier: str = None, invoker: HedgedInvoker = None) -> None:
     try:
-        print(f"\n    [INFO] Call lambda function {function_name}() {num_executions} times.\n")
-        # Create a thread pool executor with the desired number of threads
-        with concurrent.futures.ThreadPoolExecutor(max_workers=num_executions) as executor:
-            # List to store the future objects
-            futures = []
-
-            # Submit the Lambda invocations to the executor
-            for _ in range(num_executions):
-                future = executor.submit(
-                    lambda_client.invoke,
-                    FunctionName=function_name,
-                    InvocationType="RequestResponse",
-                )
-                futures.append(future)
-
-            # Process the results as they become available
-            for future in concurrent.futures.as_completed(futures):
-                print("-" * 40)
-                response = future.result()
-                payload = response["Payload"]
-                txt = io.BytesIO(payload.read()).read().decode("utf-8")
-                print(f"\n           > Response:\n{txt}\n")
+        logger.info(f"Call lambda function {function_name}() {num_executions} times.")
+
+        # Hedged calls: a slow invocation is duplicated instead of holding the result until the timeout
+        if invoker:
+            for result in invoker.invoke_all([None] * num_executions, max_in_flight=max_in_flight):
+                logger.info(f"> Response : {result if isinstance(result, Exception) else json.dumps(result)}")
+            return
+
+        # Keep a bounded window of invocations in flight and process the results as they become available
+        inputs = (None for _ in range(num_executions))
+        for result in lambda_function.invoke_many(function_name, inputs, max_in_flight=max_in_flight, log_tail=True, qualifier=qualifier):
+            if isinstance(result, Exception):
+                raise result
+            logger.info(f"> Response : {json.dumps(result)}")
+
+        # How many of the calls paid for a new execution environment
+        lambda_function.cold_start_summary(function_name)
 
     except Exception as e:
-        print(f"\n    [ERROR] An error occurred in multiple_simultaneous_calls(): \n {e}")
+        logger.error(f"An error occurred in multiple_simultaneous_calls(): {e}")
+
+async def async_simultaneous_calls(num_executions: int, function_name: str, lambda_function: LambdaFunction, max_in_flight: int = None) -> None:
+    logger.info(f"Call lambda function {function_name}() {num_executions} times from the event loop.")
+    async_lambda = AsyncLambdaFunction(lambda_function, max_in_flight=max_in_flight)
+    try:
+        results = await async_lambda.invoke_all(function_name, [None] * num_executions)
+        for result in results:
+            logger.info(f"> Response : {result}")
+    finally:
+        async_lambda.close()
 
 
 if __name__ == "__main__":
 
+    setup_logging()
+
     # Variaveis
     lambda_filename = "lambda_proc.py"
     lambda_compress = "lambda_proc.zip"
@@ -50,6 +63,12 @@ if __name__ == "__main__":
     concurrent_executions_limit = 2
     num_executions = 2                       # Define the number of concurrent executions/calls 
                                              # Change to 10 to test the limit and the error that appears
+    call_mode = "threads"                    # "threads"  : one thread per call, throttled calls fail
+                                             # "asyncio"  : call from an event loop (thread pool behind it)
+                                             # "adaptive" : stay under the reserved concurrency, retry throttled calls
+                                             # "hedged"   : duplicate slow calls (idempotent functions), shed load on failures
+    provisioned_concurrency = 0              # Environments kept initialized behind the "live" alias (0 disables)
+                                             # Must not exceed concurrent_executions_limit
 
     handler = lambda_filename.split('.')[0] + "." + handler_function_name
     function_name = "do_something_concurrent_" + "_" + username 
@@ -62,25 +81,47 @@ if __name__ == "__main__":
         sqs = SQS()
 
         # Compress
-        compress.run(lambda_filename=lambda_filename, compress_filename=lambda_compress)
+        # The codec module goes along so the handler can decode payloads of a LambdaFunction with a codec
+        compress.run(lambda_filename=lambda_filename, compress_filename=lambda_compress, extra_files=["dataclass/codec.py"])
 
         # Lambda Function
         _lambda.create_client()
         _lambda.read_function(compress_filename=lambda_compress)
         _lambda.create_function_zip(function_handler= handler, function_name=function_name, timeout=timeout)
 
-        time.sleep(1) # Wait lambda function to be deployed
+        _lambda.wait_until_active(function_name=function_name)
 
-        _lambda.check_function(function_name=function_name)
+        _lambda.check_function(function_name=function_name, log_tail=True)
         _lambda.see_all_lambda_functions()
 
         _lambda.set_lambda_limits(function_name=function_name, concurrent_executions=concurrent_executions_limit)
 
+        # Remove cold starts from the calls: publish a version behind an alias with initialized environments
+        qualifier = None
+        if provisioned_concurrency:
+            version = _lambda.publish_version(function_name=function_name)
+            _lambda.set_alias(function_name=function_name, alias_name="live", version=version)
+            _lambda.set_provisioned_concurrency(function_name=function_name, qualifier="live", concurrent_executions=provisioned_concurrency)
+            qualifier = "live"
+
         # Test the simultaneous calls to the lambda function
-        multiple_simultaneous_calls(num_executions= num_executions, function_name= function_name, lambda_client= _lambda.lambda_client)
+        if call_mode == "asyncio":
+            asyncio.run(async_simultaneous_calls(num_executions= num_executions, function_name= function_name, lambda_function= _lambda))
+        elif call_mode == "adaptive":
+            AdaptiveInvoker(lambda_function= _lambda, function_name= function_name).invoke_all([None] * num_executions)
+        elif call_mode == "hedged":
+            invoker = HedgedInvoker(lambda_function= _lambda, function_name= function_name, qualifier= qualifier)
+            try:
+                _lambda.check_function(function_name=function_name, invoker=invoker)
+                multiple_simultaneous_calls(num_executions= num_executions, function_name= function_name, lambda_function= _lambda,
+                                            qualifier= qualifier, invoker= invoker)
+            finally:
+                invoker.close()
+        else:
+            multiple_simultaneous_calls(num_executions= num_executions, function_name= function_name, lambda_function= _lambda, qualifier= qualifier)
 
     except Exception as e:
-        print(f"\n    [ERROR] An error occurred: \n {e}")
+        logger.error(f"An error occurred: {e}")
     finally:
         # Cleaning:
         _lambda.cleanup(function_name=function_name)
\ No newline at end of file
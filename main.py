@@ -1,13 +1,17 @@
 from dataclass.compress import CompressFile
 from dataclass.lambda_function import LambdaFunction
+from dataclass.provisioner import Provisioner
 from dataclass.queue import SQS
+from config.log import setup_logging
 
-import boto3
-import time
-import io
+import logging
+
+logger = logging.getLogger(__name__)
 
 if __name__ == "__main__":
 
+    setup_logging()
+
     # Variaveis
     lambda_filename = "lambda_send_sqs.py"
     lambda_compress = "lambda_send_sqs.zip"
@@ -18,54 +22,58 @@ if __name__ == "__main__":
 
     timeout = 15
  
+    queue_origin_name = "lambda_origin_queue_" + username
     queue_destination_name = "lambda_destination_queue_" + username
 
     handler = lambda_filename.split('.')[0] + "." + handler_function_name
     function_name = "sqs_lambda" + "_" + username 
 
-    try: 
-        # Instances
-        compress = CompressFile()
-        _lambda = LambdaFunction()
-        sqs = SQS()
-
-        # Compress
-        compress.run(lambda_filename=lambda_filename, compress_filename=lambda_compress)
-
-        # Create Queue for queue destination
-        sqs.create_client()
-        sqs.create_queue(queue_name= queue_destination_name)
-        sqs.check_queue()
+    # Instances
+    compress = CompressFile()
+    _lambda = LambdaFunction()
+    sqs = SQS()
+    origin = SQS()
+    provisioner = Provisioner()
 
+    def create_function() -> None:
         environment_variables = {"DESTINATION_SQS_URL": sqs.queue_url,}
         environment = {"Variables": environment_variables}
 
-        # Lambda Function
-        _lambda.create_client()
+        compress.run(lambda_filename=lambda_filename, compress_filename=lambda_compress)
         _lambda.read_function(compress_filename=lambda_compress)
         _lambda.create_function_zip(function_handler= handler, function_name=function_name, timeout=timeout, environment=environment)
+        _lambda.wait_until_active(function_name=function_name)
+
+    # Resources as a dependency graph: both queues are created in parallel, the function
+    # needs the destination queue URL and the trigger needs the function and the origin queue
+    provisioner.add("origin_queue", create=lambda: origin.create_queue(queue_name= queue_origin_name), delete=origin.cleanup)
+    provisioner.add("destination_queue", create=lambda: sqs.create_queue(queue_name= queue_destination_name), delete=sqs.cleanup)
+    provisioner.add("function", create=create_function, delete=lambda: _lambda.cleanup(function_name=function_name),
+                    depends_on=["destination_queue"])
+    provisioner.add("event_source_mapping",
+                    create=lambda: _lambda.create_event_source_mapping(function_name=function_name, queue_arn=origin.get_queue_arn(), batch_size=1),
+                    depends_on=["function", "origin_queue"])
 
-        time.sleep(1) # Wait lambda function to be deployed
+    try: 
+        origin.create_client()
+        sqs.create_client()
+        _lambda.create_client()
 
-        # Call the lambda function 3 times and verify if the number of messages in destination queue increases :
-        _lambda.check_function(function_name=function_name)
-        _lambda.check_function(function_name=function_name)
-        _lambda.check_function(function_name=function_name)
+        provisioner.up()
+        sqs.check_queue()
 
-        time.sleep(10)        # Wait msm get to the queue
+        # Send 3 messages to the origin queue and verify if the number of messages in destination queue increases :
+        origin.send_messages(["message 1", "message 2", "message 3"])
 
-        # Check messages in queue
-        sqs.check_queue()
+        # Check messages in queue (each read long polls until messages arrive)
         sqs.read_messages()   # Read 3 messages from queue
         sqs.read_messages()
         sqs.read_messages()
 
-        time.sleep(10)        # Wait msm get out of the queue
         sqs.check_queue()
 
     except Exception as e:
-        print(f"\n    [ERROR] An error occurred: \n {e}")
+        logger.error(f"An error occurred: {e}")
     finally:
-        # Cleaning:
-        _lambda.cleanup(function_name=function_name)
-        sqs.cleanup()
\ No newline at end of file
+        # Cleaning, in reverse dependency order
+        provisioner.down()
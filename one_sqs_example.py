@@ -1,42 +1,33 @@
 from dataclass.compress import CompressFile
 from dataclass.lambda_function import LambdaFunction
 from dataclass.queue import SQS
+from config.log import setup_logging
 
-import concurrent.futures
 import boto3
+import logging
 import time
-import io
+import json
 
-def multiple_simultaneous_calls(num_executions: int, function_name: str, lambda_client: boto3.client) -> None:
+logger = logging.getLogger(__name__)
+
+def multiple_simultaneous_calls(num_executions: int, function_name: str, lambda_function: LambdaFunction, max_in_flight: int = 32) -> None:
     try:
-        print(f"\n    [INFO] Call lambda function {function_name}() {num_executions} times.\n")
-        # Create a thread pool executor with the desired number of threads
-        with concurrent.futures.ThreadPoolExecutor(max_workers=num_executions) as executor:
-            # List to store the future objects
-            futures = []
-
-            # Submit the Lambda invocations to the executor
-            for _ in range(num_executions):
-                future = executor.submit(
-                    lambda_client.invoke,
-                    FunctionName=function_name,
-                    InvocationType="RequestResponse",
-                )
-                futures.append(future)
-
-            # Process the results as they become available
-            for future in concurrent.futures.as_completed(futures):
-                print("-" * 40)
-                response = future.result()
-                payload = response["Payload"]
-                txt = io.BytesIO(payload.read()).read().decode("utf-8")
-                print(f"\n           > Response:\n{txt}\n")
+        logger.info(f"Call lambda function {function_name}() {num_executions} times.")
+
+        # Keep a bounded window of invocations in flight and process the results as they become available
+        inputs = (None for _ in range(num_executions))
+        for result in lambda_function.invoke_many(function_name, inputs, max_in_flight=max_in_flight):
+            if isinstance(result, Exception):
+                raise result
+            logger.info(f"> Response : {json.dumps(result)}")
 
     except Exception as e:
-        print(f"\n    [ERROR] An error occurred in multiple_simultaneous_calls(): \n {e}")
+        logger.error(f"An error occurred in multiple_simultaneous_calls(): {e}")
 
 
 if __name__ == "__main__":
+    setup_logging()
+
     # Variaveis
     username = "leticiacb1"     
 
@@ -55,7 +46,7 @@ if __name__ == "__main__":
         sqs.read_messages()
 
     except Exception as e:
-        print(f"\n    [ERROR] An error occurred: \n {e}")
+        logger.error(f"An error occurred: {e}")
     finally:
         # Cleaning:
         sqs.cleanup()
\ No newline at end of file
@@ -0,0 +1,74 @@
+from dataclass.compress import CompressFile
+from dataclass.lambda_function import LambdaFunction
+from dataclass.local_aws import LocalAWS
+from dataclass.power_tuning import MEMORY_SIZES, PowerTuner
+from config.log import setup_logging
+
+import argparse
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+
+    setup_logging()
+
+    parser = argparse.ArgumentParser(description="Run a workload at several memory sizes and recommend one")
+    parser.add_argument("--local", action="store_true", help="Run against the local in-process engine instead of AWS")
+    parser.add_argument("--function-name", default=None,
+                        help="Tune an already deployed function (default: deploy lambda_proc.py, tune it and delete it)")
+    parser.add_argument("--memory-sizes", default=",".join(str(size) for size in MEMORY_SIZES),
+                        help="Comma separated memory sizes in MB")
+    parser.add_argument("--invocations", type=int, default=20, help="Measured invocations at each memory size")
+    parser.add_argument("--payload", default=None, help="JSON payload of every invocation")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="Concurrent invocations of the workload")
+    parser.add_argument("--strategy", choices=["cost", "speed", "balanced"], default="balanced", help="How the memory size is recommended")
+    parser.add_argument("--cost-weight", type=float, default=0.5, help="Weight of the cost in the balanced strategy (0-1)")
+    parser.add_argument("--apply", action="store_true", help="Keep the recommended memory size instead of restoring the original one")
+    parser.add_argument("--output", default="power_tuning_results.json", help="File where the JSON results are saved")
+    args = parser.parse_args()
+
+    # Variaveis
+    lambda_filename = "lambda_proc.py"
+    lambda_compress = "lambda_proc.zip"
+    handler = "lambda_proc.do_something"
+    username = "leticiacb1"
+
+    function_name = args.function_name or "power_tuning_" + username
+    deploy = args.function_name is None
+
+    engine = None
+    _lambda = None
+
+    try:
+        if args.local:
+            engine = LocalAWS()
+            engine.install()
+
+        # Instances
+        _lambda = LambdaFunction()
+        _lambda.create_client()
+
+        if deploy:
+            compress = CompressFile()
+            compress.run(lambda_filename=lambda_filename, compress_filename=lambda_compress)
+            _lambda.read_function(compress_filename=lambda_compress)
+            _lambda.create_function_zip(function_handler=handler, function_name=function_name, timeout=15)
+            _lambda.wait_until_active(function_name=function_name)
+
+        tuner = PowerTuner(_lambda, function_name, memory_sizes=[int(size) for size in args.memory_sizes.split(",")],
+                           invocations=args.invocations, payload=json.loads(args.payload) if args.payload else None,
+                           max_in_flight=args.max_in_flight, strategy=args.strategy, cost_weight=args.cost_weight)
+
+        summary = tuner.run(apply=args.apply)
+        tuner.save(summary, args.output)
+
+    except Exception as e:
+        logger.error(f"An error occurred: {e}")
+    finally:
+        # Cleaning: only the function deployed for the sweep
+        if deploy and _lambda:
+            _lambda.cleanup(function_name=function_name)
+        if engine:
+            engine.shutdown()
@@ -0,0 +1,64 @@
+import io
+import os
+import sys
+import zipfile
+
+import pytest
+
+# The scripts run from the repository root, import the modules the same way
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dataclass.lambda_function import LambdaFunction
+from dataclass.local_aws import LocalAWS
+from dataclass.queue import SQS
+
+@pytest.fixture
+def engine():
+    '''
+    Local SQS / Lambda engine installed as the client of every class.
+    '''
+    engine = LocalAWS()
+    engine.install()
+    yield engine
+    engine.shutdown()
+
+@pytest.fixture
+def make_queue(engine):
+    def make(name: str, **kwargs) -> SQS:
+        sqs = SQS()
+        sqs.create_client()
+        sqs.create_queue(queue_name=name, **kwargs)
+        return sqs
+    return make
+
+def package(files: dict) -> bytes:
+    '''
+    Zip of {archive name: source code}.
+    '''
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, mode="w") as zf:
+        for name, source in files.items():
+            zf.writestr(name, source)
+    return buffer.getvalue()
+
+@pytest.fixture
+def lambda_function(engine):
+    '''
+    LambdaFunction with a client; deploy(name, handler, files) creates a function from sources.
+    '''
+    function = LambdaFunction()
+    function.create_client()
+
+    def deploy(function_name: str, handler: str, files: dict, environment: dict = {}) -> str:
+        function.read_package(package(files))
+        function.create_function_zip(function_handler=handler, function_name=function_name, environment=environment)
+        function.wait_until_active(function_name=function_name)
+        return function_name
+
+    function.deploy = deploy
+    return function
+
+def read_source(filename: str) -> str:
+    with open(os.path.join(ROOT, filename)) as f:
+        return f.read()
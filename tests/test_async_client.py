@@ -0,0 +1,52 @@
+import asyncio
+
+from config import clients
+from config.config import get_config
+from dataclass.async_client import AsyncLambdaFunction, ThreadPoolRunner
+
+HANDLER = '''
+import time
+
+def handler(event, context):
+    time.sleep(0.05)
+    return event
+'''
+
+def test_invocations_in_flight_are_bounded(engine, lambda_function):
+    function_name = lambda_function.deploy("bounded", "bounded.handler", {"bounded.py": HANDLER})
+    client = AsyncLambdaFunction(lambda_function, max_in_flight=4)
+    peak = []
+
+    async def run() -> list:
+        invocations = asyncio.ensure_future(client.invoke_all(function_name, [{"value": i} for i in range(20)]))
+        while not invocations.done():
+            peak.append(engine.lambda_client.running_total)
+            await asyncio.sleep(0.01)
+        return invocations.result()
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        client.close()
+
+    assert results == [{"value": i} for i in range(20)]
+    assert max(peak) == 4
+
+def test_shared_client_pool_is_sized_to_max_in_flight(monkeypatch):
+    monkeypatch.setattr(clients, "_clients", {})
+    monkeypatch.setattr(get_config(), "REGION", "us-east-1")
+    shared = clients.get_client("lambda")
+
+    runner = ThreadPoolRunner()
+    assert runner.max_in_flight == get_config().MAX_POOL_CONNECTIONS
+    assert runner.pooled(shared, "lambda") is shared
+    runner.close()
+
+    runner = ThreadPoolRunner(max_in_flight=200)
+    pooled = runner.pooled(shared, "lambda")
+    other = object()
+
+    assert pooled.meta.config.max_pool_connections == 200
+    assert clients.get_client("lambda") is pooled
+    assert runner.pooled(other, "lambda") is other
+    runner.close()
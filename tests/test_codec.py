@@ -0,0 +1,70 @@
+import random
+import string
+
+from conftest import read_source
+from config.clients import get_client
+from dataclass.codec import MessageCodec, S3BlobStore
+
+HANDLER = '''
+import boto3
+import os
+
+from dataclass.codec import codec_from_environment, codec_handler
+
+@codec_handler(codec_from_environment(os.environ, boto3.client))
+def handler(event, context):
+    return {"size": len(event["data"]), "echo": event["data"][:10], "tail": event["data"] if event.get("echo") else ""}
+'''
+
+def incompressible(size: int) -> str:
+    # Printable characters compress to ~80%, base64 then makes them larger than the raw text
+    return "".join(random.Random(size).choices(string.ascii_letters + string.digits + string.punctuation, k=size))
+
+def deploy_echo(lambda_function, codec: MessageCodec) -> str:
+    lambda_function.codec = codec
+    return lambda_function.deploy("codec_echo", "echo.handler",
+                                  {"echo.py": HANDLER, "dataclass/codec.py": read_source("dataclass/codec.py")},
+                                  environment={"Variables": codec.environment()})
+
+def test_incompressible_body_is_sent_raw_when_it_fits(make_queue):
+    sqs = make_queue("codec_incompressible")
+    sqs.codec = MessageCodec()      # No blob store
+    body = incompressible(240 * 1024)
+
+    assert sqs.codec.encode(body) == (body, None)
+
+    sqs.send_messages([body])
+    received = []
+    sqs.read_messages(num_messages=1, callback=received.append)
+    assert received[0]["Body"] == body
+
+def test_function_reads_claim_checked_payloads(engine, lambda_function):
+    get_client("s3").create_bucket(Bucket="claim-check")
+    blob_store = S3BlobStore("claim-check", get_client("s3"))
+    function_name = deploy_echo(lambda_function, MessageCodec(blob_store=blob_store, max_payload_size=64 * 1024))
+    data = incompressible(100 * 1024)
+
+    envelope = lambda_function.codec.encode_payload({"data": data})
+    assert envelope["__codec__"] == "zlib+blob"
+
+    results = list(lambda_function.invoke_many(function_name, [{"data": data}]))
+    assert results == [{"size": len(data), "echo": data[:10], "tail": ""}]
+
+def test_synchronous_payloads_use_the_invoke_limit(lambda_function):
+    function_name = deploy_echo(lambda_function, MessageCodec())
+    data = incompressible(410 * 1024)
+
+    results = list(lambda_function.invoke_many(function_name, [{"data": data}]))
+    assert results == [{"size": len(data), "echo": data[:10], "tail": ""}]
+
+def test_collected_responses_are_decoded(make_queue, lambda_function):
+    results_queue = make_queue("codec_results")
+    results_queue.codec = MessageCodec()
+    function_name = deploy_echo(lambda_function, MessageCodec(compress_threshold=1024))
+    lambda_function.set_invoke_destination(function_name, on_success_arn=results_queue.get_queue_arn())
+
+    data = "y" * 50000
+    correlation_id = lambda_function.invoke_async(function_name, [{"data": data, "echo": True}])[0]["CorrelationId"]
+    results = results_queue.collect_results([correlation_id], timeout=15)
+
+    assert results[correlation_id]["response"] == {"size": len(data), "echo": data[:10], "tail": data}
@@ -0,0 +1,52 @@
+import base64
+
+from dataclass.lambda_function import LambdaFunction
+
+HANDLER = '''
+import time
+
+def handler(event, context):
+    time.sleep(0.02)
+    return {"version": context.function_version}
+'''
+
+def log_result(*lines: str) -> str:
+    return base64.b64encode("\n".join(lines).encode("utf-8")).decode("ascii")
+
+def test_parse_report_reads_the_report_line():
+    log = log_result("START RequestId: 6f0c Version: $LATEST",
+                     "END RequestId: 6f0c",
+                     "REPORT RequestId: 6f0c\tDuration: 102.25 ms\tBilled Duration: 103 ms\tMemory Size: 512 MB\t"
+                     "Max Memory Used: 71 MB\tInit Duration: 240.51 ms\t")
+
+    report = LambdaFunction.parse_report(log)
+
+    assert report == {"request_id": "6f0c", "duration_ms": 102.25, "billed_duration_ms": 103.0, "memory_size_mb": 512.0,
+                      "max_memory_used_mb": 71.0, "init_duration_ms": 240.51, "cold_start": True}
+
+def test_parse_report_without_init_duration_or_report_line():
+    warm = log_result("REPORT RequestId: 6f0c\tDuration: 2.00 ms\tBilled Duration: 2 ms\tMemory Size: 128 MB\tMax Memory Used: 40 MB\t")
+
+    assert LambdaFunction.parse_report(warm)["cold_start"] is False
+    assert LambdaFunction.parse_report(warm)["init_duration_ms"] is None
+    assert LambdaFunction.parse_report(log_result("START RequestId: 6f0c", "truncated")) is None
+
+def test_only_new_environments_are_cold_starts(lambda_function):
+    function_name = lambda_function.deploy("telemetry", "telemetry.handler", {"telemetry.py": HANDLER})
+
+    list(lambda_function.invoke_many(function_name, [None] * 8, max_in_flight=1, log_tail=True))
+    summary = lambda_function.cold_start_summary(function_name)
+
+    assert (summary["invocations"], summary["cold_starts"]) == (8, 1)
+    assert summary["mean_init_duration_ms"] is not None
+
+def test_provisioned_concurrency_removes_cold_starts(lambda_function):
+    function_name = lambda_function.deploy("provisioned", "telemetry.handler", {"telemetry.py": HANDLER})
+    version = lambda_function.publish_version(function_name)
+    lambda_function.set_alias(function_name, "live", version)
+    lambda_function.set_provisioned_concurrency(function_name, "live", concurrent_executions=2)
+
+    results = list(lambda_function.invoke_many(function_name, [None] * 6, max_in_flight=2, log_tail=True, qualifier="live"))
+
+    assert results == [{"version": version}] * 6
+    assert lambda_function.cold_start_summary(function_name)["cold_starts"] == 0
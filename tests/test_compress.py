@@ -0,0 +1,64 @@
+import io
+import os
+import sys
+import zipfile
+
+import pytest
+
+from dataclass.compress import CompressFile
+
+RUNTIME = f"python{sys.version_info.major}.{sys.version_info.minor}"
+
+HANDLER = '''
+from helpers.text import shout
+
+def handler(event, context):
+    return {"message": shout(event["message"])}
+'''
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / "helpers" / "tests").mkdir(parents=True)
+    (tmp_path / "handler.py").write_text(HANDLER)
+    (tmp_path / "helpers" / "__init__.py").write_text("")
+    (tmp_path / "helpers" / "text.py").write_text("def shout(text):\n    return text.upper() + '!'\n")
+    (tmp_path / "helpers" / "README.md").write_text("Not needed at runtime")
+    return tmp_path
+
+def sources(project) -> list:
+    return [str(project / "handler.py"), str(project / "helpers" / "__init__.py"),
+            str(project / "helpers" / "text.py"), str(project / "helpers" / "README.md")]
+
+def test_build_is_deterministic_and_stripped(project):
+    first = CompressFile().build(sources(project), runtime=RUNTIME, root=str(project))
+    os.utime(project / "handler.py", (0, 0))
+    second = CompressFile().build(sources(project), runtime=RUNTIME, root=str(project))
+
+    assert first == second
+    names = zipfile.ZipFile(io.BytesIO(first)).namelist()
+    assert {"handler.py", "helpers/__init__.py", "helpers/text.py"} <= set(names)
+    assert "helpers/README.md" not in names
+    assert any(name.startswith("helpers/__pycache__/") for name in names)
+
+def test_handler_imports_its_modules_from_the_package(project):
+    compress = CompressFile()
+    compress.build(sources(project), runtime=RUNTIME, root=str(project))
+
+    # Measured by importing the handler from the staged package
+    assert compress.package_report["import_time"] is not None
+
+def test_sources_outside_root_are_rejected(project, tmp_path_factory):
+    outside = tmp_path_factory.mktemp("outside") / "other.py"
+    outside.write_text("")
+
+    with pytest.raises(ValueError):
+        CompressFile().build([str(project / "handler.py"), str(outside)], runtime=RUNTIME, root=str(project))
+
+def test_built_package_runs(tmp_path, lambda_function):
+    (tmp_path / "standalone.py").write_text("def handler(event, context):\n    return {\"message\": event[\"message\"].upper()}\n")
+    package = CompressFile().build([str(tmp_path / "standalone.py")], runtime=RUNTIME, root=str(tmp_path))
+
+    lambda_function.read_package(package)
+    lambda_function.create_function_zip(function_handler="standalone.handler", function_name="built")
+
+    assert list(lambda_function.invoke_many("built", [{"message": "hi"}])) == [{"message": "HI"}]
@@ -0,0 +1,137 @@
+import threading
+import time
+
+import pytest
+
+from dataclass.concurrency import AdaptiveInvoker, AIMDController, CircuitBreaker, CircuitBreakerOpen, FunctionError, HedgedInvoker
+
+HANDLER = '''
+import time
+
+def handler(event, context):
+    time.sleep(0.05)
+    if event.get("fail"):
+        raise ValueError("failed on purpose")
+    return {"value": event["value"]}
+'''
+
+def sample_peak(engine, stop: threading.Event, peak: list) -> None:
+    while not stop.is_set():
+        peak.append(engine.lambda_client.running_total)
+        time.sleep(0.005)
+
+def run_invoker(engine, invoker, inputs: list) -> tuple:
+    stop, peak = threading.Event(), [0]
+    sampler = threading.Thread(target=sample_peak, args=(engine, stop, peak))
+    sampler.start()
+    try:
+        results = invoker.invoke_all(inputs)
+    finally:
+        stop.set()
+        sampler.join()
+    return results, max(peak)
+
+def test_invocations_stay_within_reserved_concurrency(engine, lambda_function):
+    function_name = lambda_function.deploy("paced", "paced.handler", {"paced.py": HANDLER})
+    lambda_function.set_lambda_limits(function_name=function_name, concurrent_executions=3)
+    invoker = AdaptiveInvoker(lambda_function, function_name)
+
+    results, peak = run_invoker(engine, invoker, [{"value": i} for i in range(20)])
+
+    assert results == [{"value": i} for i in range(20)]
+    assert peak == 3
+    assert invoker.stats == {"invocations": 20, "throttles": 0, "errors": 0}
+
+def test_throttles_shrink_the_limit_and_are_retried(engine, lambda_function):
+    function_name = lambda_function.deploy("throttled", "paced.handler", {"paced.py": HANDLER})
+    lambda_function.set_lambda_limits(function_name=function_name, concurrent_executions=2)
+    invoker = AdaptiveInvoker(lambda_function, function_name, base_delay=0.01, max_delay=0.05)
+    # The ceiling is stale: the function accepts fewer executions than read
+    invoker.read_concurrency = lambda: 8
+
+    results, _ = run_invoker(engine, invoker, [{"value": i} for i in range(20)])
+
+    assert results == [{"value": i} for i in range(20)]
+    assert invoker.stats["throttles"] > 0
+    assert invoker.controller.limit < 8
+
+def test_function_errors_are_returned_and_counted(engine, lambda_function):
+    function_name = lambda_function.deploy("failing", "paced.handler", {"paced.py": HANDLER})
+    invoker = AdaptiveInvoker(lambda_function, function_name)
+
+    results = invoker.invoke_all([{"value": 1}, {"value": 2, "fail": True}])
+
+    assert results[0] == {"value": 1}
+    assert isinstance(results[1], FunctionError)
+    assert invoker.stats["errors"] == 1
+
+def test_aimd_limit_grows_additively_and_halves_on_throttles():
+    controller = AIMDController(ceiling=10, initial=4)
+
+    for _ in range(4):
+        controller.acquire()
+        controller.release()
+    assert 4.9 < controller.limit < 5.1
+
+    controller.acquire()
+    controller.release(throttled=True)
+    assert 2.4 < controller.limit < 2.6
+
+HEDGED_HANDLER = '''
+import os
+import time
+
+def handler(event, context):
+    if event.get("slow"):
+        # Only the first attempt of a slow call stalls, the hedged duplicate answers at once
+        try:
+            os.close(os.open(os.path.join(os.environ["MARKER_DIR"], event["slow"]), os.O_CREAT | os.O_EXCL))
+            time.sleep(1)
+        except FileExistsError:
+            pass
+    if event.get("fail"):
+        raise ValueError("failed on purpose")
+    time.sleep(0.01)
+    return {"value": event.get("value")}
+'''
+
+def test_slow_calls_are_hedged(lambda_function, tmp_path):
+    function_name = lambda_function.deploy("hedged", "hedged.handler", {"hedged.py": HEDGED_HANDLER},
+                                           environment={"Variables": {"MARKER_DIR": str(tmp_path)}})
+    invoker = HedgedInvoker(lambda_function, function_name, min_samples=5, max_hedge_ratio=0.5)
+
+    try:
+        for value in range(5):
+            assert invoker.invoke({"value": value}) == {"value": value}
+
+        start = time.monotonic()
+        result = invoker.invoke({"value": "late", "slow": "late"})
+        elapsed = time.monotonic() - start
+    finally:
+        invoker.close()
+
+    assert result == {"value": "late"}
+    assert elapsed < 0.5
+    assert (invoker.stats["hedges"], invoker.stats["hedge_wins"]) == (1, 1)
+
+def test_breaker_opens_on_failures_and_closes_after_a_trial(lambda_function, tmp_path):
+    function_name = lambda_function.deploy("breaker", "hedged.handler", {"hedged.py": HEDGED_HANDLER},
+                                           environment={"Variables": {"MARKER_DIR": str(tmp_path)}})
+    breaker = CircuitBreaker(window=4, failure_rate=0.5, min_calls=4, reset_timeout=0.2)
+    invoker = HedgedInvoker(lambda_function, function_name, breaker=breaker)
+
+    try:
+        results = invoker.invoke_all([{"fail": True}] * 4, max_in_flight=1)
+        assert all(isinstance(result, FunctionError) for result in results)
+        assert breaker.state == "open"
+
+        with pytest.raises(CircuitBreakerOpen):
+            invoker.invoke({"value": 1})
+
+        time.sleep(0.25)
+        assert invoker.invoke({"value": 2}) == {"value": 2}
+        assert breaker.state == "closed"
+    finally:
+        invoker.close()
+
+    assert (invoker.stats["errors"], invoker.stats["rejected"]) == (4, 1)
@@ -0,0 +1,40 @@
+import time
+
+def queue_counts(sqs) -> tuple:
+    attributes = sqs.sqs_client.get_queue_attributes(QueueUrl=sqs.queue_url, AttributeNames=["All"])["Attributes"]
+    return int(attributes["ApproximateNumberOfMessages"]), int(attributes["ApproximateNumberOfMessagesNotVisible"])
+
+def test_consume_acknowledges_processed_messages(make_queue):
+    sqs = make_queue("consume_ack")
+    sqs.send_messages([f"message {i}" for i in range(25)])
+
+    bodies = []
+    stats = sqs.consume(lambda message: bodies.append(message["Body"]), duration=2)
+
+    assert sorted(bodies) == sorted(f"message {i}" for i in range(25))
+    assert stats["processed"] == stats["deleted"] == 25
+    assert queue_counts(sqs) == (0, 0)
+
+def test_failed_messages_are_not_acknowledged(make_queue):
+    sqs = make_queue("consume_failed")
+    sqs.send_messages(["ok", "fail"])
+
+    def handler(message):
+        if message["Body"] == "fail":
+            raise ValueError("handler failed")
+
+    stats = sqs.consume(handler, duration=1)
+
+    assert (stats["processed"], stats["failed"], stats["deleted"]) == (1, 1, 1)
+    assert queue_counts(sqs) == (0, 1)      # Back in the queue once its visibility timeout expires
+
+def test_consume_returns_after_duration_not_after_long_poll(make_queue):
+    sqs = make_queue("consume_duration")
+    sqs.send_messages(["message"])
+
+    start = time.monotonic()
+    stats = sqs.consume(lambda message: None, duration=2)
+    elapsed = time.monotonic() - start
+
+    assert elapsed < sqs.wait_time_seconds / 2
+    assert stats["throughput"] > 0.4        # 1 message over the 2 s receive window
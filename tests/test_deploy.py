@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from dataclass.compress import CompressFile
+
+HANDLER = '''
+def handler(event, context):
+    return {"version": VERSION}
+
+VERSION = {version}
+'''
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+def write_handler(version: int) -> None:
+    with open("handler.py", "w") as f:
+        f.write(HANDLER.replace("{version}", str(version)))
+
+def test_unchanged_sources_rebuild_the_same_archive(workdir):
+    write_handler(1)
+    compress = CompressFile()
+    compress.run(lambda_filename="handler.py", compress_filename="handler.zip")
+    first = CompressFile.sha256("handler.zip")
+    modified = os.path.getmtime("handler.zip")
+
+    # Cache hit: the archive is not written again
+    compress.run(lambda_filename="handler.py", compress_filename="handler.zip")
+    assert os.path.getmtime("handler.zip") == modified
+
+    # Without the cache the archive is rebuilt byte for byte
+    os.remove(compress.cache_filename)
+    os.utime("handler.py", (0, 0))
+    compress.run(lambda_filename="handler.py", compress_filename="handler.zip")
+    assert CompressFile.sha256("handler.zip") == first
+
+def test_deploy_zip_uploads_only_changed_code(workdir, engine, lambda_function):
+    calls = []
+    update_function_code = engine.lambda_client.update_function_code
+    engine.lambda_client.update_function_code = lambda **kwargs: calls.append(kwargs["FunctionName"]) or update_function_code(**kwargs)
+
+    def deploy(version: int) -> bool:
+        write_handler(version)
+        CompressFile().run(lambda_filename="handler.py", compress_filename="handler.zip")
+        lambda_function.read_function(compress_filename="handler.zip")
+        return lambda_function.deploy_zip(function_handler="handler.handler", function_name="incremental")
+
+    assert deploy(1) is True        # Created
+    assert deploy(1) is False       # Same CodeSha256, nothing uploaded
+    assert calls == []
+
+    assert deploy(2) is True
+    assert calls == ["incremental"]
+    assert list(lambda_function.invoke_many("incremental", [None])) == [{"version": 2}]
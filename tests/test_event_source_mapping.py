@@ -0,0 +1,54 @@
+import time
+
+from conftest import read_source
+
+def deploy_forwarder(lambda_function, destination) -> str:
+    return lambda_function.deploy("forwarder", "lambda_send_sqs.lambda_handler",
+                                  {"lambda_send_sqs.py": read_source("lambda_send_sqs.py")},
+                                  environment={"Variables": {"DESTINATION_SQS_URL": destination.queue_url}})
+
+def receive_all(sqs, expected: int, timeout: float = 10) -> list:
+    bodies = []
+    deadline = time.monotonic() + timeout
+    while len(bodies) < expected and time.monotonic() < deadline:
+        sqs.read_messages(num_messages=10, callback=lambda message: bodies.append(message["Body"]))
+    return bodies
+
+def test_mapping_forwards_messages(make_queue, lambda_function):
+    origin, destination = make_queue("esm_origin"), make_queue("esm_destination")
+    destination.wait_time_seconds = 1
+    function_name = deploy_forwarder(lambda_function, destination)
+
+    uuid = lambda_function.create_event_source_mapping(function_name=function_name, queue_arn=origin.get_queue_arn(), batch_size=5)
+    origin.send_messages([f"message {i}" for i in range(12)])
+
+    assert sorted(receive_all(destination, 12)) == sorted(f"message {i}" for i in range(12))
+    assert lambda_function.lambda_client.get_event_source_mapping(UUID=uuid)["State"] == "Enabled"
+
+def test_update_keeps_the_mapping_state(make_queue, lambda_function):
+    origin, destination = make_queue("esm_update_origin"), make_queue("esm_update_destination")
+    function_name = deploy_forwarder(lambda_function, destination)
+    uuid = lambda_function.create_event_source_mapping(function_name=function_name, queue_arn=origin.get_queue_arn())
+
+    lambda_function.update_event_source_mapping(uuid, enabled=False)
+
+    # Only a setting changes: must not wait for the disabled mapping to become Enabled
+    start = time.monotonic()
+    lambda_function.update_event_source_mapping(uuid, batch_size=2)
+
+    mapping = lambda_function.lambda_client.get_event_source_mapping(UUID=uuid)
+    assert time.monotonic() - start < 5
+    assert (mapping["State"], mapping["BatchSize"]) == ("Disabled", 2)
+
+    lambda_function.update_event_source_mapping(uuid, enabled=True)
+    assert lambda_function.lambda_client.get_event_source_mapping(UUID=uuid)["State"] == "Enabled"
+
+def test_delete_mapping(make_queue, lambda_function):
+    origin, destination = make_queue("esm_delete_origin"), make_queue("esm_delete_destination")
+    function_name = deploy_forwarder(lambda_function, destination)
+    uuid = lambda_function.create_event_source_mapping(function_name=function_name, queue_arn=origin.get_queue_arn())
+
+    lambda_function.delete_event_source_mapping(uuid)
+
+    assert uuid not in lambda_function.event_source_mappings
+    assert lambda_function.lambda_client.list_event_source_mappings(FunctionName=function_name)["EventSourceMappings"] == []
@@ -0,0 +1,76 @@
+import asyncio
+import collections
+import concurrent.futures
+
+from dataclass.async_client import AsyncSQS
+
+def group_of(message: str) -> int:
+    return int(message.split()[1]) % 3
+
+def test_send_ordered_keeps_the_order_of_each_group(make_queue):
+    sqs = make_queue("ordered", fifo=True)
+    messages = [f"message {i}" for i in range(60)]
+
+    results = sqs.send_ordered(messages, group_key=group_of)
+    assert all("MessageId" in result for result in results)
+
+    received = collections.defaultdict(list)
+    stats = sqs.consume(lambda message: received[group_of(message["Body"])].append(message["Body"]),
+                        duration=2, max_messages=len(messages))
+
+    assert stats["processed"] == len(messages)
+    for group, bodies in received.items():
+        assert bodies == [message for message in messages if group_of(message) == group]
+
+def test_async_send_on_fifo_queue(make_queue):
+    sqs = make_queue("async_ordered", fifo=True)
+    client = AsyncSQS(sqs)
+
+    async def send() -> list:
+        await client.send("first", group_id="group")
+        return await client.send_many([f"message {i}" for i in range(15)], group_key=lambda message: "group")
+
+    try:
+        results = asyncio.run(send())
+    finally:
+        client.close()
+
+    assert all("MessageId" in result for result in results)
+
+    bodies = []
+    sqs.consume(lambda message: bodies.append(message["Body"]), duration=2, max_messages=16)
+    assert bodies == ["first"] + [f"message {i}" for i in range(15)]
+
+class FailingClient():
+    '''
+    Client whose first SendMessageBatch fails with a connection error (not a ClientError).
+    '''
+
+    def __init__(self, client):
+        self.client = client
+        self.failed = False
+
+    def send_message_batch(self, **kwargs):
+        if not self.failed:
+            self.failed = True
+            raise ConnectionError("Connection reset by peer")
+        return self.client.send_message_batch(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+def test_send_ordered_survives_connection_errors(make_queue):
+    sqs = make_queue("ordered_failing", fifo=True)
+    sqs.sqs_client = FailingClient(sqs.sqs_client)
+    messages = [f"message {i}" for i in range(200)]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        results = executor.submit(sqs.send_ordered, messages, group_key=group_of, max_workers=2).result(timeout=20)
+
+    errors = [result["Error"] for result in results if "Error" in result]
+    assert errors.count("ConnectionError") >= 1
+    assert set(errors) <= {"ConnectionError", "GroupAborted"}
+    # Within a group nothing is sent after the failure
+    for group in range(3):
+        sent = ["MessageId" in result for message, result in zip(messages, results) if group_of(message) == group]
+        assert sent == sorted(sent, reverse=True)
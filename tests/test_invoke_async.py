@@ -0,0 +1,56 @@
+from botocore.exceptions import ClientError
+
+HANDLER = '''
+def handler(event, context):
+    return {"event": event, "request_id": context.aws_request_id}
+'''
+
+def deploy_echo(lambda_function, results_queue) -> str:
+    function_name = lambda_function.deploy("async_echo", "echo.handler", {"echo.py": HANDLER})
+    lambda_function.set_invoke_destination(function_name, on_success_arn=results_queue.get_queue_arn())
+    return function_name
+
+def test_invoke_async_results_are_collected(make_queue, lambda_function):
+    results_queue = make_queue("invoke_results")
+    function_name = deploy_echo(lambda_function, results_queue)
+
+    # Payloads are sent as they are, not only dicts
+    inputs = [{"data": "x" * 20}, [1, 2, 3], "text", None]
+    dispatched = lambda_function.invoke_async(function_name, inputs)
+    correlation_ids = [result["CorrelationId"] for result in dispatched]
+    results = results_queue.collect_results(correlation_ids, timeout=15)
+
+    assert set(results) == set(correlation_ids)
+    for correlation_id, input in zip(correlation_ids, inputs):
+        assert results[correlation_id]["condition"] == "Success"
+        assert results[correlation_id]["response"] == {"event": input, "request_id": correlation_id}
+
+class FlakyClient():
+    '''
+    Lambda client rejecting the second Invoke call.
+    '''
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = 0
+
+    def invoke(self, **kwargs):
+        self.calls += 1
+        if self.calls == 2:
+            raise ClientError({"Error": {"Code": "ServiceException", "Message": "Internal failure"}}, "Invoke")
+        return self.client.invoke(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+def test_dispatch_failures_keep_the_other_correlation_ids(make_queue, lambda_function):
+    results_queue = make_queue("invoke_results_flaky")
+    function_name = deploy_echo(lambda_function, results_queue)
+    lambda_function.lambda_client = FlakyClient(lambda_function.lambda_client)
+
+    dispatched = lambda_function.invoke_async(function_name, [{"value": i} for i in range(3)], max_workers=1)
+
+    assert dispatched[1] == {"Error": "ServiceException", "Message": "Internal failure"}
+    correlation_ids = [dispatched[0]["CorrelationId"], dispatched[2]["CorrelationId"]]
+    results = results_queue.collect_results(correlation_ids, timeout=15)
+    assert [results[correlation_id]["response"]["event"] for correlation_id in correlation_ids] == [{"value": 0}, {"value": 2}]
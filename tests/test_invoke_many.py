@@ -0,0 +1,35 @@
+import asyncio
+
+from dataclass.async_client import AsyncLambdaFunction
+from dataclass.concurrency import FunctionError
+
+HANDLER = '''
+def handler(event, context):
+    if event.get("fail"):
+        raise ValueError("failed on purpose")
+    return {"value": event["value"] * 2}
+'''
+
+def test_invoke_many_yields_function_errors(lambda_function):
+    function_name = lambda_function.deploy("doubler", "doubler.handler", {"doubler.py": HANDLER})
+    inputs = [{"value": i, "fail": i % 4 == 0} for i in range(12)]
+
+    results = list(lambda_function.invoke_many(function_name, iter(inputs), max_in_flight=3, log_tail=True))
+
+    errors = [result for result in results if isinstance(result, Exception)]
+    values = sorted(result["value"] for result in results if not isinstance(result, Exception))
+    assert len(errors) == 3 and all(isinstance(error, FunctionError) for error in errors)
+    assert values == [i * 2 for i in range(12) if i % 4]
+    assert len(lambda_function.reports) == 12
+
+def test_async_invoke_raises_function_errors(lambda_function):
+    function_name = lambda_function.deploy("async_doubler", "doubler.handler", {"doubler.py": HANDLER})
+    client = AsyncLambdaFunction(lambda_function, max_in_flight=4)
+
+    try:
+        results = asyncio.run(client.invoke_all(function_name, [{"value": 1}, {"value": 2, "fail": True}]))
+    finally:
+        client.close()
+
+    assert results[0] == {"value": 2}
+    assert isinstance(results[1], FunctionError)
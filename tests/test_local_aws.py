@@ -0,0 +1,45 @@
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+
+from dataclass.local_aws import LocalAWS
+
+HANDLER = '''
+import time
+
+def handler(event, context):
+    time.sleep(0.1)
+    return event
+'''
+
+def test_waiting_events_count_one_throttle_each(engine, lambda_function):
+    function_name = lambda_function.deploy("slow", "slow.handler", {"slow.py": HANDLER})
+    lambda_function.set_lambda_limits(function_name=function_name, concurrent_executions=1)
+
+    lambda_function.invoke_async(function_name, [{"value": i} for i in range(5)])
+    deadline = time.monotonic() + 10
+    while engine.counters["invocations"] < 5 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    time.sleep(0.2)
+
+    assert engine.counters["invocations"] == 5
+    assert engine.counters["throttles"] == 4
+
+def test_synchronous_invoke_over_reserved_concurrency_is_throttled(engine, lambda_function):
+    function_name = lambda_function.deploy("reserved", "slow.handler", {"slow.py": HANDLER})
+    lambda_function.set_lambda_limits(function_name=function_name, concurrent_executions=0)
+
+    with pytest.raises(ClientError) as error:
+        lambda_function.lambda_client.invoke(FunctionName=function_name, Payload=b"{}")
+
+    assert error.value.response["Error"]["Code"] == "TooManyRequestsException"
+    assert engine.counters["throttles"] == 1
+
+def test_shutdown_stops_the_event_dispatcher():
+    engine = LocalAWS()
+    assert engine.lambda_client.dispatcher.is_alive()
+
+    engine.shutdown()
+
+    assert not engine.lambda_client.dispatcher.is_alive()
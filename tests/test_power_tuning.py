@@ -0,0 +1,37 @@
+import pytest
+
+from dataclass.power_tuning import PowerTuner
+
+HANDLER = '''
+import time
+
+def handler(event, context):
+    if context.memory_limit_in_mb < 512:
+        raise MemoryError("Runtime exited: out of memory")
+    time.sleep(0.02)
+    return {"memory": context.memory_limit_in_mb}
+'''
+
+@pytest.fixture
+def tuned_function(lambda_function):
+    return lambda_function.deploy("tuned", "tuned.handler", {"tuned.py": HANDLER})
+
+def test_sizes_with_function_errors_are_not_recommended(lambda_function, tuned_function):
+    tuner = PowerTuner(lambda_function, tuned_function, memory_sizes=[128, 512, 1024], invocations=8,
+                       max_in_flight=4, strategy="cost")
+
+    summary = tuner.run()
+    results = {result["memory_size_mb"]: result for result in summary["results"]}
+
+    assert results[128]["errors"] == 4 + 8
+    assert results[512]["errors"] == results[1024]["errors"] == 0
+    assert summary["recommendation"]["memory_size_mb"] == 512
+    assert lambda_function.get_memory_size(function_name=tuned_function) == 128
+
+def test_cold_starts_are_not_measured(lambda_function, tuned_function):
+    tuner = PowerTuner(lambda_function, tuned_function, memory_sizes=[512], invocations=12, max_in_flight=4)
+
+    result = tuner.run()["results"][0]
+
+    assert result["cold_starts"] == 0
+    assert result["invocations"] == 12
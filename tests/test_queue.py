@@ -0,0 +1,78 @@
+from botocore.exceptions import ClientError
+
+class ScriptedClient():
+    '''
+    SQS client whose SendMessageBatch calls first go through failures(call, entries),
+    which may raise or return a response; None sends the batch to the local queue.
+    '''
+
+    def __init__(self, client, failures):
+        self.client = client
+        self.failures = failures
+        self.batches = []
+
+    def send_message_batch(self, QueueUrl: str, Entries: list) -> dict:
+        self.batches.append([entry["Id"] for entry in Entries])
+        response = self.failures(len(self.batches), Entries)
+        return response if response is not None else self.client.send_message_batch(QueueUrl=QueueUrl, Entries=Entries)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+def received_bodies(sqs) -> list:
+    bodies = []
+    while True:
+        messages = sqs.sqs_client.receive_message(QueueUrl=sqs.queue_url, MaxNumberOfMessages=10).get("Messages", [])
+        if not messages:
+            return bodies
+        bodies.extend(message["Body"] for message in messages)
+
+def test_send_messages_batches_in_input_order(make_queue):
+    sqs = make_queue("send_batches")
+    sqs.sqs_client = ScriptedClient(sqs.sqs_client, lambda call, entries: None)
+
+    results = sqs.send_messages([f"message {i}" for i in range(25)])
+
+    assert len(sqs.sqs_client.batches) == 3
+    assert all("MessageId" in result for result in results)
+    assert sorted(received_bodies(sqs)) == sorted(f"message {i}" for i in range(25))
+
+def test_failed_entries_are_retried(make_queue):
+    sqs = make_queue("send_retries")
+
+    def failures(call, entries):
+        if call == 1:
+            # Entry "3" fails with a server error, the rest of the batch goes through
+            response = sqs.sqs_client.client.send_message_batch(QueueUrl=sqs.queue_url, Entries=[entry for entry in entries if entry["Id"] != "3"])
+            response["Failed"].append({"Id": "3", "SenderFault": False, "Code": "InternalError", "Message": "Try again"})
+            return response
+
+    sqs.sqs_client = ScriptedClient(sqs.sqs_client, failures)
+    results = sqs.send_messages([f"message {i}" for i in range(5)])
+
+    assert sqs.sqs_client.batches == [["0", "1", "2", "3", "4"], ["3"]]
+    assert all("MessageId" in result for result in results)
+    assert len(received_bodies(sqs)) == 5
+
+def test_oversized_body_fails_without_retries(make_queue):
+    sqs = make_queue("send_oversized")
+    sqs.sqs_client = ScriptedClient(sqs.sqs_client, lambda call, entries: None)
+
+    results = sqs.send_messages(["small", "x" * (sqs.max_batch_bytes + 1), "small too"])
+
+    assert results[1]["Error"] == "MessageTooLong"
+    assert "MessageId" in results[0] and "MessageId" in results[2]
+    assert all("1" not in batch for batch in sqs.sqs_client.batches)
+
+def test_batch_level_client_errors_are_not_retried(make_queue):
+    sqs = make_queue("send_denied")
+
+    def failures(call, entries):
+        raise ClientError({"Error": {"Code": "AccessDenied", "Message": "Access to the resource is denied"},
+                           "ResponseMetadata": {"HTTPStatusCode": 403}}, "SendMessageBatch")
+
+    sqs.sqs_client = ScriptedClient(sqs.sqs_client, failures)
+    results = sqs.send_messages(["message"])
+
+    assert results == [{"Error": "AccessDenied", "Message": "Access to the resource is denied"}]
+    assert len(sqs.sqs_client.batches) == 1
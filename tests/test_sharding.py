@@ -0,0 +1,72 @@
+import collections
+
+import pytest
+
+from conftest import package, read_source
+from dataclass.benchmark import PipelineBenchmark
+from dataclass.sharding import HashRing, ShardedPipeline
+
+def test_keys_keep_their_node():
+    ring = HashRing(["a", "b", "c"])
+
+    assert all(ring.node_for(key) == HashRing(["c", "a", "b"]).node_for(key) for key in range(200))
+    assert sum(ring.ownership().values()) == pytest.approx(1.0)
+
+def test_adding_a_node_only_moves_keys_to_it():
+    ring = HashRing(["a", "b", "c"])
+    before = {key: ring.node_for(key) for key in range(5000)}
+
+    ring.add("d")
+    moved = {key for key in before if ring.node_for(key) != before[key]}
+
+    assert all(ring.node_for(key) == "d" for key in moved)
+    assert 0.15 < len(moved) / len(before) < 0.35      # About 1/4 of the keys
+
+    ring.remove("d")
+    assert all(ring.node_for(key) == node for key, node in before.items())
+
+@pytest.fixture
+def pipeline(make_queue, lambda_function):
+    destination = make_queue("sharded_destination")
+    destination.wait_time_seconds = 1
+    lambda_function.read_package(package({"lambda_send_sqs.py": read_source("lambda_send_sqs.py")}))
+
+    pipeline = ShardedPipeline("sharded", destination, lambda_function, "lambda_send_sqs.lambda_handler", concurrency=5)
+    pipeline.add_shards(2)
+    yield pipeline
+    pipeline.cleanup()
+
+def test_messages_reach_the_destination_through_their_shard(pipeline):
+    messages = [f"customer {i % 7} order {i}" for i in range(40)]
+    key = lambda message: message.split()[1]
+
+    results = pipeline.send_messages(messages, key=key)
+    assert all("MessageId" in result for result in results)
+
+    shards = collections.defaultdict(set)
+    for message in messages:
+        shards[key(message)].add(pipeline.route(key(message)).queue_url)
+    assert all(len(urls) == 1 for urls in shards.values())
+
+    received = []
+    while len(received) < len(messages):
+        before = len(received)
+        pipeline.destination.read_messages(num_messages=10, callback=lambda message: received.append(message["Body"]))
+        if len(received) == before:
+            break
+    assert sorted(received) == sorted(messages)
+
+def test_new_shards_take_a_share_of_the_keys(pipeline):
+    moved = pipeline.add_shards(1)
+
+    assert list(moved) == [2]
+    assert 0.15 < moved[2] < 0.5
+    assert len(pipeline.queues) == 3
+
+def test_benchmark_spreads_messages_over_the_shards(pipeline):
+    results = PipelineBenchmark(pipeline, pipeline.destination, num_messages=60, message_size=128, rate=200,
+                                idle_timeout=10).run()
+
+    assert results["messages_matched"] == 60
+    assert sum(results["sent_per_shard"].values()) == 60
+    assert len(results["sent_per_shard"]) == 2